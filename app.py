@@ -1,22 +1,21 @@
 import streamlit as st
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
-from pptx.dml.color import RGBColor
-from groq import Groq
 from dotenv import load_dotenv
 import os
-import requests
-from bs4 import BeautifulSoup
-import io
-import json
-import base64
-from PIL import Image
-from io import BytesIO
-import re
-from urllib.parse import quote
-import time
-import random
+import uuid
+import http_client
+from engine_health import engine_health
+from token_usage import token_usage
+from llm_cache import llm_cache
+from job_queue import DONE, job_key, job_queue
+from single_flight import coalescing_stats
+from rate_limiter import groq_limiter
+from slide_schema import Deck, parse_deck
+from presentation_engine import (
+    THEMES,
+    DeckBuilder,
+    pptx_to_markdown,
+)
+import presentation_engine
 
 # Try to import reveal_slides, with fallback if not available
 try:
@@ -104,731 +103,64 @@ if 'include_images' not in st.session_state:
     st.session_state.include_images = True
 if 'num_slides' not in st.session_state:
     st.session_state.num_slides = 5
+if 'stream_generation' not in st.session_state:
+    st.session_state.stream_generation = True
+if 'job_id' not in st.session_state:
+    # The background generation job this session is waiting on, if any
+    st.session_state.job_id = None
+    st.session_state.job_deck_key = None
+if 'session_token' not in st.session_state:
+    # Identifies this session as the owner of the jobs it starts
+    st.session_state.session_token = uuid.uuid4().hex
+if 'deck_builder' not in st.session_state:
+    # Kept between edits so "Update Content" only re-renders changed slides
+    st.session_state.deck_builder = None
+    st.session_state.deck_builder_key = None
 
-# Presentation themes with enhanced colors
-THEMES = {
-    "professional": {
-        "title_font_size": Pt(36),
-        "body_font_size": Pt(18),
-        "title_color": RGBColor(31, 58, 138),  # Dark blue
-        "accent_color": RGBColor(37, 99, 235),  # Medium blue
-        "background_color": RGBColor(255, 255, 255),  # White
-    },
-    "minimal": {
-        "title_font_size": Pt(36),
-        "body_font_size": Pt(18),
-        "title_color": RGBColor(30, 30, 30),  # Almost black
-        "accent_color": RGBColor(100, 100, 100),  # Gray
-        "background_color": RGBColor(245, 245, 245),  # Light gray
-    },
-    "vibrant": {
-        "title_font_size": Pt(40),
-        "body_font_size": Pt(20),
-        "title_color": RGBColor(124, 28, 138),  # Purple
-        "accent_color": RGBColor(236, 72, 153),  # Pink
-        "background_color": RGBColor(253, 244, 255),  # Very light purple
-    },
-    "corporate": {
-        "title_font_size": Pt(36),
-        "body_font_size": Pt(18),
-        "title_color": RGBColor(20, 83, 45),  # Dark green
-        "accent_color": RGBColor(22, 163, 74),  # Green
-        "background_color": RGBColor(240, 253, 244),  # Light green
-    },
-    "dark": {
-        "title_font_size": Pt(38),
-        "body_font_size": Pt(18),
-        "title_color": RGBColor(226, 232, 240),  # Light gray
-        "accent_color": RGBColor(56, 189, 248),  # Light blue
-        "background_color": RGBColor(30, 41, 59),  # Dark blue/gray
-    }
-}
-
-# Improved function to search the web with multiple fallbacks and better error handling
-def search_web(query, num_results=3, max_retries=2):
-    """Search the web for information related to the query with improved reliability."""
-    for attempt in range(max_retries):
-        try:
-            # Clean and encode the query
-            clean_query = quote(query)
-            
-            # Select a search engine - try multiple for better reliability
-            search_engines = [
-                # Google
-                {
-                    "url": f"https://www.google.com/search?q={clean_query}&num={num_results*2}",
-                    "result_selector": ["div.g", "div.Gx5Zad", "div.tF2Cxc"],
-                    "title_selector": ["h3", "h3.LC20lb"],
-                    "link_selector": ["a"],
-                    "snippet_selector": ["div.VwiC3b", "span.aCOpRe", "div.s3v9rd"]
-                },
-                # Bing
-                {
-                    "url": f"https://www.bing.com/search?q={clean_query}&count={num_results*2}",
-                    "result_selector": ["li.b_algo", "div.b_title", "div.b_caption"],
-                    "title_selector": ["h2", "a"],
-                    "link_selector": ["a", "cite"],
-                    "snippet_selector": ["p", "div.b_caption p"]
-                }
-            ]
-            
-            # Try each search engine until successful
-            for engine in search_engines:
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                }
-                
-                response = requests.get(engine["url"], headers=headers, timeout=10)
-                
-                if response.status_code != 200:
-                    continue
-                
-                # Parse the HTML
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Extract search results using multiple selectors for reliability
-                results = []
-                
-                # Try each result selector
-                for selector in engine["result_selector"]:
-                    search_divs = soup.select(selector)
-                    if search_divs:
-                        break
-                
-                if not search_divs:
-                    continue
-                
-                # Process found result containers
-                for div in search_divs[:num_results*2]:
-                    try:
-                        # Try multiple title selectors
-                        title = None
-                        for title_selector in engine["title_selector"]:
-                            title_elem = div.select_one(title_selector)
-                            if title_elem:
-                                title = title_elem.get_text().strip()
-                                break
-                        
-                        if not title:
-                            continue
-                        
-                        # Try multiple link selectors
-                        link = ""
-                        for link_selector in engine["link_selector"]:
-                            link_elem = div.select_one(link_selector)
-                            if link_elem and link_elem.has_attr('href'):
-                                link = link_elem['href']
-                                # Clean up Google's redirect URLs
-                                if link.startswith('/url?'):
-                                    link = re.search(r'url\?q=([^&]+)', link)
-                                    if link:
-                                        link = link.group(1)
-                                break
-                        
-                        # Try multiple snippet selectors
-                        snippet = "No description available"
-                        for snippet_selector in engine["snippet_selector"]:
-                            snippet_elem = div.select_one(snippet_selector)
-                            if snippet_elem:
-                                snippet = snippet_elem.get_text().strip()
-                                break
-                        
-                        # Add to results if we have at least title and link
-                        if title and link and link.startswith('http'):
-                            results.append({
-                                "title": title,
-                                "link": link,
-                                "snippet": snippet
-                            })
-                            
-                            # Break once we have enough results
-                            if len(results) >= num_results:
-                                break
-                    except Exception as e:
-                        continue
-                
-                # If we found results, return them
-                if results:
-                    return results
-                
-                # Add delay between search engine attempts
-                time.sleep(1)
-            
-            # If we've tried all engines and still no results, try one more approach
-            try:
-                # Try using DuckDuckGo as a last resort
-                ddg_url = f"https://html.duckduckgo.com/html/?q={clean_query}"
-                response = requests.get(ddg_url, headers=headers, timeout=10)
-                
-                if response.status_code == 200:
-                    soup = BeautifulSoup(response.text, 'html.parser')
-                    results = []
-                    
-                    for result in soup.select('.result'):
-                        try:
-                            title_elem = result.select_one('.result__title')
-                            link_elem = result.select_one('.result__url')
-                            snippet_elem = result.select_one('.result__snippet')
-                            
-                            if title_elem and link_elem:
-                                title = title_elem.get_text().strip()
-                                link = link_elem.get_text().strip()
-                                snippet = snippet_elem.get_text().strip() if snippet_elem else "No description available"
-                                
-                                results.append({
-                                    "title": title,
-                                    "link": f"https://{link}",
-                                    "snippet": snippet
-                                })
-                                
-                                if len(results) >= num_results:
-                                    break
-                        except Exception:
-                            continue
-                    
-                    if results:
-                        return results
-            except Exception:
-                pass
-            
-            # Add delay between retry attempts
-            if attempt < max_retries - 1:
-                time.sleep(2)
-        
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(2)
-    
-    # If all attempts fail, return a fallback message
-    return [{
-        "title": "Search Failed",
-        "link": "#",
-        "snippet": f"Unable to retrieve search results for '{query}'. Please try again later."
-    }]
-
-# Improved function to extract content from webpages
-def extract_webpage_content(url):
-    try:
-        if not url.startswith('http'):
-            return "Invalid URL format"
-            
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        if response.status_code != 200:
-            return f"Failed to retrieve content: Status code {response.status_code}"
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.extract()
-        
-        # Extract text from main content elements
-        content_elements = soup.select('p, h1, h2, h3, h4, h5, h6, li, article, main, .content, .article')
-        
-        if not content_elements:
-            # Fallback to extracting all text
-            content = soup.get_text()
-        else:
-            content = ' '.join([elem.get_text() for elem in content_elements])
-        
-        # Clean up whitespace
-        content = re.sub(r'\s+', ' ', content).strip()
-        
-        # Truncate if too long
-        if len(content) > 5000:
-            content = content[:5000] + "..."
-            
-        return content
-    except Exception as e:
-        return f"Error extracting content: {str(e)}"
-
-# Significantly improved function to get images with multiple sources and fallbacks
-def get_image_for_topic(topic, use_flowchart=False):
-    """Get an image or flowchart for a given topic using multiple methods."""
-    try:
-        # Method 1: Use Unsplash API for reliable, high-quality images
-        if not use_flowchart:
-            try:
-                unsplash_url = f"https://source.unsplash.com/featured/?{quote(topic)}"
-                response = requests.get(unsplash_url, timeout=10)
-                if response.status_code == 200:
-                    # Verify it's an actual image
-                    try:
-                        Image.open(BytesIO(response.content))
-                        return response.content
-                    except:
-                        pass  # Not a valid image, continue to next method
-            except:
-                pass  # Continue to next method if this fails
-        
-        # Method 2: For flowcharts, try a flowchart API/generator
-        if use_flowchart:
-            try:
-                # Try a placeholder flowchart service
-                flowchart_url = f"https://quickchart.io/graphviz?graph=digraph {{{quote(topic)}}};"
-                response = requests.get(flowchart_url, timeout=10)
-                if response.status_code == 200:
-                    # Verify it's an actual image
-                    try:
-                        Image.open(BytesIO(response.content))
-                        return response.content
-                    except:
-                        pass  # Not a valid image, continue to next method
-            except:
-                pass  # Continue to next method if this fails
-        
-        # Method 3: Try Bing image search with multiple selectors
-        try:
-            search_term = f"{topic} {'flowchart' if use_flowchart else ''}"
-            search_url = f"https://www.bing.com/images/search?q={quote(search_term)}&first=1"
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            response = requests.get(search_url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Try multiple selectors that might contain image URLs
-                img_urls = []
-                for selector in ['img.mimg', 'a.iusc img', 'img.inflnk', 'img[src^="http"]']:
-                    for img in soup.select(selector):
-                        if 'src' in img.attrs and img['src'].startswith('http'):
-                            img_urls.append(img['src'])
-                        elif 'data-src' in img.attrs and img['data-src'].startswith('http'):
-                            img_urls.append(img['data-src'])
-                
-                # Try each URL until we find a valid image
-                for img_url in img_urls[:5]:
-                    try:
-                        img_response = requests.get(img_url, headers=headers, timeout=5)
-                        if img_response.status_code == 200:
-                            # Verify it's a valid image
-                            try:
-                                Image.open(BytesIO(img_response.content))
-                                return img_response.content
-                            except:
-                                continue  # Not a valid image, try next URL
-                    except:
-                        continue
-        except:
-            pass  # Continue to next method if this fails
-        
-        # Method 4: Generate a diagram using diagram.net API for flowcharts
-        if use_flowchart:
-            try:
-                # Create a simple flowchart using the diagrams.net API
-                flowchart_xml = f"""
-                <mxGraphModel>
-                    <root>
-                        <mxCell id="0"/>
-                        <mxCell id="1" parent="0"/>
-                        <mxCell id="2" value="{topic}" style="rounded=1;whiteSpace=wrap;html=1;fillColor=#dae8fc;strokeColor=#6c8ebf;" vertex="1" parent="1">
-                            <mxGeometry x="120" y="120" width="200" height="60" as="geometry"/>
-                        </mxCell>
-                        <mxCell id="3" value="Process" style="rounded=1;whiteSpace=wrap;html=1;fillColor=#d5e8d4;strokeColor=#82b366;" vertex="1" parent="1">
-                            <mxGeometry x="120" y="240" width="200" height="60" as="geometry"/>
-                        </mxCell>
-                        <mxCell id="4" value="" style="endArrow=classic;html=1;exitX=0.5;exitY=1;exitDx=0;exitDy=0;entryX=0.5;entryY=0;entryDx=0;entryDy=0;" edge="1" parent="1" source="2" target="3">
-                            <mxGeometry width="50" height="50" relative="1" as="geometry">
-                                <mxPoint x="390" y="410" as="sourcePoint"/>
-                                <mxPoint x="440" y="360" as="targetPoint"/>
-                            </mxGeometry>
-                        </mxCell>
-                        <mxCell id="5" value="Output" style="rounded=1;whiteSpace=wrap;html=1;fillColor=#ffe6cc;strokeColor=#d79b00;" vertex="1" parent="1">
-                            <mxGeometry x="120" y="360" width="200" height="60" as="geometry"/>
-                        </mxCell>
-                        <mxCell id="6" value="" style="endArrow=classic;html=1;exitX=0.5;exitY=1;exitDx=0;exitDy=0;entryX=0.5;entryY=0;entryDx=0;entryDy=0;" edge="1" parent="1" source="3" target="5">
-                            <mxGeometry width="50" height="50" relative="1" as="geometry">
-                                <mxPoint x="390" y="410" as="sourcePoint"/>
-                                <mxPoint x="440" y="360" as="targetPoint"/>
-                            </mxGeometry>
-                        </mxCell>
-                    </root>
-                </mxGraphModel>
-                """
-                
-                flowchart_xml_encoded = quote(flowchart_xml)
-                chart_url = f"https://chart.googleapis.com/chart?cht=tx&chl={flowchart_xml_encoded}"
-                response = requests.get(chart_url, timeout=10)
-                
-                if response.status_code == 200:
-                    return response.content
-            except:
-                pass  # Continue to next method if this fails
-        
-        # Method 5: Last resort - generate a placeholder image with text
-        try:
-            placeholder_url = f"https://via.placeholder.com/800x600.png?text={quote(topic.replace(' ', '+'))}"
-            response = requests.get(placeholder_url, timeout=10)
-            if response.status_code == 200:
-                return response.content
-        except:
-            pass
-        
-        # If all methods fail, return None
-        return None
-    except Exception as e:
-        # If any unexpected error occurs, return None
-        return None
-
-# Improved function to convert presentation content to markdown for reveal.js
-def pptx_to_markdown(slide_content):
-    """Convert slide content to markdown for reveal.js with improved formatting."""
-    markdown = "---\ntheme: black\n---\n\n"
-    
-    # Split slides, handling different possible delimiters
-    slides = re.split(r'\n\s*\n', slide_content)
-    
-    for slide_text in slides:
-        slide_text = slide_text.strip()
-        if not slide_text:
-            continue
-            
-        lines = slide_text.splitlines()
-        if not lines:
-            continue
-            
-        # Handle slide title - look for "Title: " prefix or just use the first line
-        title_line = lines[0].strip()
-        if title_line.lower().startswith("title:"):
-            slide_title = title_line[6:].strip()  # Remove "Title: " prefix
-        else:
-            slide_title = title_line
-            
-        # Clean up any markdown symbols in the title
-        slide_title = re.sub(r'^#+\s*', '', slide_title)  # Remove any leading # characters
-        
-        # Get bullet points, skipping the title line
-        bullet_points = []
-        for line in lines[1:]:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Clean up any existing bullet points to prevent doubling
-            line = re.sub(r'^[-*•]\s*', '', line)
-            bullet_points.append(line)
-        
-        # Add to markdown with proper formatting
-        markdown += f"## {slide_title}\n\n"
-        
-        for point in bullet_points:
-            markdown += f"- {point}\n"
-        
-        markdown += "\n---\n\n"
-    
-    return markdown
-
-# Function to gather research data using multiple web searches
-def gather_research_data(topic, subtopics=None):
-    """Gather research data from web searches for the presentation."""
-    results = {}
-    
-    # Main topic search
-    with st.status("Searching web for information...", expanded=False) as status:
-        status.update(label="Searching for main topic...")
-        main_results = search_web(topic, num_results=3)
-        results["main"] = main_results
-        
-        # Search for subtopics if provided
-        if subtopics:
-            subtopic_results = {}
-            for i, subtopic in enumerate(subtopics):
-                status.update(label=f"Researching subtopic {i+1}/{len(subtopics)}: {subtopic}")
-                search_query = f"{topic} {subtopic}"
-                subtopic_results[subtopic] = search_web(search_query, num_results=2)
-            
-            results["subtopics"] = subtopic_results
-        else:
-            # If no subtopics provided, generate some based on the main topic
-            try:
-                # Auto-generate subtopics based on main search results
-                subtopics = []
-                subtopic_results = {}
-                
-                # Extract potential subtopics from main results
-                for result in main_results:
-                    snippet = result.get("snippet", "")
-                    title = result.get("title", "")
-                    
-                    # Extract phrases that might be good subtopics
-                    phrases = re.findall(r'([A-Z][^.!?]*?(benefit|feature|concept|principle|type|example|use case|application)[^.!?]*)', 
-                                        snippet + " " + title)
-                    
-                    for phrase in phrases:
-                        if phrase[0] not in subtopics and len(phrase[0].split()) <= 5:
-                            subtopics.append(phrase[0])
-                
-                # If we found some potential subtopics, search for them
-                if subtopics:
-                    subtopics = subtopics[:3]  # Limit to top 3 subtopics
-                    for i, subtopic in enumerate(subtopics):
-                        status.update(label=f"Researching auto-generated subtopic {i+1}/{len(subtopics)}: {subtopic}")
-                        search_query = f"{topic} {subtopic}"
-                        subtopic_results[subtopic] = search_web(search_query, num_results=2)
-                    
-                    results["subtopics"] = subtopic_results
-            except Exception as e:
-                # If auto-generation fails, just continue without subtopics
-                pass
-        
-        # Get deeper content from the most relevant page
-        if isinstance(main_results, list) and len(main_results) > 0:
-            try:
-                main_url = main_results[0].get("link", "")
-                if main_url and main_url.startswith("http"):
-                    status.update(label=f"Extracting detailed content from {main_url}")
-                    results["detailed_content"] = extract_webpage_content(main_url)
-            except Exception as e:
-                pass
-        
-        status.update(label="Research completed!", state="complete")
-    
-    return results
-
-# Improved function to generate slide content using Groq with research data
-def groq_generate_content(topic, context, research_data, num_slides=5):
-    """Generate slide content using Groq with research data."""
-    if not groq_api_key:
-        st.error("Please set your GROQ_API_KEY in a .env file or in Streamlit secrets.")
-        return None
-        
-    # Initialize Groq client
-    client = Groq(api_key=groq_api_key)
+# Function to follow a background generation job, showing its progress until it finishes
+def follow_job(job):
+    """Show the job's stage labels and finished slides while it runs.
     
-    try:
-        # Format the research data for the prompt
-        research_summary = "Research findings:\n"
-        
-        if "main" in research_data and isinstance(research_data["main"], list):
-            research_summary += "Main topic search results:\n"
-            for i, result in enumerate(research_data["main"][:3]):
-                research_summary += f"- {result.get('title', 'No title')}: {result.get('snippet', 'No snippet')}\n"
-        
-        if "subtopics" in research_data:
-            research_summary += "\nSubtopic search results:\n"
-            for subtopic, results in research_data["subtopics"].items():
-                if isinstance(results, list) and results:
-                    research_summary += f"- {subtopic}: {results[0].get('snippet', 'No information')}\n"
-        
-        if "detailed_content" in research_data and research_data["detailed_content"]:
-            content_sample = research_data["detailed_content"]
-            if len(content_sample) > 1000:
-                content_sample = content_sample[:1000] + "..."
-            research_summary += f"\nDetailed content excerpt:\n{content_sample}\n"
-        
-        prompt = f"""Create a professional presentation with {num_slides} slides about "{topic}".
-
-Use the following research data to make the presentation informative and data-driven:
-{research_summary}
-
-Additional context provided by the user: {context}
-
-The presentation should follow these guidelines:
-1. Start with a compelling title slide
-2. Include an agenda or overview slide
-3. Each content slide should have a clear, concise title
-4. Bullet points should be specific, actionable, and data-driven using the research
-5. Use the principle of "one idea per slide"
-6. Include a strong concluding slide with actionable takeaways
-7. Include simple flowcharts or diagrams when appropriate
-
-IMPORTANT: For each slide, provide:
-- A clear title prefixed with exactly "Title: " (this exact prefix is needed for processing)
-- 3-5 concise bullet points that elaborate on the title
-- Each bullet point should be on a new line without any bullet symbols (no -, *, •)
-- Incorporate relevant statistics, facts, or data from the research
-- Avoid jargon or overly technical terms unless necessary
-- Ensure the content is engaging and visually appealing
+    The loop touches the page a few times a second, so a widget change can
+    still interrupt this script run; the job itself keeps running and is
+    picked up again on the next run.
+    """
+    with st.status("Researching and generating professional slides...", expanded=True) as status:
+        preview = st.empty()
+        label, seen, slides = "Queued...", 0, []
+        while True:
+            finished = job.wait(0.25)
+            events = job.events(seen)
+            seen += len(events)
+            new_slides = [event["slide"] for event in events if "slide" in event]
+            if events:
+                label = events[-1]["label"]
+            if new_slides:
+                slides.extend(new_slides)
+                # Live preview of the finished slides, without the reveal.js front matter
+                live_markdown = pptx_to_markdown(Deck(slides=slides))
+                preview.markdown(live_markdown.removeprefix("---\ntheme: black\n---\n\n"))
+            status.update(label=f"{label} ({job.elapsed():.0f}s)")
+            if finished:
+                break
+        preview.empty()
+        status.update(label=f"Finished in {job.elapsed():.1f}s", state="complete" if job.status == DONE else "error")
 
-Use this exact format for each slide:
-Title: [Slide Title Here]
-[Bullet point 1 - no bullet symbol]
-[Bullet point 2 - no bullet symbol]
-[Bullet point 3 - no bullet symbol]
-[Bullet point 4 - no bullet symbol]
-[Bullet point 5 - no bullet symbol]
-
-Add a blank line between slides.
-
-FOR FLOWCHARTS: If a slide would benefit from a simple flowchart, add a note [FLOWCHART] at the end of that slide's content.
-
-Remember to cite sources where appropriate and maintain a professional tone."""
-        
-        response = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are an expert presentation designer who creates well-structured, engaging, and professional slide content backed by research data."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            model="llama-3.3-70b-specdec",
-            temperature=0.7,
-            max_tokens=4024,
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        st.error(f"Error generating content with Groq: {e}")
-        return None
-
-# Significantly improved function to create PowerPoint presentations with enhanced styling
-def create_presentation(topic, slide_content, theme="professional", include_images=True):
-    """Create a PowerPoint presentation with proper theme application and image integration."""
-    prs = Presentation()
-    
-    # Set theme properties
-    theme_properties = THEMES.get(theme, THEMES["professional"])
-    
-    # Function to set background color for a slide
-    def apply_background(slide, color):
-        """Apply background color to a slide."""
-        left = top = 0
-        width = prs.slide_width
-        height = prs.slide_height
-        shape = slide.shapes.add_shape(1, left, top, width, height)
-        shape.fill.solid()
-        shape.fill.fore_color.rgb = color
-        shape.line.fill.background()
-        shape.z_order = 0  # Send to back
-    
-    # Title Slide
-    title_slide_layout = prs.slide_layouts[0]
-    slide = prs.slides.add_slide(title_slide_layout)
+# Function to render a parsed deck, keeping the slides the previous render already has
+def render_presentation(topic, deck, theme="professional", include_images=True, fresh=False):
+    """Render a Deck with the session's builder, re-rendering only changed slides.
     
-    # Apply background color to title slide
-    apply_background(slide, theme_properties["background_color"])
-    
-    title = slide.shapes.title
-    subtitle = slide.placeholders[1]
-    
-    # Apply theme to title slide
-    title.text = topic
-    subtitle.text = "Professional Presentation"
-    
-    # Apply theme formatting to title slide
-    for paragraph in title.text_frame.paragraphs:
-        paragraph.font.size = theme_properties["title_font_size"]
-        paragraph.font.color.rgb = theme_properties["title_color"]
-        paragraph.alignment = PP_ALIGN.CENTER
-    
-    for paragraph in subtitle.text_frame.paragraphs:
-        paragraph.font.size = Pt(24)
-        paragraph.font.color.rgb = theme_properties["accent_color"]
-        paragraph.alignment = PP_ALIGN.CENTER
-    
-    # Create content slides
-    # First, clean up and parse the slide content
-    slides_content = re.split(r'\n\s*\n', slide_content)
-    
-    for slide_index, slide_text in enumerate(slides_content):
-        slide_text = slide_text.strip()
-        if not slide_text:
-            continue
-            
-        lines = slide_text.splitlines()
-        if not lines:
-            continue
-            
-        # Handle slide title
-        title_line = lines[0].strip()
-        if title_line.lower().startswith("title:"):
-            slide_title = title_line[6:].strip()  # Remove "Title: " prefix
-        else:
-            slide_title = title_line
-        
-        # Clean up any markdown symbols in the title
-        slide_title = re.sub(r'^#+\s*', '', slide_title)  # Remove any leading # characters
-        
-        # Get bullet points, skipping the title line
-        bullet_points = []
-        needs_flowchart = False
-        
-        for line in lines[1:]:
-            line = line.strip()
-            if not line:
-                continue
-                
-            # Check if the slide needs a flowchart
-            if "[FLOWCHART]" in line:
-                needs_flowchart = True
-                line = line.replace("[FLOWCHART]", "").strip()
-                
-            # Clean up any existing bullet points to prevent doubling
-            line = re.sub(r'^[-*•■]\s*', '', line)
-            if line:
-                bullet_points.append(line)
-        
-        # Add content slide
-        content_slide_layout = prs.slide_layouts[1]  # Layout with title and content
-        slide = prs.slides.add_slide(content_slide_layout)
-        
-        # Apply background
-        apply_background(slide, theme_properties["background_color"])
-        
-        # Set title
-        title = slide.shapes.title
-        title.text = slide_title
-        
-        # Apply theme formatting to title
-        for paragraph in title.text_frame.paragraphs:
-            paragraph.font.size = theme_properties["title_font_size"]
-            paragraph.font.color.rgb = theme_properties["title_color"]
-            paragraph.alignment = PP_ALIGN.LEFT
-        
-        # Add bullet points
-        if bullet_points:
-            body = slide.placeholders[1]
-            tf = body.text_frame
-            tf.text = ""  # Clear any default text
-            
-            for point in bullet_points:
-                p = tf.add_paragraph()
-                p.text = point
-                p.font.size = theme_properties["body_font_size"]
-                p.font.color.rgb = theme_properties["accent_color"]
-                p.level = 0  # First level bullet
-        
-        # Add an image if enabled
-        if include_images:
-            try:
-                # Get an image related to the slide title
-                image_data = get_image_for_topic(slide_title, use_flowchart=needs_flowchart)
-                
-                if image_data:
-                    # Save the image to a BytesIO object
-                    image_stream = BytesIO(image_data)
-                    
-                    # Add the image to the slide
-                    left = Inches(7)  # Position on the right side
-                    top = Inches(2)
-                    width = Inches(3)  # Fixed width
-                    
-                    # Maintain aspect ratio
-                    img = Image.open(image_stream)
-                    aspect_ratio = img.height / img.width
-                    height = Inches(3 * aspect_ratio)
-                    
-                    # Add the image to the slide
-                    slide.shapes.add_picture(image_stream, left, top, width, height)
-            except Exception as e:
-                # Continue without an image if there was an error
-                pass
-    
-    # Save the presentation to a BytesIO object
-    pptx_io = io.BytesIO()
-    prs.save(pptx_io)
-    pptx_io.seek(0)
-    
-    return pptx_io
+    A new builder (and a full render) is used for a fresh generation or when
+    the topic, theme or image setting changed since the last render.
+    """
+    key = (topic, theme, include_images)
+    builder = st.session_state.deck_builder
+    if fresh or builder is None or st.session_state.deck_builder_key != key:
+        builder = DeckBuilder(topic, theme=theme, include_images=include_images)
+        st.session_state.deck_builder = builder
+        st.session_state.deck_builder_key = key
+    builder.update(deck.slides)
+    return builder.finish()
 
 # Main application UI with tabs
 st.title("Advanced Presentation Generator")
@@ -862,6 +194,9 @@ with tab1:
         # Include images option
         st.session_state.include_images = st.checkbox("Include Images in Slides", value=True)
         
+        # Streaming option - show each slide as soon as the model finishes it
+        st.session_state.stream_generation = st.checkbox("Stream Slides as They Are Generated", value=True)
+        
         # Theme selection - improved with more visual cues
         st.subheader("Select Theme")
         
@@ -903,43 +238,55 @@ with tab1:
                     st.session_state.selected_theme = theme_name
                     st.rerun()  # Force refresh to update UI
     
-    # Generate slides button
+    # Generate slides button: the work runs as a background job, so reruns don't cancel or repeat it
     if st.button("Generate Presentation with Web Research", use_container_width=True, type="primary"):
         if topic:
-            with st.spinner("Researching and generating professional slides..."):
-                # Perform web research
-                research_data = gather_research_data(topic)
-                st.session_state.search_results = research_data
-                
-                # Generate content using research data
-                generated_content = groq_generate_content(
-                    topic, 
-                    context, 
-                    research_data,
-                    num_slides=st.session_state.num_slides
-                )
-                
-                if generated_content:
-                    st.session_state.generated_content = generated_content
-                    
-                    # Convert to markdown for preview
-                    st.session_state.slide_markdown = pptx_to_markdown(generated_content)
-                    
-                    # Create PowerPoint file
-                    pptx_io = create_presentation(
-                        topic, 
-                        generated_content, 
-                        theme=st.session_state.selected_theme,
-                        include_images=st.session_state.include_images
-                    )
-                    st.session_state.presentation_file = pptx_io
-                    
-                    st.success("Presentation generated successfully! Go to the 'Preview Slides' tab to see your presentation or check the 'Research Data' tab to view your sources.")
-                else:
-                    st.error("Failed to generate content. Please try again.")
+            options = dict(
+                num_slides=st.session_state.num_slides,
+                theme=st.session_state.selected_theme,
+                include_images=st.session_state.include_images,
+                stream=st.session_state.stream_generation,
+            )
+            # Identical requests (double clicks, other sessions) join the job already running
+            job = job_queue.submit(
+                job_key(topic.strip(), context.strip(), **options),
+                presentation_engine.generate_presentation,
+                topic,
+                context,
+                api_key=groq_api_key,
+                owner=st.session_state.session_token,
+                **options
+            )
+            st.session_state.job_id = job.id
+            st.session_state.job_deck_key = (topic, options["theme"], options["include_images"])
         else:
             st.warning("Please enter a topic for your presentation.")
     
+    # Pick up the current job, whether it was just submitted or started on an earlier run
+    job = job_queue.get(st.session_state.job_id) if st.session_state.job_id else None
+    if st.session_state.job_id and job is None:
+        st.session_state.job_id = None
+        st.error("The generation job expired before its result was shown. Please generate the presentation again.")
+    if job is not None:
+        follow_job(job)
+        st.session_state.job_id = None
+        if job.status == DONE:
+            result = job.result
+            st.session_state.search_results = result["research_data"]
+            st.session_state.generated_content = result["content"]
+            st.session_state.slide_markdown = result["markdown"]
+            # Bytes rather than the BytesIO, which other sessions joined to the job may be reading too
+            st.session_state.presentation_file = result["pptx"].getvalue()
+            # Only the session that started the job gets its deck builder; joiners render their own on edit
+            if job.owner == st.session_state.session_token:
+                # The job's builder is kept so "Update Content" only re-renders edited slides
+                st.session_state.deck_builder = result["builder"]
+                st.session_state.deck_builder_key = st.session_state.job_deck_key
+            
+            st.success("Presentation generated successfully! Go to the 'Preview Slides' tab to see your presentation or check the 'Research Data' tab to view your sources.")
+        else:
+            st.error(job.error)
+    
     # Show the generated content if available
     if st.session_state.generated_content:
         with st.expander("Generated Slide Content", expanded=True):
@@ -955,18 +302,21 @@ with tab1:
                 if st.button("Update Content", key="update_content", use_container_width=True):
                     # Update the stored content
                     st.session_state.generated_content = edited_content
+                    # Only the edited blocks are re-parsed; unchanged ones come from the parser's cache
+                    deck = parse_deck(edited_content)
                     
                     # Update the markdown for preview
-                    st.session_state.slide_markdown = pptx_to_markdown(edited_content)
+                    st.session_state.slide_markdown = pptx_to_markdown(deck)
                     
-                    # Update PowerPoint file
-                    pptx_io = create_presentation(
+                    # Update PowerPoint file; slides that weren't edited are reused as rendered
+                    pptx_io = render_presentation(
                         topic, 
-                        edited_content,
+                        deck,
                         theme=st.session_state.selected_theme,
                         include_images=st.session_state.include_images
                     )
-                    st.session_state.presentation_file = pptx_io
+                    # Bytes, the same type the job completion path stores
+                    st.session_state.presentation_file = pptx_io.getvalue()
                     
                     st.success("Content updated! Go to the 'Preview Slides' tab to see your changes.")
             
@@ -1053,6 +403,42 @@ with tab3:
         if "detailed_content" in research_data and research_data["detailed_content"]:
             with st.expander("Detailed Content Excerpt"):
                 st.markdown(research_data["detailed_content"][:2000] + "..." if len(research_data["detailed_content"]) > 2000 else research_data["detailed_content"])
+        
+        # Passages ranked against the topic; the best ones were sent to the model
+        if research_data.get("passages"):
+            with st.expander("Top-Ranked Source Passages"):
+                for passage in research_data["passages"]:
+                    st.markdown(f"**{passage['score']:.2f}** · {passage['title'] or passage['url']}")
+                    st.caption(passage["text"])
+        
+        # Connection reuse across all outbound fetches since the server started
+        with st.expander("Network Connection Stats"):
+            st.json(http_client.connection_stats())
+        
+        # Hit rate of this process and size of the shared completion cache
+        with st.expander("LLM Completion Cache"):
+            st.json(llm_cache.stats())
+        
+        # Estimated vs billed prompt tokens, completion tokens and latency per generation request
+        with st.expander("LLM Token Usage"):
+            st.json(token_usage.summary())
+            st.dataframe([
+                {key: value for key, value in entry.items() if key != "sections"}
+                for entry in reversed(token_usage.recent())
+            ])
+        
+        # Circuit breaker state and health score of each search engine and image source
+        with st.expander("Engine Health"):
+            st.dataframe(engine_health.snapshot())
+        
+        with st.expander("Background Jobs"):
+            st.json(job_queue.stats())
+        
+        with st.expander("Request Coalescing"):
+            st.json(coalescing_stats())
+        
+        with st.expander("Groq Rate Limiter"):
+            st.json(groq_limiter.stats())
     else:
         st.info("Generate a presentation in the 'Create Presentation' tab to see research data here.")
 
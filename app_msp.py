@@ -2,63 +2,73 @@ import streamlit as st
 from pptx import Presentation
 from groq import Groq
 from mcp.client.stdio import StdioServerParameters  # Correct import path
-from mcp.client.stdio import stdio_client
-from mcp import ClientSession
+from mcp_pool import MCPSessionPool, MCP_POOL_SIZE
+from slide_schema import DECK_JSON_FORMAT, complete_deck
+from rate_limiter import estimate_request_tokens, groq_limiter
 import asyncio
-import json
 import os
 
 # Load environment variables
 groq_api_key = groq_api_key = st.secrets["k"]["api_key"]
-client = Groq(api_key=groq_api_key)
+client = Groq(api_key=groq_api_key, max_retries=0)
 
-async def generate_presentation(topic: str):
-    """Main workflow using updated MCP SDK patterns"""
-    # Configure MCP server parameters
+# Shared across Streamlit sessions and reruns, so server processes stay warm between clicks
+@st.cache_resource
+def get_mcp_pool():
+    """Start the pool of long-lived web search MCP sessions."""
     server_params = StdioServerParameters(
         command="python",
         args=["websearch_server.py"]
     )
+    return MCPSessionPool(server_params, size=MCP_POOL_SIZE)
 
-    async with stdio_client(server_params) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
-            
-            # Execute web search tool
-            search_results = await session.call_tool(
-                "web_search",
-                {"query": topic, "max_results": 5}
-            )
+async def generate_presentation(topic: str):
+    """Main workflow using a pooled, already-initialized MCP session"""
+    # Execute web search tool on a warm session from the pool
+    search_results = await get_mcp_pool().acall_tool(
+        "web_search",
+        {"query": topic, "max_results": 5}
+    )
 
-            # Generate PPT content using Groq
-            content = client.chat.completions.create(
-                messages=[{
-                    "role": "user",
-                    "content": f"Create slides about {topic} using this data: {search_results}"
-                }],
-                model="llama3-70b-8192",
-                temperature=0.4
-            ).choices[0].message.content
-            
-            return create_pptx(content)
+    def complete(messages):
+        request = dict(
+            messages=messages,
+            model="llama3-70b-8192",
+            temperature=0.4,
+            response_format={"type": "json_object"}
+        )
+        # Paced and retried by the shared rate limiter
+        response = groq_limiter.call(lambda: client.chat.completions.create(**request),
+                                     estimate_request_tokens(request))
+        return response.choices[0].message.content
+
+    # Generate PPT content using Groq in JSON mode, re-asking only for slides that come back broken
+    content = complete([{
+        "role": "user",
+        "content": f"Create slides about {topic} using this data: {search_results}\n\n"
+                   f"Reply with JSON only, in this format:\n{DECK_JSON_FORMAT}"
+    }])
+    deck = complete_deck(complete, content, topic)
+    deck.title = deck.title or topic
+    
+    return create_pptx(deck)
 
-def create_pptx(content: str):
-    """Convert structured content to PowerPoint"""
-    data = json.loads(content)
+def create_pptx(deck):
+    """Convert a slide_schema.Deck to PowerPoint"""
     prs = Presentation()
     
     # Title Slide
     title_slide = prs.slides.add_slide(prs.slide_layouts[0])
-    title_slide.shapes.title.text = data['title']
-    title_slide.placeholders[1].text = "Generated with MCP"
+    title_slide.shapes.title.text = deck.title
+    title_slide.placeholders[1].text = deck.subtitle or "Generated with MCP"
     
     # Content Slides
-    for slide in data['slides']:
+    for slide in deck.slides:
         content_slide = prs.slides.add_slide(prs.slide_layouts[1])
-        content_slide.shapes.title.text = slide['title']
+        content_slide.shapes.title.text = slide.title
         body = content_slide.shapes.placeholders[1]
         
-        for point in slide['points']:
+        for point in slide.points:
             p = body.text_frame.add_paragraph()
             p.text = point
     
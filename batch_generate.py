@@ -0,0 +1,248 @@
+# batch_generate.py (Headless batch deck generation over a CSV/JSONL list of topics)
+#
+# Usage:
+#     python batch_generate.py topics.csv --out-dir decks --workers 4 --llm-rpm 30
+#
+# CSV files need a "topic" (or "title") column; "id", "context" (or "body"),
+# "num_slides" and "theme" are optional. JSONL lines use the same keys, and
+# "request_id"/"title"/"body" records like requests.jsonl work as-is.
+# Finished items are appended to a checkpoint file, so rerunning the same
+# command resumes where the last run stopped; items that failed are run again
+# unless --skip-failed is given.
+import argparse
+import csv
+import json
+import os
+import re
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from presentation_engine import (
+    THEMES,
+    create_presentation,
+    gather_research_data,
+    groq_generate_content,
+)
+from rate_limiter import PRIORITY_BATCH, groq_limiter
+
+STAGES = ("research", "generate", "render")
+
+
+def slugify(text, limit=60):
+    """Filesystem-safe id derived from a topic."""
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:limit] or "deck"
+
+
+def parse_num_slides(value, default):
+    """A row's slide count, or the default when the row leaves it empty."""
+    if value is None or str(value).strip() == "":
+        return default
+    try:
+        count = int(str(value).strip())
+    except ValueError:
+        raise ValueError(f"num_slides must be a whole number, got {value!r}") from None
+    if count < 1:
+        raise ValueError(f"num_slides must be at least 1, got {count}")
+    return count
+
+
+def load_items(path, default_slides, default_theme):
+    """Read topics from a CSV or JSONL file into normalized work items.
+
+    A row with invalid settings becomes an item with an "error", which is
+    recorded as failed instead of stopping the whole batch.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    items, seen = [], set()
+    for index, row in enumerate(rows):
+        topic = (row.get("topic") or row.get("title") or "").strip()
+        if not topic:
+            print(f"skipping row {index + 1}: no topic", file=sys.stderr)
+            continue
+        # Ids name the output files, so ones from the file are cleaned like topic-derived ones
+        item_id = slugify(str(row.get("id") or row.get("request_id") or topic))
+        if item_id in seen:
+            item_id = f"{item_id}-{index + 1}"
+        seen.add(item_id)
+        theme = row.get("theme") or default_theme
+        item = {
+            "id": item_id,
+            "topic": topic,
+            "context": row.get("context") or row.get("body") or "",
+            "num_slides": default_slides,
+            "theme": theme if theme in THEMES else default_theme,
+        }
+        try:
+            item["num_slides"] = parse_num_slides(row.get("num_slides"), default_slides)
+        except ValueError as e:
+            item["error"] = f"row {index + 1}: {e}"
+        items.append(item)
+    return items
+
+
+def load_checkpoint(path):
+    """Latest checkpoint record per item id."""
+    records = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    records[record["id"]] = record
+                except (ValueError, KeyError):
+                    continue
+    return records
+
+
+class BatchRunner:
+    """Generates decks for work items on a worker pool, throttling LLM calls."""
+
+    def __init__(self, args):
+        self.args = args
+        # The shared limiter also throttles any interactive calls in this process, which go first
+        groq_limiter.configure(
+            requests_per_minute=args.llm_rpm, tokens_per_minute=args.llm_tpm,
+            initial_concurrency=args.llm_concurrency, max_concurrency=args.llm_concurrency,
+            max_retries=args.llm_retries,
+        )
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.total = 0
+
+    def generate_content(self, item):
+        """Call the LLM at batch priority; the rate limiter paces it and retries 429s."""
+        errors = []
+        content = groq_generate_content(
+            item["topic"], item["context"], item["research"], num_slides=item["num_slides"],
+            on_error=errors.append, priority=PRIORITY_BATCH
+        )
+        if not content:
+            raise RuntimeError(errors[-1] if errors else "empty response from the LLM")
+        return content
+
+    def run_item(self, item):
+        timings = {}
+        start = time.perf_counter()
+        try:
+            if item.get("error"):
+                raise ValueError(item["error"])
+
+            stage_start = time.perf_counter()
+            item["research"] = gather_research_data(item["topic"])
+            timings["research"] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            content = self.generate_content(item)
+            timings["generate"] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            pptx_io = create_presentation(
+                item["topic"], content, theme=item["theme"], include_images=not self.args.no_images
+            )
+            output = os.path.join(self.args.out_dir, f"{item['id']}.pptx")
+            with open(output, "wb") as f:
+                f.write(pptx_io.getvalue())
+            with open(os.path.join(self.args.out_dir, f"{item['id']}.txt"), "w", encoding="utf-8") as f:
+                f.write(content)
+            timings["render"] = time.perf_counter() - stage_start
+
+            record = {"id": item["id"], "status": "done", "output": output}
+        except Exception as e:
+            record = {"id": item["id"], "status": "failed", "error": str(e)}
+
+        record.update({
+            "topic": item["topic"],
+            "seconds": round(time.perf_counter() - start, 3),
+            "stages": {stage: round(seconds, 3) for stage, seconds in timings.items()},
+            "finished_at": time.time(),
+        })
+        self.record(record)
+        return record
+
+    def record(self, record):
+        """Append to the checkpoint and print one status line per item."""
+        with self._lock:
+            with open(self.args.checkpoint, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            self.completed += 1
+            stages = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in record["stages"].items())
+            detail = record.get("output") or record.get("error", "")
+            print(f"[{self.completed:>{len(str(self.total))}}/{self.total}] {record['status']:<6} "
+                  f"{record['id']}  ({stages})  {detail}", flush=True)
+
+    def run(self, items):
+        self.total = len(items)
+        with ThreadPoolExecutor(max_workers=self.args.workers) as pool:
+            return list(pool.map(self.run_item, items))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def print_summary(records, skipped, wall_seconds):
+    done = [r for r in records if r["status"] == "done"]
+    failed = [r for r in records if r["status"] == "failed"]
+    print("\nBatch summary")
+    print(f"  items run:     {len(records)} ({len(done)} done, {len(failed)} failed, {skipped} skipped from checkpoint)")
+    print(f"  wall time:     {wall_seconds:.1f}s")
+    if wall_seconds > 0:
+        print(f"  throughput:    {len(done) / wall_seconds * 60:.2f} decks/min")
+    if done:
+        seconds = [r["seconds"] for r in done]
+        print(f"  per deck:      mean {statistics.mean(seconds):.1f}s, p50 {percentile(seconds, 0.5):.1f}s, "
+              f"p95 {percentile(seconds, 0.95):.1f}s")
+        for stage in STAGES:
+            values = [r["stages"][stage] for r in done if stage in r["stages"]]
+            if values:
+                print(f"  {stage + ':':<14} mean {statistics.mean(values):.1f}s, p95 {percentile(values, 0.95):.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate presentations for a list of topics without Streamlit")
+    parser.add_argument("input", help="CSV or JSONL file of topics")
+    parser.add_argument("--out-dir", default="decks", help="where .pptx files are written")
+    parser.add_argument("--checkpoint", help="progress file (default: <out-dir>/checkpoint.jsonl)")
+    parser.add_argument("--workers", type=int, default=4, help="decks generated in parallel")
+    parser.add_argument("--llm-rpm", type=float, default=30, help="max LLM requests per minute")
+    parser.add_argument("--llm-tpm", type=float, default=30000, help="max LLM tokens per minute")
+    parser.add_argument("--llm-concurrency", type=int, default=2, help="max LLM requests in flight")
+    parser.add_argument("--llm-retries", type=int, default=3, help="retries after a rate-limit error")
+    parser.add_argument("--num-slides", type=int, default=5)
+    parser.add_argument("--theme", default="professional", choices=sorted(THEMES))
+    parser.add_argument("--no-images", action="store_true", help="skip slide images")
+    parser.add_argument("--skip-failed", action="store_true", help="don't rerun items that failed in a previous run")
+    args = parser.parse_args(argv)
+    args.checkpoint = args.checkpoint or os.path.join(args.out_dir, "checkpoint.jsonl")
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    items = load_items(args.input, args.num_slides, args.theme)
+    finished = load_checkpoint(args.checkpoint)
+    skip_statuses = {"done", "failed"} if args.skip_failed else {"done"}
+    pending = [item for item in items if finished.get(item["id"], {}).get("status") not in skip_statuses]
+    skipped = len(items) - len(pending)
+    if skipped:
+        print(f"Resuming: {skipped} of {len(items)} items already in {args.checkpoint}")
+
+    start = time.perf_counter()
+    records = BatchRunner(args).run(pending)
+    print_summary(records, skipped, time.perf_counter() - start)
+    return 0 if all(r["status"] == "done" for r in records) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
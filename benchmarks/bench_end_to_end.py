@@ -0,0 +1,315 @@
+# bench_end_to_end.py (Per-stage latency, throughput, memory and output size of the whole pipeline, offline)
+#
+# Every outbound request is answered by a local replay server: search engines
+# get the saved SERP pages in benchmarks/fixtures, result pages get the saved
+# article, image hosts get a generated PNG, and fake_groq_server plays the
+# LLM. Latency and failures are injected on both. Each stage runs
+# --iterations times on --concurrency threads with fresh inputs and empty
+# caches, so every call does real work. Usage:
+#     python benchmarks/bench_end_to_end.py --iterations 40 --latency 0.05
+#     python benchmarks/bench_end_to_end.py --failure-rate 0.1
+#     python benchmarks/bench_end_to_end.py --save-baseline
+#
+# Results are compared with benchmarks/baseline.json when it was recorded
+# with the same workload options; the run exits 1 if a stage's p50/p95
+# latency, throughput, output size or peak RSS regressed by more than
+# --tolerance. Baselines are machine specific: re-save them when moving to
+# different hardware.
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baseline.json")
+sys.path.insert(0, ROOT)
+
+from fake_groq_server import LocalHTTPServer, run_fake_groq_server
+
+# (host, path prefix) -> fixture replayed for it; anything else is treated as an article page
+SERP_FIXTURES = {
+    ("www.google.com", "/search"): "google_serp.html",
+    ("www.bing.com", "/search"): "bing_serp.html",
+    ("html.duckduckgo.com", "/html"): "duckduckgo_serp.html",
+    ("www.bing.com", "/images"): "bing_images.html",
+}
+IMAGE_HOSTS = ("source.unsplash.com", "quickchart.io", "chart.googleapis.com", "via.placeholder.com", ".mm.bing.net")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif", ".webp")
+
+# Labels extract_webpage_content returns instead of page text
+EXTRACT_FAILURES = ("Failed to retrieve content", "Skipped non-HTML", "Invalid URL", "Error extracting content")
+
+# Options that change what is measured; a baseline only applies to runs with the same values
+WORKLOAD_OPTIONS = ("iterations", "warmup", "concurrency", "latency", "jitter", "llm_latency", "token_delay",
+                    "failure_rate", "slides", "no_images", "seed")
+
+STAGES = ("search_web", "extract_webpage_content", "get_image_for_topic",
+          "groq_generate_content", "create_presentation", "pptx_to_markdown")
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def sample_png(width=1200, height=800):
+    """A photo-sized PNG, so the image store's downscaling does its usual work."""
+    from PIL import Image
+    image = Image.new("RGB", (width, height))
+    image.putdata([((x * 255) // width, (y * 255) // height, 128) for y in range(height) for x in range(width)])
+    out = io.BytesIO()
+    image.save(out, "PNG")
+    return out.getvalue()
+
+
+def start_replay_server(latency, jitter, failure_rate):
+    """Local stand-in for every web host; returns (server, base_url).
+
+    Requests arrive as /<original host><original path>. Each waits `latency`
+    plus up to `jitter` seconds, and `failure_rate` of them get a 503.
+    """
+    fixtures = {key: load_fixture(name) for key, name in SERP_FIXTURES.items()}
+    article = load_fixture("article.html")
+    image = sample_png()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency + random.uniform(0, jitter))
+            if failure_rate and random.random() < failure_rate:
+                self._send(503, b"injected failure", "text/plain")
+                return
+            host, _, path = self.path.lstrip("/").partition("/")
+            path = "/" + path.split("?", 1)[0]
+            for (fixture_host, prefix), body in fixtures.items():
+                if host == fixture_host and path.startswith(prefix):
+                    self._send(200, body, "text/html; charset=utf-8")
+                    return
+            if host.endswith(IMAGE_HOSTS) or path.lower().endswith(IMAGE_EXTENSIONS):
+                self._send(200, image, "image/png")
+            else:
+                self._send(200, article, "text/html; charset=utf-8")
+
+        def _send(self, status, body, content_type):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = LocalHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, name="replay", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def route_to(base_url):
+    """Send every request made through the shared HTTP session to the replay server."""
+    import http_client
+    shared_request = http_client.session.request
+
+    def local_request(method, url, *args, **kwargs):
+        parts = urlsplit(url)
+        local_url = f"{base_url}/{parts.netloc}{parts.path or '/'}" + (f"?{parts.query}" if parts.query else "")
+        return shared_request(method, local_url, *args, **kwargs)
+
+    http_client.session.request = local_request
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered) + 0.5) - 1))]
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_stage(iterations, concurrency, call, check=bool, size=None, warmup=0):
+    """Run call(i) for every iteration; returns the stage's latency, throughput, error and size stats.
+
+    `warmup` unmeasured calls (negative i) go first, so pools, connections
+    and engine health rankings have settled before timing starts.
+    """
+    latencies, errors, sizes = [], 0, []
+
+    def timed(i):
+        start = time.perf_counter()
+        try:
+            result = call(i)
+            ok = check(result)
+        except Exception:
+            result, ok = None, False
+        return time.perf_counter() - start, ok, result
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, range(-warmup, 0)))
+        start = time.perf_counter()
+        for seconds, ok, result in pool.map(timed, range(iterations)):
+            latencies.append(seconds)
+            if not ok:
+                errors += 1
+            elif size:
+                sizes.append(size(result))
+    elapsed = time.perf_counter() - start
+    stats = {
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        "throughput_per_s": round(iterations / elapsed, 2),
+        "errors": errors,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if sizes:
+        stats["output_bytes"] = round(sum(sizes) / len(sizes))
+    return stats
+
+
+def run(args):
+    random.seed(args.seed)
+    replay, web_url = start_replay_server(args.latency, args.jitter, args.failure_rate)
+    llm, llm_url = run_fake_groq_server(first_token_delay=args.llm_latency, token_delay=args.token_delay,
+                                        failure_rate=args.failure_rate)
+
+    # Fresh caches (the LLM's disabled) so every call is measured doing real work
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="bench-cache-")
+    os.environ["LLM_CACHE_DISABLED"] = "1"
+    os.environ["GROQ_API_KEY"] = "bench"
+    os.environ["GROQ_BASE_URL"] = llm_url
+
+    import presentation_engine
+    from rate_limiter import groq_limiter
+    route_to(web_url)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    # The account quota isn't what is being measured here
+    groq_limiter.configure(requests_per_minute=60000, tokens_per_minute=10 ** 9,
+                           initial_concurrency=args.concurrency, max_concurrency=args.concurrency)
+
+    topic = lambda i: f"benchmark topic {args.seed}-{i}"
+    research = {"main": [{"title": "Result", "link": "https://example.com/a", "snippet": "Snippet"}]}
+    contents = {}
+
+    def generate(i):
+        content = presentation_engine.groq_generate_content(topic(i), "", research, args.slides)
+        contents[i] = content
+        return content
+
+    # Later stages reuse the generated content; a failed generation falls back to a canned deck
+    fallback = lambda i: contents.get(i) or f"Title: {topic(i)}\nPoint one\nPoint two"
+    calls = {
+        "search_web": (lambda i: presentation_engine.search_web(topic(i)), bool, None),
+        "extract_webpage_content": (lambda i: presentation_engine.extract_webpage_content(f"https://example.com/article/{i}"),
+                                    lambda text: bool(text) and not text.startswith(EXTRACT_FAILURES), None),
+        "get_image_for_topic": (lambda i: presentation_engine.get_image_for_topic(f"{topic(i)} image"),
+                                bool, lambda image: len(image.data)),
+        "groq_generate_content": (generate, bool, None),
+        "create_presentation": (lambda i: presentation_engine.create_presentation(
+            topic(i), fallback(i), include_images=not args.no_images), bool, lambda pptx: len(pptx.getvalue())),
+        "pptx_to_markdown": (lambda i: presentation_engine.pptx_to_markdown(fallback(i)), bool, len),
+    }
+
+    print(f"{args.iterations} iterations x {args.concurrency} threads, {args.latency * 1000:.0f}ms "
+          f"(+{args.jitter * 1000:.0f}ms) web latency, {args.llm_latency * 1000:.0f}ms LLM latency, "
+          f"{args.failure_rate:.0%} injected failures\n")
+    results = {}
+    for name in STAGES:
+        call, check, size = calls[name]
+        results[name] = run_stage(args.iterations, args.concurrency, call, check, size, args.warmup)
+    replay.shutdown()
+    llm.shutdown()
+    return results
+
+
+def print_results(results):
+    print(f"{'stage':<26}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ops/s':>9}{'errors':>8}{'RSS MB':>9}{'out KB':>9}")
+    for name, stats in results.items():
+        size = f"{stats['output_bytes'] / 1024:.1f}" if "output_bytes" in stats else "-"
+        print(f"{name:<26}{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+              f"{stats['throughput_per_s']:>9}{stats['errors']:>8}{stats['peak_rss_mb']:>9}{size:>9}")
+
+
+def compare(results, baseline, tolerance, min_delta_ms):
+    """Regression messages for stages worse than the baseline by more than `tolerance`.
+
+    Latency changes under `min_delta_ms` are ignored, and so is throughput
+    for stages that fast: at that scale the harness measures noise.
+    """
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric in ("p50_ms", "p95_ms"):
+            if stats[metric] > base[metric] * (1 + tolerance) and stats[metric] - base[metric] > min_delta_ms:
+                regressions.append(f"{name}: {metric} {stats[metric]} vs baseline {base[metric]}")
+        if base["p50_ms"] >= min_delta_ms and stats["throughput_per_s"] < base["throughput_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: {stats['throughput_per_s']} ops/s vs baseline {base['throughput_per_s']}")
+        if "output_bytes" in base and stats.get("output_bytes", 0) > base["output_bytes"] * (1 + tolerance):
+            regressions.append(f"{name}: output {stats.get('output_bytes')} bytes vs baseline {base['output_bytes']}")
+        if stats["peak_rss_mb"] > base["peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{name}: peak RSS {stats['peak_rss_mb']} MB vs baseline {base['peak_rss_mb']}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the presentation pipeline")
+    parser.add_argument("--iterations", type=int, default=40, help="calls per stage")
+    parser.add_argument("--warmup", type=int, default=8, help="unmeasured calls per stage before timing")
+    parser.add_argument("--concurrency", type=int, default=4, help="threads calling each stage")
+    parser.add_argument("--latency", type=float, default=0.05, help="web replay latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="extra random web latency, up to this many seconds")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds before the LLM's first token")
+    parser.add_argument("--token-delay", type=float, default=0.002, help="seconds per LLM token")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of web and LLM requests that fail")
+    parser.add_argument("--slides", type=int, default=6)
+    parser.add_argument("--no-images", action="store_true", help="build decks without images")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed regression before failing, as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=5, help="latency changes smaller than this never fail")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = run(args)
+    print_results(results)
+    report = {"workload": {option: getattr(args, option) for option in WORKLOAD_OPTIONS}, "stages": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\nbaseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("workload") != report["workload"]:
+            print("\nbaseline was recorded with different options; not comparing")
+            sys.exit(0)
+        regressions = compare(results, baseline["stages"], args.tolerance, args.min_delta_ms)
+        if regressions:
+            print("\nregressions against the baseline:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print("\nno regressions against the baseline")
@@ -0,0 +1,88 @@
+# bench_groq_limiter.py (Deck generation bursts against a rate-limited account: SDK retries vs the shared limiter)
+#
+# Runs offline: fake_groq_server stands in for Groq and answers 429 with
+# Retry-After past its requests-per-minute and concurrency limits. Usage:
+#     python benchmarks/bench_groq_limiter.py --decks 20 --rpm 60 --concurrency 4
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_groq_server import run_fake_groq_server
+
+RESEARCH = {"search_results": [], "page_contents": [], "timestamp": "bench"}
+
+
+def burst(label, decks, server, generate):
+    """Start every deck at once; report decks completed per minute and 429s seen."""
+    rejected_before = server.limits.rejected
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=decks) as pool:
+        results = list(pool.map(generate, range(decks)))
+    elapsed = time.perf_counter() - start
+    completed = sum(1 for ok in results if ok)
+    rejected = server.limits.rejected - rejected_before
+    print(f"{label:<34} {completed:3d}/{decks} decks  {elapsed:6.1f}s  "
+          f"{completed / elapsed * 60:6.1f} decks/min  {rejected:4d} x 429")
+    return completed, rejected
+
+
+def main(decks, rpm, concurrency, slides):
+    server, groq_url = run_fake_groq_server(first_token_delay=0.3, token_delay=0,
+                                            requests_per_minute=rpm, max_concurrency=concurrency)
+
+    # Isolated caches (disabled for the LLM) so every deck is a real request
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="bench-cache-")
+    os.environ["LLM_CACHE_DISABLED"] = "1"
+    os.environ["GROQ_API_KEY"] = "bench"
+    os.environ["GROQ_BASE_URL"] = groq_url
+
+    from groq import Groq
+    from presentation_engine import GROQ_MODEL, groq_generate_content, plan_generation_messages
+    from rate_limiter import groq_limiter
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    print(f"{decks} decks at once, account limited to {rpm} requests/min and {concurrency} in flight\n")
+
+    # Previous behavior: every caller fires immediately and leans on the SDK's own retries
+    sdk_client = Groq(api_key="bench")
+
+    def unthrottled(i):
+        messages, report = plan_generation_messages(f"unthrottled topic {i}", "", RESEARCH, slides)
+        try:
+            sdk_client.chat.completions.create(messages=messages, model=GROQ_MODEL, max_tokens=report["max_tokens"])
+            return True
+        except Exception:
+            return False
+
+    burst("SDK retries only", decks, server, unthrottled)
+    # Let the fake account's minute window drain before the next run
+    time.sleep(60)
+
+    groq_limiter.configure(requests_per_minute=rpm, tokens_per_minute=rpm * 10000,
+                           initial_concurrency=concurrency, max_concurrency=concurrency)
+    errors = []
+
+    def limited(i):
+        return bool(groq_generate_content(f"limited topic {i}", "", RESEARCH, slides, on_error=errors.append))
+
+    burst("shared rate limiter", decks, server, limited)
+    if errors:
+        print(f"\nlast error: {errors[-1]}")
+    print(f"limiter: {groq_limiter.stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark deck generation against a rate-limited LLM account")
+    parser.add_argument("--decks", type=int, default=20, help="decks requested at once")
+    parser.add_argument("--rpm", type=int, default=60, help="the fake account's requests per minute")
+    parser.add_argument("--concurrency", type=int, default=4, help="the fake account's requests in flight")
+    parser.add_argument("--slides", type=int, default=5)
+    args = parser.parse_args()
+    main(args.decks, args.rpm, args.concurrency, args.slides)
@@ -0,0 +1,81 @@
+# bench_html_parsing.py (CPU cost of the scraper parse paths: BeautifulSoup vs the lxml backend)
+#
+# Runs the real parse functions from presentation_engine against the saved
+# pages in benchmarks/fixtures, checks both backends produce the same output,
+# and reports milliseconds per page. Usage:
+#     python benchmarks/bench_html_parsing.py --repeat 20
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "benchmarks", "fixtures")
+sys.path.insert(0, ROOT)
+
+import html_parser
+import presentation_engine
+
+ENGINES = {engine["name"]: engine for engine in presentation_engine.SEARCH_ENGINES}
+
+
+def load(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+# (label, fixture, parse function) for every scraper parse path
+CASES = [
+    ("google results", "google_serp.html", lambda page: presentation_engine.parse_search_results(page, ENGINES["google"], 5)),
+    ("bing results", "bing_serp.html", lambda page: presentation_engine.parse_search_results(page, ENGINES["bing"], 5)),
+    ("duckduckgo results", "duckduckgo_serp.html",
+     lambda page: presentation_engine.parse_search_results(page, ENGINES["duckduckgo"], 5)),
+    ("bing images", "bing_images.html", presentation_engine.parse_bing_image_urls),
+    ("article text", "article.html", presentation_engine.extract_text),
+]
+
+
+def run_case(backend, parse, page, repeat):
+    """Best-of-3 mean milliseconds per call, plus the last output."""
+    presentation_engine.parser = backend
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            output = parse(page)
+        best = min(best, (time.perf_counter() - start) / repeat * 1000)
+    return best, output
+
+
+def main(repeat):
+    backends = [html_parser.get_backend("bs4"), html_parser.get_backend("lxml")]
+    if backends[1].name != "lxml":
+        sys.exit("lxml is not installed")
+
+    print(f"{'case':<20} {'size':>8} {'bs4 ms':>9} {'lxml ms':>9} {'speedup':>8}  output")
+    totals = {backend.name: 0.0 for backend in backends}
+    mismatches = 0
+    for label, fixture, parse in CASES:
+        page = load(fixture)
+        (soup_ms, soup_out), (lxml_ms, lxml_out) = (run_case(b, parse, page, repeat) for b in backends)
+        totals["bs4"] += soup_ms
+        totals["lxml"] += lxml_ms
+        same = soup_out == lxml_out
+        mismatches += not same
+        size = f"{len(page) // 1024}KB"
+        summary = f"{len(lxml_out)} items" if isinstance(lxml_out, list) else f"{len(lxml_out)} chars"
+        print(f"{label:<20} {size:>8} {soup_ms:9.2f} {lxml_ms:9.2f} {soup_ms / lxml_ms:7.1f}x  "
+              f"{summary}{'' if same else '  MISMATCH'}")
+
+    print(f"{'all pages':<20} {'':>8} {totals['bs4']:9.2f} {totals['lxml']:9.2f} {totals['bs4'] / totals['lxml']:7.1f}x")
+    if mismatches:
+        print(f"\n{mismatches} case(s) differ between backends")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark HTML parse paths on saved fixtures")
+    parser.add_argument("--repeat", type=int, default=10, help="parses per timing round")
+    args = parser.parse_args()
+    sys.exit(main(args.repeat))
@@ -0,0 +1,117 @@
+# bench_mcp_tools.py (Throughput of the async MCP tools: blocking calls vs offloaded/async calls)
+#
+# Runs offline: a local slow HTTP server stands in for Google and
+# fake_groq_server stands in for Groq. Usage:
+#     python benchmarks/bench_mcp_tools.py --calls 32 --delay 0.5
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_groq_server import LocalHTTPServer, run_fake_groq_server
+
+SERP_HTML = """<html><body>{}</body></html>""".format("".join(
+    f'<div class="tF2Cxc"><a href="https://example.com/{i}"><h3 class="LC20lb">Result {i}</h3></a>'
+    f'<div class="VwiC3b">Snippet {i}</div></div>'
+    for i in range(5)
+))
+
+
+def start_slow_search_server(delay):
+    """Local stand-in for the search engine that answers every GET after `delay` seconds."""
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(delay)
+            body = SERP_HTML.encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = LocalHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+async def timed(label, calls, make_call):
+    start = time.perf_counter()
+    await asyncio.gather(*(make_call(i) for i in range(calls)))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:7.2f}s  {calls / elapsed:7.1f} calls/s")
+    return elapsed
+
+
+async def main(calls, delay):
+    search_url = start_slow_search_server(delay)
+    _, groq_url = run_fake_groq_server(first_token_delay=delay, token_delay=0)
+
+    # Isolated caches (disabled for the LLM) so every call does real work
+    os.environ["CACHE_DIR"] = tempfile.mkdtemp(prefix="bench-cache-")
+    os.environ["LLM_CACHE_DISABLED"] = "1"
+    os.environ["GROQ_API_KEY"] = "bench"
+    os.environ["GROQ_BASE_URL"] = groq_url
+
+    from groq import Groq
+    import http_client
+    import websearch_server
+    import pptgen_server
+    from rate_limiter import groq_limiter
+
+    # Send the scraper's google.com requests to the local stand-in
+    shared_request = http_client.session.request
+
+    def local_request(method, url, *args, **kwargs):
+        return shared_request(method, search_url + "/search?" + url.split("?", 1)[-1], *args, **kwargs)
+
+    http_client.session.request = local_request
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    sync_groq = Groq(api_key="bench")
+    # The account quota isn't what is being measured here; the default one would pace the async calls
+    groq_limiter.configure(requests_per_minute=60000, tokens_per_minute=10 ** 9,
+                           initial_concurrency=calls, max_concurrency=calls)
+
+    print(f"{calls} concurrent calls, {delay}s upstream latency")
+    print("Groq rate limiter opened up to benchmark-sized quotas (no account pacing)\n")
+
+    # Previous behavior: blocking I/O directly inside the coroutine
+    async def blocking_search(i):
+        return websearch_server.google_search(f"blocking query {i}", 5)
+
+    async def blocking_llm(i):
+        return sync_groq.chat.completions.create(
+            messages=[{"role": "user", "content": f"Output Format (JSON) about: blocking {i}"}],
+            model="llama3-70b-8192",
+        ).choices[0].message.content
+
+    before_search = await timed("web_search (blocking requests)", calls, blocking_search)
+    after_search = await timed("web_search (offloaded, pooled)", calls,
+                               lambda i: websearch_server.web_search(f"offloaded query {i}", 5))
+    before_llm = await timed("generate_ppt_content (sync Groq)", calls, blocking_llm)
+    after_llm = await timed("generate_ppt_content (AsyncGroq)", calls,
+                            lambda i: pptgen_server.generate_ppt_content(f"async {i}", "context"))
+
+    print(f"\nconnections: {http_client.connection_stats()['reuse_ratio']:.0%} of requests reused a pooled connection")
+    print(f"web_search speedup:           {before_search / after_search:5.1f}x")
+    print(f"generate_ppt_content speedup: {before_llm / after_llm:5.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark MCP tool throughput under concurrent calls")
+    parser.add_argument("--calls", type=int, default=32, help="concurrent tool calls per scenario")
+    parser.add_argument("--delay", type=float, default=0.5, help="simulated upstream latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.delay))
@@ -0,0 +1,225 @@
+# engine_health.py (Per-engine circuit breakers and health scores shared across threads and processes)
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from search_cache import CACHE_DIR
+
+# Consecutive failures (errors, non-200s or empty parses) that open a breaker
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+# First cool-down after opening; doubles after each failed half-open probe, up to the max
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "60"))
+BREAKER_MAX_OPEN_SECONDS = float(os.getenv("BREAKER_MAX_OPEN_SECONDS", "1800"))
+# How long a half-open probe may run before another caller is allowed to probe
+BREAKER_PROBE_TIMEOUT = float(os.getenv("BREAKER_PROBE_TIMEOUT", "30"))
+# Weight of the newest observation in the moving averages
+HEALTH_EWMA_ALPHA = float(os.getenv("HEALTH_EWMA_ALPHA", "0.2"))
+# Latency (seconds) at which an engine's score is halved
+HEALTH_LATENCY_SCALE = float(os.getenv("HEALTH_LATENCY_SCALE", "2.0"))
+# Half-life of a bad record: engines that stop being tried drift back towards
+# a clean score, so a demoted engine eventually gets traffic again
+HEALTH_DECAY_SECONDS = float(os.getenv("HEALTH_DECAY_SECONDS", "600"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class EngineHealth:
+    """Circuit breaker state and moving averages of success rate, parse yield
+    and latency per engine, stored in SQLite so every worker process sees the
+    same scoreboard.
+
+    A breaker opens after `failure_threshold` consecutive failures. Once the
+    cool-down has passed, one caller is let through as a half-open probe: a
+    success closes the breaker, a failure reopens it for twice as long.
+    """
+
+    def __init__(self, path=None, failure_threshold=BREAKER_FAILURE_THRESHOLD,
+                 open_seconds=BREAKER_OPEN_SECONDS, max_open_seconds=BREAKER_MAX_OPEN_SECONDS,
+                 probe_timeout=BREAKER_PROBE_TIMEOUT):
+        self.path = path or os.path.join(CACHE_DIR, "engine_health.sqlite3")
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self, write=True):
+        """Short-lived connection in one transaction.
+
+        Writers take SQLite's write lock up front (BEGIN IMMEDIATE), so
+        read-modify-write is atomic across processes; readers use a plain
+        deferred transaction, which under WAL never waits on a writer.
+        """
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        try:
+            if not self._initialized:
+                self._init_schema(conn)
+            conn.execute("BEGIN IMMEDIATE" if write else "BEGIN")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def _init_schema(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS engine_health (
+                engine TEXT PRIMARY KEY,
+                state TEXT NOT NULL,
+                consecutive_failures INTEGER NOT NULL,
+                open_seconds REAL NOT NULL,
+                retry_at REAL NOT NULL,
+                successes INTEGER NOT NULL,
+                failures INTEGER NOT NULL,
+                success_rate REAL NOT NULL,
+                yield_rate REAL NOT NULL,
+                latency REAL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._initialized = True
+
+    def _load(self, conn, engine):
+        row = conn.execute("SELECT * FROM engine_health WHERE engine = ?", (engine,)).fetchone()
+        if row is None:
+            # Unknown engines start closed with a perfect record
+            return {
+                "engine": engine, "state": CLOSED, "consecutive_failures": 0,
+                "open_seconds": self.open_seconds, "retry_at": 0.0, "successes": 0, "failures": 0,
+                "success_rate": 1.0, "yield_rate": 1.0, "latency": None, "updated_at": 0.0,
+            }
+        names = [column[0] for column in conn.execute("SELECT * FROM engine_health LIMIT 0").description]
+        return dict(zip(names, row))
+
+    def _save(self, conn, record):
+        columns = list(record)
+        conn.execute(
+            f"INSERT OR REPLACE INTO engine_health ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            [record[column] for column in columns],
+        )
+
+    def allow(self, engine):
+        """Return True if a request to `engine` should be attempted now.
+
+        An open breaker whose cool-down has passed admits exactly one probe.
+        Only that case takes the write lock; everything else is a plain read.
+        """
+        now = time.time()
+        try:
+            with self._connect(write=False) as conn:
+                record = self._load(conn, engine)
+            if record["state"] == CLOSED:
+                return True
+            if now < record["retry_at"]:
+                return False
+            with self._lock, self._connect() as conn:
+                # Checked again under the lock: another caller may have become the probe meanwhile
+                record = self._load(conn, engine)
+                if record["state"] == CLOSED:
+                    return True
+                if now < record["retry_at"]:
+                    return False
+                # Cool-down over (or the previous probe timed out): this caller probes
+                record["state"] = HALF_OPEN
+                record["retry_at"] = now + self.probe_timeout
+                record["updated_at"] = now
+                self._save(conn, record)
+                return True
+        except sqlite3.Error:
+            # Never let the scoreboard take the scrapers down with it
+            return True
+
+    def record(self, engine, ok, latency, yield_rate=None):
+        """Record one attempt: whether it produced usable results, how long it
+        took, and what fraction of the wanted results it parsed."""
+        now = time.time()
+        alpha = HEALTH_EWMA_ALPHA
+        try:
+            with self._lock, self._connect() as conn:
+                record = self._load(conn, engine)
+                record["success_rate"] += alpha * ((1.0 if ok else 0.0) - record["success_rate"])
+                if yield_rate is not None:
+                    record["yield_rate"] += alpha * (min(1.0, yield_rate) - record["yield_rate"])
+                if record["latency"] is None:
+                    record["latency"] = latency
+                else:
+                    record["latency"] += alpha * (latency - record["latency"])
+                record["updated_at"] = now
+
+                if ok:
+                    record["successes"] += 1
+                    record["consecutive_failures"] = 0
+                    record["state"] = CLOSED
+                    record["open_seconds"] = self.open_seconds
+                    record["retry_at"] = 0.0
+                else:
+                    record["failures"] += 1
+                    record["consecutive_failures"] += 1
+                    if record["state"] == HALF_OPEN:
+                        # Probe failed: back off harder before the next one
+                        record["open_seconds"] = min(self.max_open_seconds, record["open_seconds"] * 2)
+                        record["state"] = OPEN
+                        record["retry_at"] = now + record["open_seconds"]
+                    elif record["state"] == CLOSED and record["consecutive_failures"] >= self.failure_threshold:
+                        record["state"] = OPEN
+                        record["retry_at"] = now + record["open_seconds"]
+                self._save(conn, record)
+        except sqlite3.Error:
+            pass
+
+    @staticmethod
+    def _score(record):
+        if record["state"] == OPEN and time.time() < record["retry_at"]:
+            return 0.0
+        weight = 0.5 ** (max(0.0, time.time() - record["updated_at"]) / HEALTH_DECAY_SECONDS)
+        success_rate = 1.0 - weight * (1.0 - record["success_rate"])
+        yield_rate = 1.0 - weight * (1.0 - record["yield_rate"])
+        latency_factor = 1.0 / (1.0 + (record["latency"] or 0.0) / HEALTH_LATENCY_SCALE)
+        return success_rate * (0.5 + 0.5 * yield_rate) * latency_factor
+
+    def scores(self, engines):
+        """Health score in [0, 1] per engine; open breakers score 0."""
+        try:
+            with self._connect(write=False) as conn:
+                return {engine: self._score(self._load(conn, engine)) for engine in engines}
+        except sqlite3.Error:
+            return {engine: 1.0 for engine in engines}
+
+    def rank(self, engines):
+        """Order engine names by live health score, keeping the given order on ties."""
+        scores = self.scores(engines)
+        return sorted(engines, key=lambda engine: -round(scores[engine], 2))
+
+    def snapshot(self):
+        """All known engines with their breaker state and moving averages."""
+        try:
+            with self._connect(write=False) as conn:
+                engines = [row[0] for row in conn.execute("SELECT engine FROM engine_health ORDER BY engine")]
+                records = [self._load(conn, engine) for engine in engines]
+        except sqlite3.Error:
+            return []
+        for record in records:
+            record["score"] = round(self._score(record), 3)
+        return records
+
+    def reset(self, engine=None):
+        """Forget the history of one engine, or of all of them."""
+        with self._lock, self._connect() as conn:
+            if engine is None:
+                conn.execute("DELETE FROM engine_health")
+            else:
+                conn.execute("DELETE FROM engine_health WHERE engine = ?", (engine,))
+
+
+# Shared by the web search engines and the image sources
+engine_health = EngineHealth()
@@ -0,0 +1,247 @@
+# fake_groq_server.py (Local stand-in for the Groq chat completions API, for offline testing)
+#
+# Point the app at it with GROQ_BASE_URL=http://127.0.0.1:8765 (the Groq SDK reads it).
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def canned_slides(topic, num_slides):
+    """Slide text in the "Title:" format app.py asks the model for."""
+    blocks = [f"Title: {topic}\nAn overview of {topic}\nWhy it matters today\nWhat this deck covers"]
+    for i in range(1, max(1, num_slides - 1)):
+        blocks.append(
+            f"Title: {topic} - Key Point {i}\n"
+            f"Fact {i}.1 about {topic} backed by research\n"
+            f"Fact {i}.2 with a supporting statistic\n"
+            f"Fact {i}.3 and what it means in practice"
+            + ("\n[FLOWCHART]" if i == 2 else "")
+        )
+    blocks.append(f"Title: Conclusion\nSummary of {topic}\nActionable takeaway one\nActionable takeaway two")
+    return "\n\n".join(blocks[:num_slides])
+
+
+def canned_json_deck(topic, num_slides):
+    """A JSON deck in the shape the MCP servers ask the model for."""
+    return json.dumps({
+        "title": topic,
+        "subtitle": f"An overview of {topic}",
+        "slides": [
+            {"title": f"{topic} - Point {i}", "points": [f"Point {i}.{j} about {topic}" for j in range(1, 4)]}
+            for i in range(1, num_slides + 1)
+        ],
+    }, indent=2)
+
+
+def canned_reply(messages):
+    """Build a deterministic reply from the last user message."""
+    prompt = messages[-1]["content"] if messages else ""
+    topic_match = re.search(r'about:?\s*"?([^"\n:]+)"?', prompt)
+    topic = topic_match.group(1).strip() if topic_match else "the topic"
+    count_match = re.search(r"(\d+)[ -]slides?", prompt)
+    num_slides = int(count_match.group(1)) if count_match else 5
+    if "json" in prompt.lower():
+        return canned_json_deck(topic, num_slides)
+    return canned_slides(topic, num_slides)
+
+
+class AccountLimits:
+    """Requests-per-minute and concurrency limits that answer 429 when exceeded, like a real account."""
+
+    def __init__(self, requests_per_minute=0, max_concurrency=0):
+        self.requests_per_minute = requests_per_minute
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.rejected = 0
+        self._recent = deque()
+        self._lock = threading.Lock()
+
+    def admit(self):
+        """None if the request may run (call done() after), else seconds for Retry-After."""
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= 60:
+                self._recent.popleft()
+            if self.requests_per_minute and len(self._recent) >= self.requests_per_minute:
+                self.rejected += 1
+                return max(1, int(60 - (now - self._recent[0])) + 1)
+            if self.max_concurrency and self.in_flight >= self.max_concurrency:
+                self.rejected += 1
+                return 1
+            self._recent.append(now)
+            self.in_flight += 1
+            return None
+
+    def done(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    """Serves POST /openai/v1/chat/completions, streaming or not."""
+
+    # Overridden per server by run_fake_groq_server
+    first_token_delay = 0.2
+    token_delay = 0.01
+    limits = AccountLimits()
+    # Share of requests answered with a 503, for failure injection
+    failure_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.failure_rate and random.random() < self.failure_rate:
+            self._send_json(503, {"error": {"message": "Service unavailable (injected)", "type": "internal_server_error"}})
+            return
+        retry_after = self.limits.admit()
+        if retry_after is not None:
+            self._send_json(429, {"error": {
+                "message": "Rate limit reached for requests. Please try again later.",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }}, headers={"Retry-After": str(retry_after)})
+            return
+        try:
+            self._complete(body)
+        finally:
+            self.limits.done()
+
+    def _complete(self, body):
+        content = canned_reply(body.get("messages", []))
+        # Like the real API, a reply longer than max_tokens is cut off mid-output
+        tokens = re.findall(r"\S+\s*|\s+", content)
+        finish_reason = "stop"
+        if body.get("max_tokens") and len(tokens) > body["max_tokens"]:
+            content, finish_reason = "".join(tokens[:body["max_tokens"]]), "length"
+        model = body.get("model", "fake-model")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        time.sleep(self.first_token_delay)
+
+        if body.get("stream"):
+            self._stream(completion_id, model, content, finish_reason)
+        else:
+            time.sleep(self.token_delay * len(re.findall(r"\S+\s*", content)))
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": finish_reason,
+                }],
+                "usage": self._usage(body, content),
+            })
+
+    def _stream(self, completion_id, model, content, finish_reason="stop"):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        def send(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        for token in re.findall(r"\S+\s*|\s+", content):
+            send({"content": token})
+            time.sleep(self.token_delay)
+        send({}, finish_reason=finish_reason)
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+    def _usage(self, body, content):
+        prompt_tokens = sum(len(m.get("content", "").split()) for m in body.get("messages", []))
+        completion_tokens = len(content.split())
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class LocalHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server for local stand-ins of remote services."""
+
+    daemon_threads = True
+    # Room for bursts of concurrent clients without connection resets
+    request_queue_size = 256
+
+    def handle_error(self, request, client_address):
+        # Clients that hang up early (a fetch that stops reading, a timeout) are expected, not errors
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+def run_fake_groq_server(port=0, first_token_delay=0.2, token_delay=0.01, requests_per_minute=0, max_concurrency=0,
+                         failure_rate=0.0):
+    """Start the fake server on a background thread; returns (server, base_url).
+
+    Non-zero `requests_per_minute` / `max_concurrency` make it answer 429 with
+    Retry-After past those limits; `server.limits.rejected` counts the 429s.
+    `failure_rate` is the share of requests answered with a 503.
+    """
+    limits = AccountLimits(requests_per_minute, max_concurrency)
+    handler = type("ConfiguredFakeGroqHandler", (FakeGroqHandler,), {
+        "first_token_delay": first_token_delay,
+        "token_delay": token_delay,
+        "limits": limits,
+        "failure_rate": failure_rate,
+    })
+    server = LocalHTTPServer(("127.0.0.1", port), handler)
+    server.limits = limits
+    threading.Thread(target=server.serve_forever, name="fake-groq", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Groq chat completions server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds between streamed tokens")
+    parser.add_argument("--rpm", type=int, default=0, help="answer 429 past this many requests per minute (0: no limit)")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="answer 429 past this many requests in flight")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with a 503")
+    args = parser.parse_args()
+
+    server, base_url = run_fake_groq_server(args.port, args.first_token_delay, args.token_delay,
+                                            args.rpm, args.max_concurrency, args.failure_rate)
+    print(f"Fake Groq server listening on {base_url} (set GROQ_BASE_URL={base_url})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
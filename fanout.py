@@ -0,0 +1,171 @@
+# fanout.py (Bounded concurrent fan-out with per-host limits and a global deadline)
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+MAX_WORKERS = int(os.getenv("FANOUT_MAX_WORKERS", "8"))
+PER_HOST_LIMIT = int(os.getenv("FANOUT_PER_HOST_LIMIT", "4"))
+# Workers for blocking calls made from MCP servers' event loops (run_blocking)
+BLOCKING_MAX_WORKERS = int(os.getenv("BLOCKING_MAX_WORKERS", "8"))
+
+_executor = None
+_blocking_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the process-wide fan-out pool, creating it on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="fanout")
+        return _executor
+
+
+def get_blocking_executor():
+    """Return the pool run_blocking uses; separate so MCP tool calls can't starve fan-outs."""
+    global _blocking_executor
+    with _executor_lock:
+        if _blocking_executor is None:
+            _blocking_executor = ThreadPoolExecutor(max_workers=BLOCKING_MAX_WORKERS, thread_name_prefix="blocking")
+        return _blocking_executor
+
+
+async def run_blocking(fn, *args, **kwargs):
+    """Run a blocking call on its own bounded pool without stalling the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_blocking_executor(), lambda: fn(*args, **kwargs))
+
+
+def host_of(url):
+    """Return the lower-cased host of a URL, or the value itself if it has none."""
+    host = urlparse(url).netloc.lower()
+    return host or url
+
+
+class HostLimiter:
+    """Caps how many requests run against the same host at once."""
+
+    def __init__(self, limit=PER_HOST_LIMIT):
+        self.limit = limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, host):
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.limit)
+            return self._semaphores[host]
+
+    def acquire(self, url):
+        """Take one of the host's slots and return the callable that gives it back."""
+        semaphore = self._semaphore(host_of(url))
+        semaphore.acquire()
+        return semaphore.release
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the per-host slots for the duration of the block."""
+        release = self.acquire(url)
+        try:
+            yield
+        finally:
+            release()
+
+
+# Shared by every fetch path so the limit holds across concurrent fan-outs
+host_limits = HostLimiter()
+
+
+class FanOut:
+    """Run independent calls on the shared pool and collect whatever finishes before the deadline.
+
+    Calls still queued when the deadline passes are cancelled so they don't
+    hold pool workers for a result nobody will read.
+    """
+
+    def __init__(self, deadline_seconds, executor=None):
+        self.deadline = time.monotonic() + deadline_seconds
+        self._executor = executor or get_executor()
+        self._futures = {}
+
+    def remaining(self):
+        """Seconds left before the deadline (never negative)."""
+        return max(0.0, self.deadline - time.monotonic())
+
+    def extend_deadline(self, seconds):
+        """Push the deadline out to at least `seconds` from now."""
+        self.deadline = max(self.deadline, time.monotonic() + seconds)
+
+    def submit(self, key, fn, *args, **kwargs):
+        """Schedule fn(*args, **kwargs) under the given key."""
+        future = self._executor.submit(fn, *args, **kwargs)
+        self._futures[key] = future
+        return future
+
+    def __contains__(self, key):
+        return key in self._futures
+
+    def result(self, key, default=None):
+        """Wait for one call until the deadline and return its result, or default."""
+        future = self._futures.get(key)
+        if future is None:
+            return default
+        try:
+            return future.result(timeout=self.remaining())
+        except TimeoutError:
+            self.cancel_pending()
+            return default
+        except Exception:
+            return default
+
+    def as_completed(self):
+        """Yield (key, result) pairs as calls finish, stopping at the deadline.
+
+        Calls submitted while iterating are picked up as well. Calls that raise
+        yield None as their result.
+        """
+        seen = set()
+        while True:
+            pending = {f: k for k, f in self._futures.items() if k not in seen}
+            if not pending:
+                return
+            done, _ = wait(pending, timeout=self.remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                self.cancel_pending()
+                return
+            for future in done:
+                key = pending[future]
+                seen.add(key)
+                try:
+                    yield key, future.result()
+                except Exception:
+                    yield key, None
+
+    def pending(self):
+        """Keys of calls that have not finished yet."""
+        return [key for key, future in self._futures.items() if not future.done()]
+
+    def cancel(self, key):
+        """Cancel one call if it hasn't started; True if it was dropped (and may be submitted again)."""
+        future = self._futures.get(key)
+        if future is None or not future.cancel():
+            return False
+        del self._futures[key]
+        return True
+
+    def cancel_pending(self):
+        """Cancel calls that haven't finished and return their keys.
+
+        Calls that haven't started are dropped (and may be submitted again);
+        calls already running can't be interrupted and finish in the background.
+        """
+        unfinished = self.pending()
+        for key in unfinished:
+            if self._futures[key].cancel():
+                del self._futures[key]
+        return unfinished
@@ -0,0 +1,353 @@
+# html_parser.py (Pluggable HTML parsing backends with precompiled CSS selector lists)
+#
+# HTML_PARSER=lxml (default) parses with lxml and evaluates each selector list
+# as one compiled XPath query. HTML_PARSER=bs4 keeps the BeautifulSoup
+# 'html.parser' path. Both backends return the same elements for the selector
+# subset supported here.
+import codecs
+import os
+import re
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml is in requirements.txt, but keep the bs4 path usable without it
+    lxml = None
+
+HTML_PARSER = os.getenv("HTML_PARSER", "lxml")
+
+# The CSS subset the scrapers use: tag, .class, #id, [attr], [attr="v"],
+# [attr^="v"], [attr*="v"], descendant and child combinators, and comma groups
+_COMPOUND = re.compile(r"""(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:\.[\w-]+|\#[\w-]+|\[[^\]]+\])*)""")
+_PART = re.compile(r"""\.(?P<cls>[\w-]+)|\#(?P<id>[\w-]+)|\[(?P<attr>[\w-]+)(?:(?P<op>[\^*]?=)(?P<val>"[^"]*"|'[^']*'|[^\]]*))?\]""")
+
+
+def _xpath_literal(value):
+    if "'" not in value:
+        return f"'{value}'"
+    return "concat(" + ", \"'\", ".join(f"'{piece}'" for piece in value.split("'")) + ")"
+
+
+def _compound_to_xpath(compound):
+    """Translate one compound selector such as 'div.b_caption' to 'div[...]'."""
+    match = _COMPOUND.fullmatch(compound)
+    if not compound or not match:
+        raise ValueError(f"Unsupported CSS selector: {compound!r}")
+    predicates = []
+    for part in _PART.finditer(match.group("rest")):
+        if part.group("cls"):
+            predicates.append(f"contains(concat(' ', normalize-space(@class), ' '), ' {part.group('cls')} ')")
+        elif part.group("id"):
+            predicates.append(f"@id={_xpath_literal(part.group('id'))}")
+        else:
+            attr, op, value = part.group("attr"), part.group("op"), part.group("val") or ""
+            if value[:1] in ("'", '"'):
+                value = value[1:-1]
+            if op is None:
+                predicates.append(f"@{attr}")
+            elif op == "=":
+                predicates.append(f"@{attr}={_xpath_literal(value)}")
+            elif op == "^=":
+                predicates.append(f"starts-with(@{attr}, {_xpath_literal(value)})")
+            else:
+                predicates.append(f"contains(@{attr}, {_xpath_literal(value)})")
+    return (match.group("tag") or "*").lower() + "".join(f"[{p}]" for p in predicates)
+
+
+def _steps(selector):
+    """Split 'a.x > b c' into [(None, 'a.x'), ('>', 'b'), (' ', 'c')]."""
+    steps, combinator = [], None
+    for token in re.findall(r"\s*>\s*|\s+|[^\s>]+", selector.strip()):
+        if token.strip() == ">":
+            combinator = ">"
+        elif not token.strip():
+            combinator = combinator or " "
+        else:
+            steps.append((combinator, token))
+            combinator = None
+    if not steps:
+        raise ValueError(f"Empty CSS selector: {selector!r}")
+    return steps
+
+
+def _chain(steps, index):
+    """Step `index` of a selector, constrained by the steps before it via parent/ancestor axes."""
+    node = _compound_to_xpath(steps[index][1])
+    if index > 0:
+        axis = "parent" if steps[index][0] == ">" else "ancestor"
+        node += f"[{axis}::{_chain(steps, index - 1)}]"
+    return node
+
+
+def css_to_xpath(selector):
+    """Return (search, test) XPath strings for a CSS selector group.
+
+    `search` finds matching descendants of the context node; `test` is true
+    when the context node itself matches.
+    """
+    searches, tests = [], []
+    for alternative in selector.split(","):
+        steps = _steps(alternative)
+        searches.append("." + "".join(
+            ("/" if combinator == ">" else "//") + _compound_to_xpath(compound) for combinator, compound in steps
+        ))
+        tests.append(f"self::{_chain(steps, len(steps) - 1)}")
+    return " | ".join(searches), " or ".join(tests)
+
+
+class SelectorList:
+    """Ordered CSS selector alternatives, compiled once.
+
+    The engine configs list fallbacks like ["div.g", "div.Gx5Zad"]: the first
+    alternative that matches anything wins. With lxml every alternative is
+    folded into a single XPath union, so the tree is walked once per list
+    instead of once per selector; each hit is then ranked by the first
+    alternative it satisfies.
+    """
+
+    def __init__(self, selectors):
+        if isinstance(selectors, str):
+            selectors = [selectors]
+        self.selectors = list(selectors)
+        searches, tests = zip(*(css_to_xpath(selector) for selector in self.selectors))
+        self.search_xpath = " | ".join(searches)
+        self.test_xpaths = list(tests)
+        if lxml is not None:
+            self._search = etree.XPath(self.search_xpath)
+            self._tests = [etree.XPath(f"boolean({test})") for test in tests]
+
+    def __repr__(self):
+        return f"SelectorList({self.selectors!r})"
+
+    def rank(self, element):
+        """Index of the first alternative the element matches (lxml elements only)."""
+        if len(self._tests) == 1:
+            return 0
+        return next(index for index, test in enumerate(self._tests) if test(element))
+
+
+# Elements with no end tag; they never open a scope
+VOID_TAGS = frozenset(["area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+                       "param", "source", "track", "wbr"])
+# Elements whose contents are never text
+SKIP_TAGS = frozenset(["script", "style", "noscript", "template", "svg", "head"])
+# Elements that end a run of words (so adjacent paragraphs don't run together)
+BLOCK_TAGS = frozenset(["p", "div", "li", "ul", "ol", "br", "h1", "h2", "h3", "h4", "h5", "h6", "article",
+                        "main", "section", "header", "footer", "table", "tr", "td", "th", "blockquote", "pre"])
+
+
+class TextCollector:
+    """Parser target that keeps the text of content elements as the page streams in.
+
+    An element is content if its tag is in `content_tags` or it has a class in
+    `content_classes`; text nested in several content elements is kept once.
+    Text outside any content element is kept too (up to `max_chars`) as a
+    fallback for pages without such elements. `enough` turns True once
+    `max_chars` of content text has been collected, so the caller can stop
+    reading.
+    """
+
+    def __init__(self, content_tags, content_classes=(), max_chars=5000):
+        self.content_tags = frozenset(content_tags)
+        self.content_classes = frozenset(content_classes)
+        self.max_chars = max_chars
+        self._stack = []
+        self._content_depth = 0
+        self._skip_depth = 0
+        self._content, self._content_chars = [], 0
+        self._fallback, self._fallback_chars = [], 0
+        self.saw_content = False
+
+    @property
+    def enough(self):
+        return self._content_chars >= self.max_chars
+
+    def start(self, tag, attrib):
+        tag = tag.lower()
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self.data(" ")
+            return
+        classes = (attrib.get("class") or "").split()
+        is_content = tag in self.content_tags or any(c in self.content_classes for c in classes)
+        is_skip = tag in SKIP_TAGS
+        self._stack.append((tag, is_content, is_skip))
+        self._content_depth += is_content
+        self._skip_depth += is_skip
+        self.saw_content = self.saw_content or is_content
+        if tag in BLOCK_TAGS:
+            self.data(" ")
+
+    def end(self, tag):
+        tag = tag.lower()
+        if tag in VOID_TAGS or not any(open_tag == tag for open_tag, _, _ in self._stack):
+            return
+        # Close anything left open inside this element as well
+        while self._stack:
+            open_tag, is_content, is_skip = self._stack.pop()
+            self._content_depth -= is_content
+            self._skip_depth -= is_skip
+            if open_tag == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self.data(" ")
+
+    def data(self, text):
+        if self._skip_depth:
+            return
+        # Count roughly what survives whitespace collapsing
+        size = len(text.strip())
+        if self._content_depth:
+            if self._content_chars < self.max_chars:
+                self._content.append(text)
+                self._content_chars += size
+        elif self._fallback_chars < self.max_chars:
+            self._fallback.append(text)
+            self._fallback_chars += size
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return self.text()
+
+    def text(self):
+        """Collected text with whitespace collapsed; page text if there were no content elements."""
+        pieces = self._content if self.saw_content else self._fallback
+        return re.sub(r"\s+", " ", "".join(pieces)).strip()
+
+
+class _StdlibStreamParser(HTMLParser):
+    """Incremental html.parser driver for a TextCollector, fed with bytes."""
+
+    def __init__(self, target, encoding):
+        super().__init__(convert_charrefs=True)
+        self.target = target
+        self._decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+
+    def feed(self, data):
+        super().feed(self._decoder.decode(data) if isinstance(data, bytes) else data)
+
+    def handle_starttag(self, tag, attrs):
+        self.target.start(tag, {name: value or "" for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        self.target.start(tag, {name: value or "" for name, value in attrs})
+        self.target.end(tag)
+
+    def handle_endtag(self, tag):
+        self.target.end(tag)
+
+    def handle_data(self, data):
+        self.target.data(data)
+
+    def close(self):
+        super().feed(self._decoder.decode(b"", final=True))
+        super().close()
+        return self.target.close()
+
+
+class LxmlBackend:
+    name = "lxml"
+
+    def parse(self, html):
+        if not html or not html.strip():
+            html = "<html></html>"
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # Unicode strings that carry an XML encoding declaration must be parsed as bytes
+            return lxml.html.document_fromstring(html.encode("utf-8"))
+
+    def select_ranked(self, node, selector_list):
+        """Every element matched by any alternative, best alternative first, then document order."""
+        hits = selector_list._search(node)
+        if len(selector_list.selectors) == 1:
+            return hits
+        return sorted(hits, key=selector_list.rank)
+
+    def select(self, node, selector_list):
+        """Elements of the first alternative that matches anything, in document order."""
+        hits = selector_list._search(node)
+        if len(selector_list.selectors) == 1 or not hits:
+            return hits
+        ranks = [selector_list.rank(hit) for hit in hits]
+        best = min(ranks)
+        return [hit for hit, rank in zip(hits, ranks) if rank == best]
+
+    def select_one(self, node, selector_list):
+        """First element of the first alternative that matches, or None."""
+        hits = self.select(node, selector_list)
+        return hits[0] if hits else None
+
+    def text(self, element):
+        return element.text_content()
+
+    def attr(self, element, name):
+        return element.get(name)
+
+    def strip_tags(self, root, *tags):
+        """Remove elements (and their content) such as script and style."""
+        etree.strip_elements(root, *tags, with_tail=False)
+
+    def stream_parser(self, target, encoding=None):
+        """Push parser that feeds `target` as bytes arrive, without building a tree."""
+        return etree.HTMLParser(target=target, encoding=encoding or "utf-8", recover=True)
+
+
+class SoupBackend:
+    name = "bs4"
+
+    def parse(self, html):
+        return BeautifulSoup(html or "", "html.parser")
+
+    def select_ranked(self, node, selector_list):
+        seen, ranked = set(), []
+        for selector in selector_list.selectors:
+            for element in node.select(selector):
+                if id(element) not in seen:
+                    seen.add(id(element))
+                    ranked.append(element)
+        return ranked
+
+    def select(self, node, selector_list):
+        for selector in selector_list.selectors:
+            hits = node.select(selector)
+            if hits:
+                return hits
+        return []
+
+    def select_one(self, node, selector_list):
+        for selector in selector_list.selectors:
+            hit = node.select_one(selector)
+            if hit is not None:
+                return hit
+        return None
+
+    def text(self, element):
+        return element.get_text()
+
+    def attr(self, element, name):
+        return element.get(name)
+
+    def strip_tags(self, root, *tags):
+        for element in root(list(tags)):
+            element.extract()
+
+    def stream_parser(self, target, encoding=None):
+        return _StdlibStreamParser(target, encoding)
+
+
+def get_backend(name=None):
+    """Return the named backend, falling back to bs4 when lxml is unavailable."""
+    name = name or HTML_PARSER
+    if name == "lxml" and lxml is not None:
+        return LxmlBackend()
+    return SoupBackend()
+
+
+# Used by the search, extraction and image scrapers
+parser = get_backend()
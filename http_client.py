@@ -0,0 +1,176 @@
+# http_client.py (Shared HTTP client with per-host keep-alive pools, retries and connection metrics)
+import os
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util.retry import Retry
+
+from fanout import host_limits
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "1"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.3"))
+# Number of distinct hosts to keep pools for, and connections kept alive per host
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "32"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "10"))
+
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+class ConnectionMetrics:
+    """Counts requests and new TCP/TLS connections per host."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}
+        self._connects = {}
+
+    def record_request(self, host):
+        with self._lock:
+            self._requests[host] = self._requests.get(host, 0) + 1
+
+    def record_connect(self, host):
+        with self._lock:
+            self._connects[host] = self._connects.get(host, 0) + 1
+
+    def snapshot(self):
+        """Totals plus a per-host breakdown of new vs reused connections."""
+        with self._lock:
+            per_host = {
+                host: {
+                    "requests": count,
+                    "new_connections": self._connects.get(host, 0),
+                    "reused_connections": max(0, count - self._connects.get(host, 0)),
+                }
+                for host, count in self._requests.items()
+            }
+        requests_total = sum(h["requests"] for h in per_host.values())
+        new_total = sum(h["new_connections"] for h in per_host.values())
+        return {
+            "requests": requests_total,
+            "new_connections": new_total,
+            "reused_connections": max(0, requests_total - new_total),
+            "reuse_ratio": (requests_total - new_total) / requests_total if requests_total else 0.0,
+            "per_host": per_host,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._requests.clear()
+            self._connects.clear()
+
+
+metrics = ConnectionMetrics()
+
+
+class _CountingHTTPConnection(HTTPConnection):
+    def connect(self):
+        metrics.record_connect(self.host)
+        super().connect()
+
+
+class _CountingHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        metrics.record_connect(self.host)
+        super().connect()
+
+
+class _CountingHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CountingHTTPConnection
+
+
+class _CountingHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CountingHTTPSConnection
+
+
+class PooledAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report to `metrics`."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CountingHTTPConnectionPool,
+            "https": _CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        metrics.record_request(urlparse(request.url).hostname or "")
+        return super().send(request, **kwargs)
+
+
+def build_session():
+    """A requests.Session with keep-alive pools per host and the configured retry policy."""
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=HTTP_RETRIES,
+        backoff_factor=HTTP_RETRY_BACKOFF,
+        # 429 is left to the callers: for the scrapers it means we're blocked, not busy
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "HEAD"]),
+        raise_on_status=False,
+    )
+    adapter = PooledAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+    new_session = requests.Session()
+    new_session.mount("http://", adapter)
+    new_session.mount("https://", adapter)
+    new_session.headers["User-Agent"] = DEFAULT_USER_AGENT
+    return new_session
+
+
+# Shared by every outbound fetch in the app and the search servers
+session = build_session()
+
+
+def _release_on_close(response, release):
+    """Make closing the response (directly or by leaving its `with` block) give back its host slot."""
+    close = response.close
+    released = []
+
+    def close_and_release():
+        try:
+            close()
+        finally:
+            if not released:
+                released.append(True)
+                release()
+
+    response.close = close_and_release
+    return response
+
+
+def get(url, headers=None, timeout=None, stream=False, **kwargs):
+    """GET through the shared session, holding a per-host concurrency slot.
+
+    `timeout` defaults to (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT); a single
+    number overrides the read timeout only.
+
+    With `stream=True` the body is still unread on return, so the slot is held
+    until the response is closed; use it as a context manager:
+        with http_client.get(url, stream=True) as response: ...
+    """
+    if timeout is None:
+        timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+    elif not isinstance(timeout, tuple):
+        timeout = (min(HTTP_CONNECT_TIMEOUT, timeout), timeout)
+    if not stream:
+        with host_limits.slot(url):
+            return session.get(url, headers=headers, timeout=timeout, **kwargs)
+
+    release = host_limits.acquire(url)
+    try:
+        response = session.get(url, headers=headers, timeout=timeout, stream=True, **kwargs)
+    except BaseException:
+        release()
+        raise
+    return _release_on_close(response, release)
+
+
+def connection_stats():
+    """New vs reused connection counts since startup (or the last reset)."""
+    return metrics.snapshot()
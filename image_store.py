@@ -0,0 +1,175 @@
+# image_store.py (Content-addressed local image store with downscaling to slide placement size)
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from io import BytesIO
+
+from PIL import Image
+
+from search_cache import CACHE_DIR, normalize_query
+
+# Images are placed 3 inches wide on the slide; keep enough pixels for that at IMAGE_STORE_DPI
+PLACEMENT_WIDTH_INCHES = 3
+IMAGE_STORE_DPI = int(os.getenv("IMAGE_STORE_DPI", "150"))
+IMAGE_STORE_JPEG_QUALITY = int(os.getenv("IMAGE_STORE_JPEG_QUALITY", "85"))
+IMAGE_STORE_MAX_ENTRIES = int(os.getenv("IMAGE_STORE_MAX_ENTRIES", "5000"))
+
+# Image bytes ready to embed, with the dimensions recorded when they were stored
+StoredImage = namedtuple("StoredImage", ["data", "width", "height", "sha256"])
+
+
+def topic_key(topic, use_flowchart=False):
+    """Index key for a slide topic, normalized like search queries."""
+    return f"{'flowchart' if use_flowchart else 'image'}:{normalize_query(topic)}"
+
+
+def prepare_image(raw_bytes, max_width=PLACEMENT_WIDTH_INCHES * IMAGE_STORE_DPI):
+    """Decode an image once, downscale it to max_width and re-encode it.
+
+    Returns (data, width, height), or None if the bytes are not a readable image.
+    """
+    try:
+        img = Image.open(BytesIO(raw_bytes))
+        img.load()
+    except Exception:
+        return None
+
+    original_format = img.format
+    resized = img.width > max_width
+    if resized:
+        img = img.resize((max_width, max(1, round(img.height * max_width / img.width))), Image.LANCZOS)
+
+    out = BytesIO()
+    if img.mode in ("RGBA", "LA", "P"):
+        img.save(out, format="PNG", optimize=True)
+    else:
+        img.convert("RGB").save(out, format="JPEG", quality=IMAGE_STORE_JPEG_QUALITY, optimize=True)
+    data = out.getvalue()
+
+    # Small originals sometimes encode smaller than our re-encode; keep whichever is smaller
+    if not resized and original_format in ("JPEG", "PNG") and len(raw_bytes) < len(data):
+        data = raw_bytes
+    return data, img.width, img.height
+
+
+class ImageStore:
+    """Processed slide images on disk, addressed by SHA-256 and indexed by topic."""
+
+    def __init__(self, root=None, max_entries=IMAGE_STORE_MAX_ENTRIES):
+        self.root = root or os.path.join(CACHE_DIR, "images")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        if not self._initialized:
+            os.makedirs(self.root, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.root, "index.sqlite3"), timeout=10)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """CREATE TABLE IF NOT EXISTS blobs (
+                        sha256 TEXT PRIMARY KEY,
+                        width INTEGER NOT NULL,
+                        height INTEGER NOT NULL
+                    )"""
+                )
+                conn.execute(
+                    """CREATE TABLE IF NOT EXISTS topics (
+                        key TEXT PRIMARY KEY,
+                        sha256 TEXT NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )"""
+                )
+                self._initialized = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _blob_path(self, sha256):
+        return os.path.join(self.root, sha256[:2], sha256)
+
+    def get(self, topic, use_flowchart=False):
+        """Return the StoredImage for a topic, or None if it hasn't been stored."""
+        key = topic_key(topic, use_flowchart)
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT b.sha256, b.width, b.height FROM topics t JOIN blobs b ON b.sha256 = t.sha256 WHERE t.key = ?",
+                    (key,),
+                ).fetchone()
+                if row is None:
+                    return None
+                conn.execute("UPDATE topics SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            with open(self._blob_path(row[0]), "rb") as f:
+                return StoredImage(f.read(), row[1], row[2], row[0])
+        except (sqlite3.Error, OSError):
+            return None
+
+    def put(self, topic, use_flowchart, raw_bytes):
+        """Validate, downscale and store downloaded image bytes under the topic.
+
+        Returns the StoredImage, or None if the bytes are not a valid image.
+        """
+        sha256 = hashlib.sha256(raw_bytes).hexdigest()
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT width, height FROM blobs WHERE sha256 = ?", (sha256,)).fetchone()
+            if row is not None:
+                # Same download seen before under another topic: reuse the processed blob
+                with open(self._blob_path(sha256), "rb") as f:
+                    stored = StoredImage(f.read(), row[0], row[1], sha256)
+            else:
+                prepared = prepare_image(raw_bytes)
+                if prepared is None:
+                    return None
+                data, width, height = prepared
+                path = self._blob_path(sha256)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                stored = StoredImage(data, width, height, sha256)
+
+            with self._connect() as conn:
+                conn.execute("INSERT OR IGNORE INTO blobs (sha256, width, height) VALUES (?, ?, ?)",
+                             (sha256, stored.width, stored.height))
+                conn.execute("INSERT OR REPLACE INTO topics (key, sha256, accessed_at) VALUES (?, ?, ?)",
+                             (topic_key(topic, use_flowchart), sha256, time.time()))
+            self._evict()
+            return stored
+        except (sqlite3.Error, OSError):
+            # The image itself is fine even if the store isn't writable
+            prepared = prepare_image(raw_bytes)
+            return StoredImage(prepared[0], prepared[1], prepared[2], sha256) if prepared else None
+
+    def _evict(self):
+        """Drop least recently used topics beyond max_entries and delete orphaned blobs."""
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """DELETE FROM topics WHERE key IN (
+                    SELECT key FROM topics ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            orphans = conn.execute(
+                "SELECT sha256 FROM blobs WHERE sha256 NOT IN (SELECT sha256 FROM topics)"
+            ).fetchall()
+            for (sha256,) in orphans:
+                conn.execute("DELETE FROM blobs WHERE sha256 = ?", (sha256,))
+                try:
+                    os.remove(self._blob_path(sha256))
+                except OSError:
+                    pass
+
+
+# Shared instance used by get_image_for_topic
+image_store = ImageStore()
@@ -0,0 +1,140 @@
+# job_queue.py (Background jobs with IDs, progress events and stored results, so UI reruns neither block nor redo work)
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Jobs that run at once; further submissions wait in the pool's queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+# How long a finished job and its result stay available for polling, in seconds
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "1800"))
+# Finished jobs kept at most, oldest dropped first
+JOB_MAX_FINISHED = int(os.getenv("JOB_MAX_FINISHED", "100"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+def job_key(*args, **kwargs):
+    """Stable key for a job's parameters; equal keys mean duplicate submissions."""
+    payload = json.dumps([args, kwargs], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Job:
+    """One background run: its status, progress events and eventual result or error."""
+
+    def __init__(self, key, owner=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        # Token of whoever started the job; joiners keep their own
+        self.owner = owner
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        # Duplicate submissions that joined this job instead of starting their own
+        self.joined = 0
+        self._events = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def report(self, label, **details):
+        """Progress callback handed to the job function: a label plus optional details."""
+        with self._lock:
+            self._events.append({"time": time.time(), "label": label, **details})
+
+    def events(self, since=0):
+        """Progress events from index `since` on, for incremental polling."""
+        with self._lock:
+            return self._events[since:]
+
+    @property
+    def is_finished(self):
+        return self.status in (DONE, FAILED)
+
+    def wait(self, timeout=None):
+        """Block until the job finishes or `timeout` passes; True if it finished."""
+        return self._done.wait(timeout)
+
+    def elapsed(self):
+        return (self.finished or time.time()) - (self.started or self.created)
+
+
+class JobQueue:
+    """Runs job functions on a worker pool and keeps their results for polling by ID."""
+
+    def __init__(self, max_workers=JOB_WORKERS, result_ttl=JOB_RESULT_TTL, max_finished=JOB_MAX_FINISHED):
+        self.result_ttl = result_ttl
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, fn, *args, owner=None, **kwargs):
+        """Run fn(*args, on_progress=job.report, **kwargs) in the background and return its Job.
+
+        If a job with the same key is still queued or running, that job is
+        returned instead, so duplicate clicks and reruns share one run.
+        `owner` is recorded on a new job only, so the submitter can tell its
+        own job from one it joined.
+        """
+        with self._lock:
+            self._expire()
+            existing = self._in_flight.get(key)
+            if existing is not None:
+                existing.joined += 1
+                return existing
+            job = Job(key, owner)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = RUNNING
+        job.started = time.time()
+        try:
+            job.result = fn(*args, on_progress=job.report, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                if self._in_flight.get(job.key) is job:
+                    del self._in_flight[job.key]
+            job._done.set()
+
+    def get(self, job_id):
+        """The job with this ID, or None if it is unknown or has expired."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _expire(self):
+        finished = sorted((job for job in self._jobs.values() if job.is_finished), key=lambda job: job.finished)
+        cutoff = time.time() - self.result_ttl
+        excess = len(finished) - self.max_finished
+        for index, job in enumerate(finished):
+            if job.finished < cutoff or index < excess:
+                del self._jobs[job.id]
+
+    def stats(self):
+        """Job counts by status, plus how many submissions joined an existing job."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        for job in jobs:
+            counts[job.status] += 1
+        counts["joined"] = sum(job.joined for job in jobs)
+        return counts
+
+
+# One queue per process, shared by every Streamlit session
+job_queue = JobQueue()
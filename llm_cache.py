@@ -0,0 +1,237 @@
+# llm_cache.py (Shared LLM completion cache keyed by a fingerprint of the request)
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from search_cache import CACHE_DIR
+from rate_limiter import PRIORITY_INTERACTIVE, estimate_request_tokens, groq_limiter
+from single_flight import single_flight
+
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def prompt_fingerprint(model, messages, temperature, max_tokens, response_format=None):
+    """SHA-256 over everything that determines the completion."""
+    request = {"model": model, "messages": messages, "temperature": temperature, "max_tokens": max_tokens}
+    if response_format is not None:
+        # JSON mode changes the reply; plain-text keys stay as they were
+        request["response_format"] = response_format
+    payload = json.dumps(
+        request,
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """Completion text stored in SQLite with LRU eviction by entry count and total size."""
+
+    def __init__(self, path=None, max_entries=LLM_CACHE_MAX_ENTRIES, max_bytes=LLM_CACHE_MAX_BYTES,
+                 enabled=not LLM_CACHE_DISABLED):
+        self.path = path or os.path.join(CACHE_DIR, "llm_cache.sqlite3")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection so the cache is safe across threads and processes."""
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            if not self._initialized:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    """CREATE TABLE IF NOT EXISTS completions (
+                        key TEXT PRIMARY KEY,
+                        content TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )"""
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_completions_accessed ON completions (accessed_at)")
+                self._initialized = True
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        """Return cached completion text for a fingerprint, or None."""
+        if not self.enabled:
+            return None
+        content = self._lookup(key)
+        self._count(content is not None)
+        return content
+
+    def _lookup(self, key):
+        """get() without touching the hit/miss counters."""
+        try:
+            with self._connect() as conn:
+                row = conn.execute("SELECT content FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    conn.execute("UPDATE completions SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        except sqlite3.Error:
+            row = None
+        return row[0] if row else None
+
+    def put(self, key, content):
+        """Store completion text and evict least recently used entries past the limits."""
+        if not self.enabled or not content:
+            return
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, content, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, content, len(content.encode("utf-8")), now, now),
+                )
+                conn.execute(
+                    """DELETE FROM completions WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key,
+                                   ROW_NUMBER() OVER (ORDER BY accessed_at DESC) AS position,
+                                   SUM(size) OVER (ORDER BY accessed_at DESC) AS running_size
+                            FROM completions
+                        ) WHERE position > ? OR running_size > ?
+                    )""",
+                    (self.max_entries, self.max_bytes),
+                )
+        except sqlite3.Error:
+            pass
+
+    @staticmethod
+    def _request(messages, model, temperature, max_tokens, extra):
+        request = {"messages": messages, "model": model, **extra}
+        if temperature is not None:
+            request["temperature"] = temperature
+        if max_tokens is not None:
+            request["max_tokens"] = max_tokens
+        return request
+
+    def complete(self, client, messages, model, temperature=None, max_tokens=None, use_cache=True, on_usage=None,
+                 priority=PRIORITY_INTERACTIVE, on_cache_hit=None, **kwargs):
+        """Return completion text for a chat request, calling client only on a cache miss.
+
+        `client` is a Groq client; extra keyword arguments are passed through to
+        chat.completions.create. `on_usage` is called with the API's token
+        counts when the model is actually called (not on cache hits), and
+        `on_cache_hit` with no arguments when the reply came from the cache.
+        Concurrent identical cached requests share one API call; callers that
+        waited on another's call get neither callback. API calls go through the
+        shared rate limiter at `priority`, which also retries 429s.
+        """
+        key = prompt_fingerprint(model, messages, temperature, max_tokens, kwargs.get("response_format"))
+        request = self._request(messages, model, temperature, max_tokens, kwargs)
+        if not use_cache:
+            response = self._create(client, request, priority)
+            self._report_usage(response, on_usage)
+            return response.choices[0].message.content
+
+        cached = self.get(key)
+        if cached is not None:
+            if on_cache_hit:
+                on_cache_hit()
+            return cached
+        return llm_flight.do(key, self._fetch, client, key, request, on_usage, priority, on_cache_hit)
+
+    @staticmethod
+    def _create(client, request, priority):
+        return groq_limiter.call(
+            lambda: client.chat.completions.create(**request), estimate_request_tokens(request), priority
+        )
+
+    def _fetch(self, client, key, request, on_usage, priority, on_cache_hit):
+        # Checked again: a process that waited on another's lock finds its answer here.
+        # Not counted: complete() already counted this request's lookup
+        cached = self._lookup(key) if self.enabled else None
+        if cached is not None:
+            if on_cache_hit:
+                on_cache_hit()
+            return cached
+        response = self._create(client, request, priority)
+        self._report_usage(response, on_usage)
+        content = response.choices[0].message.content
+        self.put(key, content)
+        return content
+
+    async def acomplete(self, client, messages, model, temperature=None, max_tokens=None, use_cache=True,
+                        on_usage=None, priority=PRIORITY_INTERACTIVE, on_cache_hit=None, **kwargs):
+        """Async variant of complete() for an AsyncGroq client.
+
+        Cache reads and writes run on a worker thread so SQLite never blocks
+        the event loop. There is no single-flight here: each MCP server process
+        runs one event loop serving one client.
+        """
+        key = prompt_fingerprint(model, messages, temperature, max_tokens, kwargs.get("response_format"))
+        if use_cache:
+            cached = await asyncio.to_thread(self.get, key)
+            if cached is not None:
+                if on_cache_hit:
+                    on_cache_hit()
+                return cached
+
+        request = self._request(messages, model, temperature, max_tokens, kwargs)
+        response = await groq_limiter.acall(
+            lambda: client.chat.completions.create(**request), estimate_request_tokens(request), priority
+        )
+        self._report_usage(response, on_usage)
+        content = response.choices[0].message.content
+        if use_cache:
+            await asyncio.to_thread(self.put, key, content)
+        return content
+
+    @staticmethod
+    def _report_usage(response, on_usage):
+        usage = getattr(response, "usage", None)
+        if on_usage and usage is not None:
+            on_usage({
+                "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                "completion_tokens": getattr(usage, "completion_tokens", None),
+            })
+
+    def stats(self):
+        """Hit/miss counters for this process plus the current size of the cache."""
+        entries = size = 0
+        try:
+            with self._connect() as conn:
+                entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions").fetchone()
+        except sqlite3.Error:
+            pass
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+# Identical concurrent completions wait on one API call
+llm_flight = single_flight("llm")
+
+# Shared instance used by app.py and the MCP content generators
+llm_cache = CompletionCache()
@@ -0,0 +1,147 @@
+# mcp_pool.py (Pool of long-lived, pre-initialized MCP client sessions)
+import asyncio
+import logging
+import os
+import threading
+
+from mcp import ClientSession
+from mcp.client.stdio import stdio_client
+
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+MCP_HEALTH_INTERVAL = float(os.getenv("MCP_HEALTH_INTERVAL", "30"))
+MCP_HEALTH_TIMEOUT = float(os.getenv("MCP_HEALTH_TIMEOUT", "5"))
+MCP_RESTART_BACKOFF = float(os.getenv("MCP_RESTART_BACKOFF", "1"))
+# Longest a single tool call may run before its server is treated as hung and restarted
+MCP_CALL_TIMEOUT = float(os.getenv("MCP_CALL_TIMEOUT", "60"))
+# Longest a caller waits for an idle healthy session before giving up
+MCP_ACQUIRE_TIMEOUT = float(os.getenv("MCP_ACQUIRE_TIMEOUT", "30"))
+
+logger = logging.getLogger(__name__)
+
+
+class MCPSessionPool:
+    """Keeps `size` MCP server processes running with initialized client sessions.
+
+    Each slot owns one server process and one ClientSession on a private event
+    loop thread. Slots ping their session every `health_interval` seconds and
+    restart the server if the ping fails, the process exits or a tool call
+    breaks the connection or runs past `call_timeout`. Callers borrow an idle
+    session for one tool call, so the per-request cost is just the call
+    itself; waiting for a session raises TimeoutError after `acquire_timeout`.
+    """
+
+    def __init__(self, server_params, size=MCP_POOL_SIZE, health_interval=MCP_HEALTH_INTERVAL,
+                 call_timeout=MCP_CALL_TIMEOUT, acquire_timeout=MCP_ACQUIRE_TIMEOUT):
+        self.server_params = server_params
+        self.size = size
+        self.health_interval = health_interval
+        self.call_timeout = call_timeout
+        self.acquire_timeout = acquire_timeout
+        self.restarts = 0
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="mcp-pool", daemon=True)
+        self._idle = None
+        self._unhealthy = {}
+        self._closing = None
+        self._slots = []
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+
+    async def _start(self):
+        self._idle = asyncio.Queue()
+        self._closing = asyncio.Event()
+        self._slots = [asyncio.create_task(self._run_slot(i)) for i in range(self.size)]
+
+    async def _run_slot(self, index):
+        """Start, health-check and restart one server process until the pool closes."""
+        while not self._closing.is_set():
+            try:
+                async with stdio_client(self.server_params) as (read, write):
+                    async with ClientSession(read, write) as session:
+                        await session.initialize()
+                        self._unhealthy[session] = asyncio.Event()
+                        self._idle.put_nowait(session)
+                        try:
+                            await self._watch(session)
+                        finally:
+                            self._unhealthy.pop(session, None)
+            except Exception as e:
+                logger.warning("MCP pool slot %d failed: %s", index, e)
+            if not self._closing.is_set():
+                self.restarts += 1
+                await asyncio.sleep(MCP_RESTART_BACKOFF)
+
+    async def _watch(self, session):
+        """Return once the session is unhealthy or the pool is closing."""
+        unhealthy = self._unhealthy[session]
+        while True:
+            waiters = [asyncio.create_task(self._closing.wait()), asyncio.create_task(unhealthy.wait())]
+            done, pending = await asyncio.wait(waiters, timeout=self.health_interval,
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for task in pending:
+                task.cancel()
+            if done:
+                return
+            try:
+                await asyncio.wait_for(session.send_ping(), timeout=MCP_HEALTH_TIMEOUT)
+            except Exception:
+                return
+
+    async def _acquire(self):
+        try:
+            return await asyncio.wait_for(self._next_healthy(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No healthy MCP session became available within {self.acquire_timeout:g}s") from None
+
+    async def _next_healthy(self):
+        while True:
+            session = await self._idle.get()
+            # Sessions whose slot has already exited are dropped here
+            if session in self._unhealthy and not self._unhealthy[session].is_set():
+                return session
+
+    async def _call_tool(self, name, arguments):
+        session = await self._acquire()
+        healthy = False
+        try:
+            result = await asyncio.wait_for(session.call_tool(name, arguments), self.call_timeout)
+            healthy = True
+            return result
+        except asyncio.CancelledError:
+            # The caller gave up, not the server; a late reply is matched by request id and dropped
+            healthy = True
+            raise
+        finally:
+            if healthy:
+                self._idle.put_nowait(session)
+            elif session in self._unhealthy:
+                # Errors and timeouts: let the slot restart this server instead of handing it out again
+                self._unhealthy[session].set()
+
+    def call_tool(self, name, arguments, timeout=None):
+        """Call a tool from synchronous code, blocking until it returns."""
+        future = asyncio.run_coroutine_threadsafe(self._call_tool(name, arguments), self._loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            # Don't leave the call running (and holding a session) after giving up on it
+            future.cancel()
+            raise
+
+    async def acall_tool(self, name, arguments):
+        """Call a tool from a coroutine running on any other event loop."""
+        future = asyncio.run_coroutine_threadsafe(self._call_tool(name, arguments), self._loop)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        """Idle session count and how many times servers have been restarted."""
+        return {"size": self.size, "idle": self._idle.qsize(), "restarts": self.restarts}
+
+    def close(self):
+        """Stop every server process and the pool's event loop."""
+        async def shutdown():
+            self._closing.set()
+            await asyncio.gather(*self._slots, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout=30)
+        self._loop.call_soon_threadsafe(self._loop.stop)
@@ -0,0 +1,129 @@
+# passage_ranker.py (Split extracted pages into passages and rank them against the topic with BM25)
+import os
+import re
+
+import numpy as np
+
+# Words per passage, and how many words consecutive passages share
+PASSAGE_WORDS = int(os.getenv("PASSAGE_WORDS", "80"))
+PASSAGE_OVERLAP = int(os.getenv("PASSAGE_OVERLAP", "20"))
+# BM25 term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# How much the best-matching subtopic counts relative to the main topic
+SUBTOPIC_WEIGHT = 0.5
+
+STOPWORDS = frozenset("""
+a about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers
+him his how i if in into is it its itself just me more most my no nor not now of off on once only or other our
+ours out over own same she should so some such than that the their theirs them then there these they this those
+through to too under until up very was we were what when where which while who whom why will with would you
+your yours
+""".split())
+
+
+def tokenize(text):
+    """Lower-cased word tokens without stopwords or single characters."""
+    return [word for word in re.findall(r"[a-z0-9]+", text.lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+def split_passages(text, words_per_passage=PASSAGE_WORDS, overlap=PASSAGE_OVERLAP):
+    """Split text into overlapping windows of roughly `words_per_passage` words.
+
+    Windows start on sentence boundaries where possible so passages read as
+    whole sentences.
+    """
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+", text.strip()) if s]
+    passages, current, current_words = [], [], 0
+    for sentence in sentences:
+        words = len(sentence.split())
+        if current and current_words + words > words_per_passage:
+            passages.append(" ".join(current))
+            # Carry trailing sentences over so context isn't cut mid-thought
+            carried, carried_words = [], 0
+            for previous in reversed(current):
+                carried_words += len(previous.split())
+                if carried_words > overlap:
+                    break
+                carried.insert(0, previous)
+            current, current_words = carried, sum(len(s.split()) for s in carried)
+        current.append(sentence)
+        current_words += words
+    if current:
+        passages.append(" ".join(current))
+
+    # Very long "sentences" (lists, tables) are hard-wrapped by word count
+    wrapped = []
+    for passage in passages:
+        words = passage.split()
+        step = max(1, words_per_passage - overlap)
+        if len(words) <= words_per_passage * 2:
+            wrapped.append(passage)
+        else:
+            wrapped.extend(" ".join(words[i:i + words_per_passage]) for i in range(0, len(words), step))
+    return wrapped
+
+
+def bm25_scores(passage_tokens, queries):
+    """BM25 score of every passage for every query, as a (queries x passages) array."""
+    vocabulary = {}
+    rows, cols = [], []
+    for row, tokens in enumerate(passage_tokens):
+        for token in tokens:
+            rows.append(row)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    n_passages = len(passage_tokens)
+    term_freq = np.zeros((n_passages, max(1, len(vocabulary))), dtype=np.float32)
+    np.add.at(term_freq, (np.array(rows, dtype=np.intp), np.array(cols, dtype=np.intp)), 1.0)
+
+    lengths = term_freq.sum(axis=1)
+    doc_freq = (term_freq > 0).sum(axis=0)
+    idf = np.log1p((n_passages - doc_freq + 0.5) / (doc_freq + 0.5))
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1.0))
+    weights = term_freq * (BM25_K1 + 1) / (term_freq + norm[:, None]) * idf[None, :]
+
+    # Queries as bag-of-words vectors over the same vocabulary; unseen terms score nothing
+    query_matrix = np.zeros((len(queries), weights.shape[1]), dtype=np.float32)
+    for row, query in enumerate(queries):
+        for token in set(tokenize(query)):
+            col = vocabulary.get(token)
+            if col is not None:
+                query_matrix[row, col] = 1.0
+    return query_matrix @ weights.T
+
+
+def rank_passages(topic, subtopics, pages, limit=12):
+    """Best passages across `pages` ({"url", "title", "text"} dicts) for the topic.
+
+    A passage's score is its BM25 score for the topic plus SUBTOPIC_WEIGHT
+    times its best subtopic score, so passages that cover a subtopic can beat
+    generic ones. Duplicate passages (syndicated copy, boilerplate) are kept
+    once. Returns dicts with text, url, title and score, best first.
+    """
+    passages = []
+    for page in pages:
+        for text in split_passages(page.get("text", "")):
+            passages.append({"text": text, "url": page.get("url", ""), "title": page.get("title", "")})
+    if not passages:
+        return []
+
+    queries = [topic] + [f"{topic} {subtopic}" for subtopic in subtopics or []]
+    scores = bm25_scores([tokenize(p["text"]) for p in passages], queries)
+    combined = scores[0]
+    if len(queries) > 1:
+        combined = combined + SUBTOPIC_WEIGHT * scores[1:].max(axis=0)
+
+    ranked, seen = [], set()
+    for index in np.argsort(-combined, kind="stable"):
+        if combined[index] <= 0:
+            break
+        fingerprint = " ".join(tokenize(passages[index]["text"]))
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        ranked.append(dict(passages[index], score=round(float(combined[index]), 3)))
+        if len(ranked) >= limit:
+            break
+    return ranked
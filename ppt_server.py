@@ -1,13 +1,19 @@
 from mcp.server.fastmcp import FastMCP
-from groq import Groq
+from groq import AsyncGroq
 import json
+from llm_cache import llm_cache
+from slide_schema import DECK_JSON_FORMAT, acomplete_deck
 import os
 import streamlit as st
 
 mcp = FastMCP("pptgen")
-api_key= st.secrets["k"]["api_key"]
+try:
+    api_key = st.secrets["k"]["api_key"]
+except:
+    api_key = os.getenv("GROQ_API_KEY")
 
-client = Groq(api_key=api_key)
+# Async client so a slow completion doesn't block other tool calls; it pools connections internally
+client = AsyncGroq(api_key=api_key, max_retries=0)
 
 @mcp.tool()
 async def ppt_content_generator(topic: str, context: str, style: str, slide_count: int) -> str:
@@ -23,23 +29,20 @@ async def ppt_content_generator(topic: str, context: str, style: str, slide_coun
     Context:
     {context}
     
-    Output format:
-    {{
-        "title": "Presentation Title",
-        "subtitle": "Presentation Subtitle",
-        "slides": [
-            {{
-                "title": "Slide 1 Title",
-                "points": ["Point 1", "Point 2", "Point 3"]
-            }}
-        ]
-    }}"""
+    Output format (JSON only):
+    {DECK_JSON_FORMAT}"""
     
-    response = client.chat.completions.create(
-        messages=[{"role": "user", "content": prompt}],
-        model="llama-3.3-70b-specdec",
-        temperature=0.4,
-        max_tokens=2000
-    )
+    async def complete(messages):
+        return await llm_cache.acomplete(
+            client,
+            messages=messages,
+            model="llama-3.3-70b-specdec",
+            temperature=0.4,
+            max_tokens=2000,
+            response_format={"type": "json_object"}
+        )
     
-    return response.choices[0].message.content
+    # Validate against the shared schema and re-ask only for broken or missing slides
+    reply = await complete([{"role": "user", "content": prompt}])
+    deck = await acomplete_deck(complete, reply, topic, expected_count=slide_count)
+    return deck.to_json()
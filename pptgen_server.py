@@ -1,13 +1,19 @@
 from mcp.server.fastmcp import FastMCP
-from groq import Groq
+from groq import AsyncGroq
 import json
+from llm_cache import llm_cache
+from slide_schema import DECK_JSON_FORMAT, acomplete_deck
 import os
 import streamlit as st
 
 mcp = FastMCP("pptgen")
-api_key= st.secrets["k"]["api_key"]
+try:
+    api_key = st.secrets["k"]["api_key"]
+except:
+    api_key = os.getenv("GROQ_API_KEY")
 
-groq_client = Groq(api_key=api_key)
+# Async client so a slow completion doesn't block other tool calls; it pools connections internally
+groq_client = AsyncGroq(api_key=api_key, max_retries=0)
 
 @mcp.tool()
 async def generate_ppt_content(topic: str, context: str) -> str:
@@ -19,26 +25,24 @@ async def generate_ppt_content(topic: str, context: str) -> str:
         {context}
         
         Output Format (JSON):
-        {{
-            "title": "Presentation Title",
-            "subtitle": "Informative Subtitle",
-            "slides": [
-                {{
-                    "title": "Slide Title",
-                    "points": ["Bullet 1", "Bullet 2", "Bullet 3"]
-                }}
-            ]
-        }}
+        {DECK_JSON_FORMAT}
         
         Use markdown-style formatting and ensure valid JSON output."""
         
-        response = groq_client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama3-70b-8192",
-            temperature=0.4,
-            max_tokens=4000
-        )
-        return response.choices[0].message.content
+        async def complete(messages):
+            return await llm_cache.acomplete(
+                groq_client,
+                messages=messages,
+                model="llama3-70b-8192",
+                temperature=0.4,
+                max_tokens=4000,
+                response_format={"type": "json_object"}
+            )
+        
+        # Validate against the shared schema and re-ask only for broken slides
+        reply = await complete([{"role": "user", "content": prompt}])
+        deck = await acomplete_deck(complete, reply, topic)
+        return deck.to_json()
         
     except Exception as e:
         return json.dumps({"error": str(e)})
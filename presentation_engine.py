@@ -0,0 +1,1283 @@
+# presentation_engine.py (Research, generation and deck building, usable with or without Streamlit)
+from pptx import Presentation
+from pptx.util import Inches, Pt
+from pptx.dml.color import RGBColor
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import nsdecls, qn
+from pptx.opc.packuri import PackURI
+from groq import Groq
+import codecs
+import functools
+import io
+import logging
+import os
+from io import BytesIO
+import re
+import threading
+from urllib.parse import quote
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import http_client
+from html_parser import SelectorList, TextCollector, parser
+from fanout import FanOut
+from search_cache import search_cache
+from image_store import image_store, topic_key
+from engine_health import engine_health
+from llm_cache import llm_cache, prompt_fingerprint
+from passage_ranker import rank_passages
+from prompt_builder import PROMPT_INPUT_BUDGET, Section, assemble, count_tokens, output_token_limit
+from slide_schema import Deck, Slide, complete_deck, parse_deck, parse_slide_text
+from slide_stream import SlideStreamParser
+from token_usage import token_usage
+from rate_limiter import PRIORITY_INTERACTIVE, estimate_request_tokens, groq_limiter, is_rate_limit_error
+from single_flight import single_flight
+
+logger = logging.getLogger(__name__)
+
+# Presentation themes with enhanced colors
+THEMES = {
+    "professional": {
+        "title_font_size": Pt(36),
+        "body_font_size": Pt(18),
+        "title_color": RGBColor(31, 58, 138),  # Dark blue
+        "accent_color": RGBColor(37, 99, 235),  # Medium blue
+        "background_color": RGBColor(255, 255, 255),  # White
+    },
+    "minimal": {
+        "title_font_size": Pt(36),
+        "body_font_size": Pt(18),
+        "title_color": RGBColor(30, 30, 30),  # Almost black
+        "accent_color": RGBColor(100, 100, 100),  # Gray
+        "background_color": RGBColor(245, 245, 245),  # Light gray
+    },
+    "vibrant": {
+        "title_font_size": Pt(40),
+        "body_font_size": Pt(20),
+        "title_color": RGBColor(124, 28, 138),  # Purple
+        "accent_color": RGBColor(236, 72, 153),  # Pink
+        "background_color": RGBColor(253, 244, 255),  # Very light purple
+    },
+    "corporate": {
+        "title_font_size": Pt(36),
+        "body_font_size": Pt(18),
+        "title_color": RGBColor(20, 83, 45),  # Dark green
+        "accent_color": RGBColor(22, 163, 74),  # Green
+        "background_color": RGBColor(240, 253, 244),  # Light green
+    },
+    "dark": {
+        "title_font_size": Pt(38),
+        "body_font_size": Pt(18),
+        "title_color": RGBColor(226, 232, 240),  # Light gray
+        "accent_color": RGBColor(56, 189, 248),  # Light blue
+        "background_color": RGBColor(30, 41, 59),  # Dark blue/gray
+    }
+}
+
+# Identical concurrent requests share one execution at each network stage (see single_flight.py)
+search_flight = single_flight("search")
+page_flight = single_flight("page", cross_process=False)  # No disk cache to hand results across processes
+image_flight = single_flight("image")
+
+# Function to search the web, serving repeat queries from the disk-backed search cache
+def search_web(query, num_results=3, max_retries=2):
+    """Search the web for information related to the query, using cached results when available.
+    
+    Concurrent calls for the same normalized query wait on one search.
+    """
+    return search_flight.do(
+        search_cache.make_key(query, "auto", num_results),
+        search_cache.get_or_fetch,
+        query,
+        "auto",
+        num_results,
+        lambda: search_web_live(query, num_results=num_results, max_retries=max_retries),
+        should_cache=is_successful_search,
+    )
+
+def is_successful_search(results):
+    """Return True unless the results are the 'Search Failed' placeholder."""
+    return bool(results) and results[0].get("link") != "#"
+
+# Engines tried by the live search. Listed in default priority order; at run
+# time they are reordered by engine_health. Result/title/link/snippet selectors
+# are tried in turn until one matches.
+SEARCH_ENGINES = [
+    {
+        "name": "google",
+        "url": "https://www.google.com/search?q={query}&num={count}",
+        "result_selector": ["div.g", "div.Gx5Zad", "div.tF2Cxc"],
+        "title_selector": ["h3", "h3.LC20lb"],
+        "link_selector": ["a"],
+        "snippet_selector": ["div.VwiC3b", "span.aCOpRe", "div.s3v9rd"]
+    },
+    {
+        "name": "bing",
+        "url": "https://www.bing.com/search?q={query}&count={count}",
+        "result_selector": ["li.b_algo", "div.b_title", "div.b_caption"],
+        "title_selector": ["h2", "a"],
+        "link_selector": ["a", "cite"],
+        "snippet_selector": ["p", "div.b_caption p"]
+    },
+    {
+        # DuckDuckGo's HTML endpoint shows the target URL as text rather than an href
+        "name": "duckduckgo",
+        "url": "https://html.duckduckgo.com/html/?q={query}",
+        "result_selector": [".result"],
+        "title_selector": [".result__title"],
+        "link_selector": [".result__url"],
+        "snippet_selector": [".result__snippet"],
+        "link_from_text": True
+    }
+]
+
+# "hedged" races the engines (see search_web_hedged); "sequential" tries them one after another
+SEARCH_MODE = os.getenv("SEARCH_MODE", "hedged")
+# Seconds to wait on an engine before also launching the next one
+SEARCH_HEDGE_DELAY = float(os.getenv("SEARCH_HEDGE_DELAY", "1.0"))
+
+# Dedicated pool so hedged requests never queue behind the research fan-out that issues them
+_hedge_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SEARCH_HEDGE_WORKERS", "12")), thread_name_prefix="search-hedge"
+)
+
+# Selector lists per engine, compiled once at import
+SELECTOR_FIELDS = ("result_selector", "title_selector", "link_selector", "snippet_selector")
+for _engine in SEARCH_ENGINES:
+    _engine["compiled"] = {field: SelectorList(_engine[field]) for field in SELECTOR_FIELDS}
+
+def parse_search_results(html, engine, num_results):
+    """Pull up to num_results {title, link, snippet} dicts out of a results page."""
+    selectors = engine["compiled"]
+    root = parser.parse(html)
+    
+    # First result selector that matches anything wins
+    search_divs = parser.select(root, selectors["result_selector"])
+    
+    results = []
+    for div in search_divs[:num_results*2]:
+        try:
+            # Try multiple title selectors
+            title_elem = parser.select_one(div, selectors["title_selector"])
+            title = parser.text(title_elem).strip() if title_elem is not None else None
+            
+            if not title:
+                continue
+            
+            # Try multiple link selectors, taking the first candidate that carries a link
+            link = ""
+            for link_elem in parser.select_ranked(div, selectors["link_selector"]):
+                if engine.get("link_from_text"):
+                    link = f"https://{parser.text(link_elem).strip()}"
+                    break
+                href = parser.attr(link_elem, 'href')
+                if href is not None:
+                    link = href
+                    # Clean up Google's redirect URLs
+                    if link.startswith('/url?'):
+                        link = re.search(r'url\?q=([^&]+)', link)
+                        link = link.group(1) if link else ""
+                    break
+            
+            # Try multiple snippet selectors
+            snippet = "No description available"
+            snippet_elem = parser.select_one(div, selectors["snippet_selector"])
+            if snippet_elem is not None:
+                snippet = parser.text(snippet_elem).strip()
+            
+            # Add to results if we have at least title and link
+            if title and link and link.startswith('http'):
+                results.append({
+                    "title": title,
+                    "link": link,
+                    "snippet": snippet
+                })
+                
+                # Break once we have enough results
+                if len(results) >= num_results:
+                    break
+        except Exception:
+            continue
+    
+    return results
+
+# Function to query a single search engine
+def search_engine(engine, query, num_results=3):
+    """Fetch and parse one engine's results page; returns [] on any failure.
+    
+    Every attempt is scored on the shared engine health board; CAPTCHA and
+    block pages count as failures because they parse to nothing.
+    """
+    start = time.perf_counter()
+    results = []
+    try:
+        url = engine["url"].format(query=quote(query), count=num_results*2)
+        response = http_client.get(url)
+        if response.status_code == 200:
+            results = parse_search_results(response.text, engine, num_results)
+    except Exception:
+        pass
+    engine_health.record(
+        f"search:{engine['name']}", bool(results), time.perf_counter() - start, len(results) / max(1, num_results)
+    )
+    return results
+
+def ranked_search_engines():
+    """SEARCH_ENGINES ordered by live health score, best first."""
+    by_name = {engine["name"]: engine for engine in SEARCH_ENGINES}
+    ranked = engine_health.rank([f"search:{name}" for name in by_name])
+    return [by_name[key.split(":", 1)[1]] for key in ranked]
+
+def search_engine_allowed(engine):
+    """False while the engine's circuit breaker is open."""
+    return engine_health.allow(f"search:{engine['name']}")
+
+def search_failed(query):
+    """Placeholder result shown when every engine failed."""
+    return [{
+        "title": "Search Failed",
+        "link": "#",
+        "snippet": f"Unable to retrieve search results for '{query}'. Please try again later."
+    }]
+
+# Function to search the live engines, racing them or trying them in turn depending on SEARCH_MODE
+def search_web_live(query, num_results=3, max_retries=2):
+    """Search the web for information related to the query with improved reliability."""
+    if SEARCH_MODE == "sequential":
+        return search_web_sequential(query, num_results=num_results, max_retries=max_retries)
+    return search_web_hedged(query, num_results=num_results)
+
+# Function to race the search engines with hedged requests
+def search_web_hedged(query, num_results=3, hedge_delay=None):
+    """Start with the healthiest engine and bring in the next one whenever the
+    current ones fail or stay silent for hedge_delay seconds.
+
+    The first engine with num_results results wins and the rest are abandoned.
+    If none gets that many, the largest non-empty result list is returned once
+    all of them have answered.
+    """
+    hedge_delay = SEARCH_HEDGE_DELAY if hedge_delay is None else hedge_delay
+    # Healthiest engine first; engines with an open breaker are skipped without a request
+    engines = (engine for engine in ranked_search_engines() if search_engine_allowed(engine))
+    running = {}
+    best = []
+    
+    def launch_next():
+        engine = next(engines, None)
+        if engine is not None:
+            running[_hedge_executor.submit(search_engine, engine, query, num_results)] = engine["name"]
+        return engine is not None
+    
+    launch_next()
+    while running:
+        done, _ = wait(running, timeout=hedge_delay, return_when=FIRST_COMPLETED)
+        if not done:
+            # Nobody answered within the hedge delay: add the next engine to the race
+            launch_next()
+            continue
+        for future in done:
+            engine_name = running.pop(future)
+            results = future.result()
+            if len(results) >= num_results:
+                for loser in running:
+                    loser.cancel()
+                logger.debug("search %r won by %s", query, engine_name)
+                return results
+            if len(results) > len(best):
+                best = results
+        # A finished engine came up short, so don't wait out the delay for the next one
+        launch_next()
+    
+    return best or search_failed(query)
+
+# Function to search the engines one after another with retries
+def search_web_sequential(query, num_results=3, max_retries=2):
+    """Try each engine in order, pausing between engines and between retries."""
+    for attempt in range(max_retries):
+        for engine in ranked_search_engines():
+            if not search_engine_allowed(engine):
+                continue
+            
+            results = search_engine(engine, query, num_results)
+            
+            # If we found results, return them
+            if results:
+                return results
+            
+            # Add delay between search engine attempts
+            time.sleep(1)
+        
+        # Add delay between retry attempts
+        if attempt < max_retries - 1:
+            time.sleep(2)
+    
+    # If all attempts fail, return a fallback message
+    return search_failed(query)
+
+# Elements whose text counts as page content
+CONTENT_TAGS = ("p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "article", "main")
+CONTENT_CLASSES = ("content", "article")
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+# Characters of page text kept per page, and the most we download to find them
+EXTRACT_MAX_CHARS = int(os.getenv("EXTRACT_MAX_CHARS", "5000"))
+EXTRACT_MAX_BYTES = int(os.getenv("EXTRACT_MAX_BYTES", str(2 * 1024 * 1024)))
+EXTRACT_CHUNK_SIZE = 16 * 1024
+
+def sniff_encoding(content_type, head):
+    """Charset from the Content-Type header, else from a <meta> tag near the top, else UTF-8."""
+    match = re.search(r'charset=["\']?([\w-]+)', content_type or "", re.I)
+    if not match:
+        match = re.search(rb'<meta[^>]+charset=["\']?([\w-]+)', head[:4096], re.I)
+    if match:
+        charset = match.group(1)
+        charset = charset.decode("ascii", "ignore") if isinstance(charset, bytes) else charset
+        try:
+            return codecs.lookup(charset).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+def stream_page_text(chunks, content_type="", max_chars=EXTRACT_MAX_CHARS, max_bytes=EXTRACT_MAX_BYTES):
+    """Parse byte chunks incrementally and return (content text, bytes read).
+    
+    Reading stops once max_chars of content text have been collected or
+    max_bytes have been read, so memory stays bounded however large the page.
+    """
+    # One extra character so callers can tell the text was cut off
+    collector = TextCollector(CONTENT_TAGS, CONTENT_CLASSES, max_chars=max_chars + 1)
+    feed = None
+    read = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        chunk = chunk[:max_bytes - read]
+        if feed is None:
+            feed = parser.stream_parser(collector, sniff_encoding(content_type, chunk))
+        feed.feed(chunk)
+        read += len(chunk)
+        if collector.enough or read >= max_bytes:
+            break
+    if feed is not None:
+        try:
+            feed.close()
+        except Exception:
+            pass  # Truncated or broken markup; keep whatever text was collected
+    return collector.text(), read
+
+def extract_text(html):
+    """Main-content text of a page with scripts, styles and extra whitespace removed."""
+    data = html.encode("utf-8") if isinstance(html, str) else html
+    chunks = (data[i:i + EXTRACT_CHUNK_SIZE] for i in range(0, len(data), EXTRACT_CHUNK_SIZE))
+    return stream_page_text(chunks, "text/html; charset=utf-8" if isinstance(html, str) else "")[0]
+
+class PageSkipped(Exception):
+    """A page that was reached but has no text worth extracting."""
+
+# Function to fetch a page and return its main text
+def fetch_page_text(url, max_chars=EXTRACT_MAX_CHARS):
+    """Stream a page and return up to max_chars of its main text.
+    
+    Non-HTML responses are rejected from their headers, before any of the
+    body is downloaded. Raises PageSkipped for bad URLs, error statuses and
+    non-HTML content, and lets network errors propagate. Concurrent calls
+    for the same page share one download.
+    """
+    return page_flight.do((url, max_chars), _fetch_page_text, url, max_chars)
+
+def _fetch_page_text(url, max_chars):
+    if not url.startswith('http'):
+        raise PageSkipped("Invalid URL format")
+    
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+    # Closing early drops the connection instead of draining an unread body, and frees the host slot
+    with http_client.get(url, headers=headers, stream=True) as response:
+        if response.status_code != 200:
+            raise PageSkipped(f"Failed to retrieve content: Status code {response.status_code}")
+        
+        content_type = response.headers.get("Content-Type", "")
+        mime_type = content_type.split(";")[0].strip().lower()
+        if mime_type and mime_type not in HTML_CONTENT_TYPES:
+            raise PageSkipped(f"Skipped non-HTML content: {mime_type}")
+        
+        content, _ = stream_page_text(response.iter_content(EXTRACT_CHUNK_SIZE), content_type, max_chars=max_chars)
+    
+    # Truncate if too long
+    if len(content) > max_chars:
+        content = content[:max_chars] + "..."
+    return content
+
+# Improved function to extract content from webpages
+def extract_webpage_content(url):
+    """Main text of a page, or a short message saying why there is none."""
+    try:
+        return fetch_page_text(url)
+    except PageSkipped as e:
+        return str(e)
+    except Exception as e:
+        return f"Error extracting content: {str(e)}"
+
+# Image sources, each returning a stored image or None
+
+def image_from_unsplash(topic, use_flowchart):
+    """Use Unsplash for reliable, high-quality images."""
+    unsplash_url = f"https://source.unsplash.com/featured/?{quote(topic)}"
+    response = http_client.get(unsplash_url)
+    if response.status_code == 200:
+        # Validate, downscale and store it; None means it wasn't an actual image
+        return image_store.put(topic, use_flowchart, response.content)
+    return None
+
+def image_from_quickchart(topic, use_flowchart):
+    """Render a flowchart with the quickchart graphviz service."""
+    flowchart_url = f"https://quickchart.io/graphviz?graph=digraph {{{quote(topic)}}};"
+    response = http_client.get(flowchart_url)
+    if response.status_code == 200:
+        return image_store.put(topic, use_flowchart, response.content)
+    return None
+
+BING_IMAGE_SELECTOR = SelectorList(['img.mimg', 'a.iusc img', 'img.inflnk', 'img[src^="http"]'])
+
+def parse_bing_image_urls(html):
+    """Candidate image URLs from a Bing image results page, best selector first."""
+    root = parser.parse(html)
+    
+    # Try multiple selectors that might contain image URLs
+    img_urls = []
+    for img in parser.select_ranked(root, BING_IMAGE_SELECTOR):
+        src = parser.attr(img, 'src') or ''
+        data_src = parser.attr(img, 'data-src') or ''
+        if src.startswith('http'):
+            img_urls.append(src)
+        elif data_src.startswith('http'):
+            img_urls.append(data_src)
+    return img_urls
+
+def image_from_bing(topic, use_flowchart):
+    """Scrape Bing image search with multiple selectors and take the first valid image."""
+    search_term = f"{topic} {'flowchart' if use_flowchart else ''}"
+    search_url = f"https://www.bing.com/images/search?q={quote(search_term)}&first=1"
+    response = http_client.get(search_url)
+    if response.status_code != 200:
+        return None
+    
+    img_urls = parse_bing_image_urls(response.text)
+    
+    # Try each URL until we find a valid image
+    for img_url in img_urls[:5]:
+        try:
+            img_response = http_client.get(img_url, timeout=5)
+            if img_response.status_code == 200:
+                # Validate, downscale and store it; None means try the next URL
+                stored = image_store.put(topic, use_flowchart, img_response.content)
+                if stored:
+                    return stored
+        except Exception:
+            continue
+    return None
+
+def image_from_diagram_chart(topic, use_flowchart):
+    """Generate a simple flowchart diagram through the Google chart API."""
+    flowchart_xml = f"""
+    <mxGraphModel>
+        <root>
+            <mxCell id="0"/>
+            <mxCell id="1" parent="0"/>
+            <mxCell id="2" value="{topic}" style="rounded=1;whiteSpace=wrap;html=1;fillColor=#dae8fc;strokeColor=#6c8ebf;" vertex="1" parent="1">
+                <mxGeometry x="120" y="120" width="200" height="60" as="geometry"/>
+            </mxCell>
+            <mxCell id="3" value="Process" style="rounded=1;whiteSpace=wrap;html=1;fillColor=#d5e8d4;strokeColor=#82b366;" vertex="1" parent="1">
+                <mxGeometry x="120" y="240" width="200" height="60" as="geometry"/>
+            </mxCell>
+            <mxCell id="4" value="" style="endArrow=classic;html=1;exitX=0.5;exitY=1;exitDx=0;exitDy=0;entryX=0.5;entryY=0;entryDx=0;entryDy=0;" edge="1" parent="1" source="2" target="3">
+                <mxGeometry width="50" height="50" relative="1" as="geometry">
+                    <mxPoint x="390" y="410" as="sourcePoint"/>
+                    <mxPoint x="440" y="360" as="targetPoint"/>
+                </mxGeometry>
+            </mxCell>
+            <mxCell id="5" value="Output" style="rounded=1;whiteSpace=wrap;html=1;fillColor=#ffe6cc;strokeColor=#d79b00;" vertex="1" parent="1">
+                <mxGeometry x="120" y="360" width="200" height="60" as="geometry"/>
+            </mxCell>
+            <mxCell id="6" value="" style="endArrow=classic;html=1;exitX=0.5;exitY=1;exitDx=0;exitDy=0;entryX=0.5;entryY=0;entryDx=0;entryDy=0;" edge="1" parent="1" source="3" target="5">
+                <mxGeometry width="50" height="50" relative="1" as="geometry">
+                    <mxPoint x="390" y="410" as="sourcePoint"/>
+                    <mxPoint x="440" y="360" as="targetPoint"/>
+                </mxGeometry>
+            </mxCell>
+        </root>
+    </mxGraphModel>
+    """
+    
+    flowchart_xml_encoded = quote(flowchart_xml)
+    chart_url = f"https://chart.googleapis.com/chart?cht=tx&chl={flowchart_xml_encoded}"
+    response = http_client.get(chart_url)
+    if response.status_code == 200:
+        return image_store.put(topic, use_flowchart, response.content)
+    return None
+
+def image_from_placeholder(topic, use_flowchart):
+    """Last resort: a placeholder image with the topic as text."""
+    placeholder_url = f"https://via.placeholder.com/800x600.png?text={quote(topic.replace(' ', '+'))}"
+    response = http_client.get(placeholder_url)
+    if response.status_code == 200:
+        return image_store.put(topic, use_flowchart, response.content)
+    return None
+
+# (health board name, source, used for photos, used for flowcharts), in default priority order
+IMAGE_SOURCES = [
+    ("image:unsplash", image_from_unsplash, True, False),
+    ("image:quickchart", image_from_quickchart, False, True),
+    ("image:bing_images", image_from_bing, True, True),
+    ("image:diagram_chart", image_from_diagram_chart, False, True),
+]
+PLACEHOLDER_IMAGE_SOURCE = ("image:placeholder", image_from_placeholder, True, True)
+
+# Significantly improved function to get images with multiple sources and fallbacks
+def get_image_for_topic(topic, use_flowchart=False):
+    """Get an image or flowchart for a given topic using multiple methods.
+    
+    Returns a StoredImage (downscaled bytes plus dimensions) from the local
+    image store, downloading and storing it first if the topic is new. Sources
+    are tried in order of their engine health score, skipping any whose circuit
+    breaker is open; the placeholder service always goes last. Concurrent
+    calls for the same topic share one lookup.
+    """
+    return image_flight.do(topic_key(topic, use_flowchart), _get_image_for_topic, topic, use_flowchart)
+
+def _get_image_for_topic(topic, use_flowchart):
+    stored = image_store.get(topic, use_flowchart)
+    if stored:
+        return stored
+    
+    sources = [source for source in IMAGE_SOURCES if source[3 if use_flowchart else 2]]
+    ranked = engine_health.rank([name for name, _, _, _ in sources])
+    sources.sort(key=lambda source: ranked.index(source[0]))
+    
+    for name, fetch, _, _ in sources + [PLACEHOLDER_IMAGE_SOURCE]:
+        if not engine_health.allow(name):
+            continue
+        start = time.perf_counter()
+        try:
+            stored = fetch(topic, use_flowchart)
+        except Exception:
+            stored = None  # Continue to next method if this fails
+        engine_health.record(name, stored is not None, time.perf_counter() - start)
+        if stored:
+            return stored
+    
+    # If all methods fail, return None
+    return None
+
+# Function to accept either raw slide text or an already parsed Deck
+def as_deck(slide_content):
+    """The Deck IR for `slide_content`, parsing it only if it is still text."""
+    return slide_content if isinstance(slide_content, Deck) else parse_deck(slide_content)
+
+# Improved function to convert presentation content to markdown for reveal.js
+def pptx_to_markdown(slide_content):
+    """Convert slide content (text or a parsed Deck) to markdown for reveal.js with improved formatting."""
+    return as_deck(slide_content).to_markdown()
+
+# Function to pick likely subtopics out of the main search results
+def extract_subtopics(main_results, limit=3):
+    """Extract up to `limit` candidate subtopics from search result titles and snippets."""
+    subtopics = []
+    for result in main_results:
+        snippet = result.get("snippet", "")
+        title = result.get("title", "")
+        
+        # Extract phrases that might be good subtopics
+        phrases = re.findall(r'([A-Z][^.!?]*?(benefit|feature|concept|principle|type|example|use case|application)[^.!?]*)', 
+                            snippet + " " + title)
+        
+        for phrase in phrases:
+            if phrase[0] not in subtopics and len(phrase[0].split()) <= 5:
+                subtopics.append(phrase[0])
+    
+    return subtopics[:limit]
+
+# Global time budget for one research run, in seconds
+RESEARCH_DEADLINE = float(os.getenv("RESEARCH_DEADLINE", "20"))
+# Result pages read in full during research, and the text kept from each for ranking
+DEEP_EXTRACT_PAGES = int(os.getenv("DEEP_EXTRACT_PAGES", "3"))
+DEEP_EXTRACT_MAX_CHARS = int(os.getenv("DEEP_EXTRACT_MAX_CHARS", "15000"))
+# Ranked passages kept in the research data for the prompt builder to choose from
+RESEARCH_MAX_PASSAGES = int(os.getenv("RESEARCH_MAX_PASSAGES", "12"))
+
+# Once the main results are in, how long generation waits for page extraction and subtopics before starting without them
+GENERATION_START_GRACE = float(os.getenv("GENERATION_START_GRACE", "2"))
+
+class ResearchRun:
+    """One research run on a background thread, readable before it finishes.
+    
+    The main search, subtopic searches and page extraction run concurrently.
+    The top DEEP_EXTRACT_PAGES result pages are read in full, split into
+    passages and ranked against the topic and subtopics; the best ones are
+    returned under "passages". Anything still running when the deadline
+    passes is left out of the results. `on_progress` is called with a status
+    label as the research advances.
+    
+    snapshot() returns what has arrived so far, so generation can start on
+    the main results while pages are still being read (see wait_for_main).
+    """
+    
+    def __init__(self, topic, subtopics=None, deadline=RESEARCH_DEADLINE, on_progress=None):
+        self.topic = topic
+        self.subtopics = subtopics
+        self.report = on_progress or (lambda label: None)
+        self.fanout = FanOut(deadline)
+        self._main = None
+        self._pages = {}
+        self._subtopic_order = list(subtopics or [])
+        self._subtopic_results = {}
+        self._lock = threading.Lock()
+        self._main_ready = threading.Event()
+        self._done = threading.Event()
+        # A plain thread: waiting on the shared pool from inside it could starve the calls it waits for
+        threading.Thread(target=self._run, name="research", daemon=True).start()
+    
+    def _run(self):
+        try:
+            self._collect()
+        finally:
+            self._main_ready.set()
+            self._done.set()
+    
+    def _collect(self):
+        topic, fanout, report = self.topic, self.fanout, self.report
+        
+        report("Searching for main topic...")
+        fanout.submit("main", search_web, topic, num_results=3)
+        
+        # Known subtopics don't depend on the main results, so start them right away
+        for subtopic in self._subtopic_order:
+            fanout.submit(("subtopic", subtopic), search_web, f"{topic} {subtopic}", num_results=2)
+        
+        for key, value in fanout.as_completed():
+            if key == "main":
+                main_results = value if isinstance(value, list) else []
+                
+                # Read the top result pages in full, all at once
+                for result in main_results[:DEEP_EXTRACT_PAGES]:
+                    page_url = result.get("link", "")
+                    if page_url.startswith("http") and ("page", page_url) not in fanout:
+                        report(f"Extracting detailed content from {page_url}")
+                        fanout.submit(("page", page_url), fetch_page_text, page_url, DEEP_EXTRACT_MAX_CHARS)
+                
+                # If no subtopics provided, generate some based on the main results
+                if not self.subtopics:
+                    try:
+                        for subtopic in extract_subtopics(main_results):
+                            report(f"Researching auto-generated subtopic: {subtopic}")
+                            with self._lock:
+                                self._subtopic_order.append(subtopic)
+                            fanout.submit(("subtopic", subtopic), search_web, f"{topic} {subtopic}", num_results=2)
+                    except Exception as e:
+                        # If auto-generation fails, just continue without subtopics
+                        pass
+                
+                with self._lock:
+                    self._main = main_results
+                self._main_ready.set()
+            elif key[0] == "page":
+                # None means the page failed or was skipped
+                if value:
+                    with self._lock:
+                        self._pages[key[1]] = value
+            elif isinstance(value, list):
+                with self._lock:
+                    self._subtopic_results[key[1]] = value
+                report(f"Finished researching subtopic: {key[1]}")
+        
+        timed_out = fanout.cancel_pending()
+        if timed_out:
+            report(f"Research deadline reached, continuing with partial results ({len(timed_out)} searches skipped)")
+        else:
+            report("Research completed!")
+    
+    @property
+    def is_finished(self):
+        return self._done.is_set()
+    
+    def snapshot(self):
+        """The research gathered so far, in gather_research_data's format."""
+        with self._lock:
+            main = list(self._main or [])
+            pages = dict(self._pages)
+            subtopic_order = list(self._subtopic_order)
+            subtopic_results = dict(self._subtopic_results)
+        
+        results = {"main": main}
+        # Keep subtopics in the order they were requested, not the order they finished
+        if subtopic_results:
+            results["subtopics"] = {s: subtopic_results[s] for s in subtopic_order if s in subtopic_results}
+        
+        # Pages in search-rank order; the first one doubles as the detailed excerpt
+        page_list = [
+            {"url": r.get("link", ""), "title": r.get("title", ""), "text": pages[r.get("link", "")]}
+            for r in main if r.get("link", "") in pages
+        ]
+        if page_list:
+            results["detailed_content"] = page_list[0]["text"]
+            results["passages"] = rank_passages(self.topic, subtopic_order, page_list, limit=RESEARCH_MAX_PASSAGES)
+        return results
+    
+    def wait_for_main(self, grace=GENERATION_START_GRACE):
+        """Wait for the main results, then up to `grace` seconds for the rest; returns a snapshot."""
+        self._main_ready.wait(self.fanout.remaining())
+        self._done.wait(min(grace, self.fanout.remaining()))
+        return self.snapshot()
+    
+    def result(self):
+        """Wait for the whole run (bounded by its deadline) and return the research data."""
+        self._done.wait()
+        return self.snapshot()
+
+# Function to gather research data using concurrent web searches
+def gather_research_data(topic, subtopics=None, deadline=RESEARCH_DEADLINE, on_progress=None):
+    """Gather research data from web searches for the presentation; see ResearchRun."""
+    return ResearchRun(topic, subtopics, deadline, on_progress).result()
+
+# Model settings shared by the blocking and streaming generation paths
+GROQ_MODEL = "llama-3.3-70b-specdec"
+GROQ_TEMPERATURE = 0.7
+GROQ_MAX_TOKENS = 4024
+
+# Share of the prompt input budget each section may claim before leftovers are shared out
+PROMPT_SECTION_SHARES = {"context": 0.2, "passages": 0.45, "main": 0.2, "subtopics": 0.15}
+
+# Function to build the chat messages for slide generation within a token budget
+def plan_generation_messages(topic, context, research_data, num_slides=5, budget=PROMPT_INPUT_BUDGET):
+    """Build the system and user messages asking Groq for slide content.
+    
+    Research and user context are fitted into `budget` input tokens: snippets
+    that repeat a passage or another snippet are dropped, and each section
+    gets a share of the budget (see PROMPT_SECTION_SHARES). Returns
+    (messages, report) where the report has per-section token counts, the
+    estimated prompt size and the completion limit that fits the context window.
+    """
+    main_items = []
+    if "main" in research_data and isinstance(research_data["main"], list):
+        main_items = [
+            f"{result.get('title', 'No title')}: {result.get('snippet', 'No snippet')}"
+            for result in research_data["main"][:3]
+        ]
+    
+    subtopic_items = []
+    for subtopic, results in research_data.get("subtopics", {}).items():
+        if isinstance(results, list) and results:
+            subtopic_items.append(f"{subtopic}: {results[0].get('snippet', 'No information')}")
+    
+    passage_items = [
+        f"{passage['text']} (source: {passage['title'] or passage['url']})"
+        for passage in research_data.get("passages", [])
+    ]
+    if not passage_items and research_data.get("detailed_content"):
+        passage_items = [research_data["detailed_content"]]
+    
+    # Passages go first so snippets that merely repeat them are the ones deduplicated away
+    texts, report = assemble([
+        Section("passages", "\nMost relevant passages from the sources:", passage_items, PROMPT_SECTION_SHARES["passages"]),
+        Section("main", "Main topic search results:", main_items, PROMPT_SECTION_SHARES["main"]),
+        Section("subtopics", "\nSubtopic search results:", subtopic_items, PROMPT_SECTION_SHARES["subtopics"]),
+        Section("context", "", [context or ""], PROMPT_SECTION_SHARES["context"], dedupe=False, line_format="{}"),
+    ], budget)
+    research_summary = "Research findings:\n" + texts["main"] + texts["subtopics"] + texts["passages"]
+    context = texts["context"].strip()
+    
+    prompt = f"""Create a professional presentation with {num_slides} slides about "{topic}".
+
+Use the following research data to make the presentation informative and data-driven:
+{research_summary}
+
+Additional context provided by the user: {context}
+
+The presentation should follow these guidelines:
+1. Start with a compelling title slide
+2. Include an agenda or overview slide
+3. Each content slide should have a clear, concise title
+4. Bullet points should be specific, actionable, and data-driven using the research
+5. Use the principle of "one idea per slide"
+6. Include a strong concluding slide with actionable takeaways
+7. Include simple flowcharts or diagrams when appropriate
+
+IMPORTANT: For each slide, provide:
+- A clear title prefixed with exactly "Title: " (this exact prefix is needed for processing)
+- 3-5 concise bullet points that elaborate on the title
+- Each bullet point should be on a new line without any bullet symbols (no -, *, •)
+- Incorporate relevant statistics, facts, or data from the research
+- Avoid jargon or overly technical terms unless necessary
+- Ensure the content is engaging and visually appealing
+
+Use this exact format for each slide:
+Title: [Slide Title Here]
+[Bullet point 1 - no bullet symbol]
+[Bullet point 2 - no bullet symbol]
+[Bullet point 3 - no bullet symbol]
+[Bullet point 4 - no bullet symbol]
+[Bullet point 5 - no bullet symbol]
+
+Add a blank line between slides.
+
+FOR FLOWCHARTS: If a slide would benefit from a simple flowchart, add a note [FLOWCHART] at the end of that slide's content.
+
+Remember to cite sources where appropriate and maintain a professional tone."""
+    
+    messages = [
+        {
+            "role": "system",
+            "content": "You are an expert presentation designer who creates well-structured, engaging, and professional slide content backed by research data."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+    # A few tokens per message for the chat template
+    report["prompt_tokens"] = sum(count_tokens(m["content"]) + 4 for m in messages)
+    report["max_tokens"] = output_token_limit(report["prompt_tokens"], GROQ_MAX_TOKENS)
+    return messages, report
+
+def build_generation_messages(topic, context, research_data, num_slides=5):
+    """The chat messages for slide generation, without the budget report."""
+    return plan_generation_messages(topic, context, research_data, num_slides)[0]
+
+# Improved function to generate slide content using Groq with research data
+def groq_generate_content(topic, context, research_data, num_slides=5, api_key=None, on_error=logger.error,
+                          priority=PRIORITY_INTERACTIVE):
+    """Generate slide content using Groq with research data.
+    
+    Calls wait their turn in the shared rate limiter at `priority`, which
+    also retries 429s. Errors are passed to `on_error` as a message and None
+    is returned.
+    """
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    if not api_key:
+        on_error("Please set your GROQ_API_KEY in a .env file or in Streamlit secrets.")
+        return None
+        
+    # Initialize Groq client; retries are left to the rate limiter so it sees every 429
+    client = Groq(api_key=api_key, max_retries=0)
+    
+    messages, report = plan_generation_messages(topic, context, research_data, num_slides)
+    usage = {}
+    cache_hits = []
+    start = time.perf_counter()
+    try:
+        # Byte-identical prompts (retries, reruns) are answered from the completion cache
+        content = llm_cache.complete(
+            client,
+            messages=messages,
+            model=GROQ_MODEL,
+            temperature=GROQ_TEMPERATURE,
+            max_tokens=report["max_tokens"],
+            on_usage=usage.update,
+            priority=priority,
+            on_cache_hit=lambda: cache_hits.append(True),
+        )
+        token_usage.record(
+            kind="generate", topic=topic, cached=bool(cache_hits), seconds=round(time.perf_counter() - start, 3),
+            estimated_prompt_tokens=report["prompt_tokens"], max_tokens=report["max_tokens"],
+            prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"),
+            sections=report["sections"],
+        )
+        
+        # Re-ask only for slides that came back without a title or enough points, or are missing;
+        # the first slide is the title slide, which is a title and a subtitle line
+        if parse_deck(content).broken_slides(num_slides, title_slide=True):
+            def complete(reask):
+                return llm_cache.complete(client, messages=reask, model=GROQ_MODEL, temperature=GROQ_TEMPERATURE,
+                                          max_tokens=report["max_tokens"], priority=priority)
+            content = complete_deck(complete, content, topic, expected_count=num_slides, json_mode=False,
+                                    title_slide=True).to_text()
+        return content
+    except Exception as e:
+        on_error(f"Error generating content with Groq: {e}")
+        return None
+
+# Function to stream slide content from Groq token by token
+def groq_stream_content(topic, context, research_data, num_slides=5, api_key=None, on_error=logger.error,
+                        priority=PRIORITY_INTERACTIVE):
+    """Yield slide content from Groq as tokens arrive.
+    
+    The stream holds a rate limiter slot until it ends; a 429 (which comes
+    before any token) is retried. Errors are passed to `on_error` as a
+    message and end the stream early.
+    """
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    if not api_key:
+        on_error("Please set your GROQ_API_KEY in a .env file or in Streamlit secrets.")
+        return
+    
+    client = Groq(api_key=api_key, max_retries=0)
+    messages, report = plan_generation_messages(topic, context, research_data, num_slides)
+    record = dict(
+        kind="stream", topic=topic, estimated_prompt_tokens=report["prompt_tokens"],
+        max_tokens=report["max_tokens"], sections=report["sections"],
+    )
+    
+    # A cached completion is replayed as a single chunk
+    cache_key = prompt_fingerprint(GROQ_MODEL, messages, GROQ_TEMPERATURE, report["max_tokens"])
+    cached = llm_cache.get(cache_key)
+    if cached is not None:
+        token_usage.record(cached=True, seconds=0.0, **record)
+        yield cached
+        return
+    
+    request = dict(
+        messages=messages,
+        model=GROQ_MODEL,
+        temperature=GROQ_TEMPERATURE,
+        max_tokens=report["max_tokens"],
+        stream=True,
+    )
+    start = time.perf_counter()
+    tokens = []
+    usage = None
+    try:
+        for attempt in range(groq_limiter.max_retries + 1):
+            try:
+                with groq_limiter.slot(estimate_request_tokens(request), priority) as permit:
+                    stream = client.chat.completions.create(**request)
+                    for chunk in stream:
+                        if chunk.choices and chunk.choices[0].delta.content:
+                            if not tokens:
+                                record["first_token_seconds"] = round(time.perf_counter() - start, 3)
+                            tokens.append(chunk.choices[0].delta.content)
+                            yield chunk.choices[0].delta.content
+                        # Groq reports usage on the final chunk
+                        usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                    permit.used_tokens = getattr(usage, "total_tokens", None)
+                break
+            except Exception as e:
+                # Only a 429 before any output is retried, so nothing is yielded twice
+                if tokens or not is_rate_limit_error(e) or attempt == groq_limiter.max_retries:
+                    raise
+                time.sleep(groq_limiter.retry_delay(attempt, e))
+        llm_cache.put(cache_key, "".join(tokens))
+        token_usage.record(
+            cached=False, seconds=round(time.perf_counter() - start, 3),
+            prompt_tokens=getattr(usage, "prompt_tokens", None),
+            completion_tokens=getattr(usage, "completion_tokens", None) or count_tokens("".join(tokens)),
+            **record,
+        )
+    except Exception as e:
+        on_error(f"Error generating content with Groq: {e}")
+
+# Per-deck time budget for fetching slide images, in seconds
+IMAGE_PREFETCH_BUDGET = float(os.getenv("IMAGE_PREFETCH_BUDGET", "15"))
+
+# Function to give a layout placeholder the theme's font size, colour and alignment
+def _style_placeholder(placeholder, size, color, align):
+    """Set the first-level defaults in the placeholder's list style, keeping its other settings."""
+    list_style = placeholder._element.txBody.find(qn("a:lstStyle"))
+    level = list_style.find(qn("a:lvl1pPr"))
+    if level is None:
+        level = list_style.makeelement(qn("a:lvl1pPr"), {})
+        list_style.insert(0, level)
+    level.set("algn", align)
+    for old in level.findall(qn("a:defRPr")):
+        level.remove(old)
+    level.append(parse_xml(
+        f'<a:defRPr {nsdecls("a")} sz="{int(size.pt * 100)}">'
+        f'<a:solidFill><a:srgbClr val="{color}"/></a:solidFill></a:defRPr>'
+    ))
+
+# Function to compile a theme into a .pptx template, once per theme per process
+@functools.lru_cache(maxsize=None)
+def theme_template(theme):
+    """The default template with `theme`'s background and fonts built into the master and layouts.
+    
+    Returned as bytes; each deck opens its own copy, so slides inherit the
+    styling instead of every slide carrying a background shape and
+    per-paragraph font settings.
+    """
+    theme_properties = THEMES.get(theme, THEMES["professional"])
+    prs = Presentation()
+    
+    # One background on the master instead of a full-size rectangle on every slide
+    background = prs.slide_master.background.fill
+    background.solid()
+    background.fore_color.rgb = theme_properties["background_color"]
+    
+    title_layout, content_layout = prs.slide_layouts[0], prs.slide_layouts[1]
+    styles = [
+        (title_layout, 0, theme_properties["title_font_size"], theme_properties["title_color"], "ctr"),
+        (title_layout, 1, Pt(24), theme_properties["accent_color"], "ctr"),
+        (content_layout, 0, theme_properties["title_font_size"], theme_properties["title_color"], "l"),
+        (content_layout, 1, theme_properties["body_font_size"], theme_properties["accent_color"], "l"),
+    ]
+    for layout, idx, size, color, align in styles:
+        _style_placeholder(layout.placeholders.get(idx=idx), size, color, align)
+    
+    template = io.BytesIO()
+    prs.save(template)
+    return template.getvalue()
+
+# Incremental deck builder: slides can be added one at a time as they become available
+class DeckBuilder:
+    """Build a themed PowerPoint deck slide by slide.
+    
+    Text is rendered as soon as a slide is added and its image fetch starts
+    right away on the shared fan-out pool, so slides streamed from the model
+    overlap with image downloads. finish() waits for outstanding images for
+    at most `image_budget` seconds; slides whose image isn't ready by then
+    are rendered without one.
+    
+    A builder can be kept between edits: update() re-renders only slides
+    whose content hash changed and keeps the rendered slide parts (pictures
+    included) of the rest. Fetched images stay in the builder, so an edited
+    slide with an unchanged title doesn't fetch its image again.
+    """
+    
+    def __init__(self, topic, theme="professional", include_images=True, image_budget=IMAGE_PREFETCH_BUDGET):
+        # Background and fonts come from the theme's cached template
+        self.prs = Presentation(io.BytesIO(theme_template(theme)))
+        self.theme_properties = THEMES.get(theme, THEMES["professional"])
+        self.include_images = include_images
+        self.image_budget = image_budget
+        self.images = FanOut(image_budget) if include_images else None
+        self._pending_pictures = []
+        # content_hash -> sldId elements of rendered slides with that content, in deck order
+        self._rendered = {}
+        self._add_title_slide(topic)
+        self._title_slide_id = self.prs.slides._sldIdLst[0]
+    
+    def _add_title_slide(self, topic):
+        # Title Slide; theme formatting is inherited from the template's layout
+        title_slide_layout = self.prs.slide_layouts[0]
+        slide = self.prs.slides.add_slide(title_slide_layout)
+        
+        slide.shapes.title.text = topic
+        slide.placeholders[1].text = "Professional Presentation"
+    
+    def prefetch_image(self, slide_title, needs_flowchart=False):
+        """Start fetching a slide's image; identical titles are only fetched once.
+        
+        The [FLOWCHART] marker ends a slide, so a prefetch from its title line
+        can't know it; a flowchart request drops that plain fetch if it hasn't started.
+        """
+        key = (slide_title, needs_flowchart)
+        if self.include_images and needs_flowchart:
+            self.images.cancel((slide_title, False))
+        if self.include_images and key not in self.images:
+            self.images.submit(key, get_image_for_topic, slide_title, use_flowchart=needs_flowchart)
+        return key
+    
+    def _add_slide_part(self, layout):
+        """Add a slide under a partname no other slide in the deck uses.
+        
+        python-pptx names a new slide after the slide count, which collides
+        with a kept slide once update() has removed one. Kept slides are never
+        renamed instead: relationship targets are cached when the deck is saved.
+        """
+        slide = self.prs.slides.add_slide(layout)
+        slide_ids = self.prs.slides._sldIdLst
+        taken = {str(self.prs.part.related_part(slide_id.rId).partname) for slide_id in slide_ids[:-1]}
+        if str(slide.part.partname) in taken:
+            last = max(int(re.search(r"(\d+)\.xml$", name).group(1)) for name in taken)
+            slide.part.partname = PackURI(f"/ppt/slides/slide{last + 1}.xml")
+        return slide
+    
+    def add_slide(self, slide_title, bullet_points, needs_flowchart=False):
+        """Render a content slide now and queue its image for finish()."""
+        # Add content slide; background, fonts and colours come from the template's layout
+        content_slide_layout = self.prs.slide_layouts[1]  # Layout with title and content
+        slide = self._add_slide_part(content_slide_layout)
+        
+        # Set title
+        slide.shapes.title.text = slide_title
+        
+        # Add bullet points
+        if bullet_points:
+            body = slide.placeholders[1]
+            tf = body.text_frame
+            tf.text = ""  # Clear any default text
+            
+            for point in bullet_points:
+                p = tf.add_paragraph()
+                p.text = point
+                p.level = 0  # First level bullet
+        
+        if self.include_images:
+            self._pending_pictures.append((slide, self.prefetch_image(slide_title, needs_flowchart)))
+        content_hash = Slide(slide_title, bullet_points, needs_flowchart).content_hash
+        self._rendered.setdefault(content_hash, []).append(self.prs.slides._sldIdLst[-1])
+        return slide
+    
+    def add_slides(self, slides):
+        """Add parsed slide_schema.Slide objects."""
+        for slide in slides:
+            self.add_slide(slide.title, slide.points, slide.needs_flowchart)
+    
+    def add_slide_text(self, slide_text):
+        """Parse a block of slide text and add the resulting slides."""
+        self.add_slides(parse_slide_text(slide_text))
+    
+    def update(self, slides):
+        """Make the deck show exactly `slides`, rendering only those not already in it.
+        
+        Slides are matched by content hash, so reordering is free and an edit
+        re-renders just the edited slide. Returns how many slides were rendered.
+        """
+        reusable, self._rendered = self._rendered, {}
+        order, rendered = [], 0
+        for slide in slides:
+            candidates = reusable.get(slide.content_hash)
+            if candidates:
+                slide_id = candidates.pop(0)
+                self._rendered.setdefault(slide.content_hash, []).append(slide_id)
+            else:
+                self.prefetch_image(slide.title, slide.needs_flowchart)
+                self.add_slide(slide.title, slide.points, slide.needs_flowchart)
+                slide_id = self.prs.slides._sldIdLst[-1]
+                rendered += 1
+            order.append(slide_id)
+        
+        # Drop slides that are no longer in the deck, then put the rest in order
+        slide_ids = self.prs.slides._sldIdLst
+        stale = {slide_id.id for candidates in reusable.values() for slide_id in candidates}
+        for slide_id in list(slide_ids):
+            slide_ids.remove(slide_id)
+            if slide_id.id in stale:
+                self._pending_pictures = [
+                    (pptx_slide, key) for pptx_slide, key in self._pending_pictures
+                    if pptx_slide.slide_id != slide_id.id
+                ]
+                self.prs.part.drop_rel(slide_id.rId)
+        for slide_id in [self._title_slide_id] + order:
+            slide_ids.append(slide_id)
+        return rendered
+    
+    def finish(self):
+        """Place images that arrived within the budget and return the deck as BytesIO."""
+        if self.include_images:
+            # The budget covers the wait after the last slide was added, not the whole stream
+            self.images.extend_deadline(self.image_budget)
+        
+        for slide, key in self._pending_pictures:
+            try:
+                image = self.images.result(key)
+                
+                if image:
+                    # Save the image to a BytesIO object
+                    image_stream = BytesIO(image.data)
+                    
+                    # Add the image to the slide
+                    left = Inches(7)  # Position on the right side
+                    top = Inches(2)
+                    width = Inches(3)  # Fixed width
+                    
+                    # Maintain aspect ratio using the dimensions recorded by the image store
+                    aspect_ratio = image.height / image.width
+                    height = Inches(3 * aspect_ratio)
+                    
+                    # Add the image to the slide
+                    slide.shapes.add_picture(image_stream, left, top, width, height)
+            except Exception as e:
+                # Continue without an image if there was an error
+                pass
+        self._pending_pictures = []
+        if self.include_images:
+            # Images that missed the budget aren't placed; stop the ones still queued
+            self.images.cancel_pending()
+        
+        # Save the presentation to a BytesIO object
+        pptx_io = io.BytesIO()
+        self.prs.save(pptx_io)
+        pptx_io.seek(0)
+        
+        return pptx_io
+
+# Significantly improved function to create PowerPoint presentations with enhanced styling
+def create_presentation(topic, slide_content, theme="professional", include_images=True):
+    """Create a PowerPoint presentation with proper theme application and image integration.
+    
+    `slide_content` is slide text or a Deck from parse_deck; pass the Deck when
+    the same content is also exported elsewhere so it is parsed only once.
+    """
+    # Parse the slide content first so image fetches can start before any slide is built
+    slides = as_deck(slide_content).slides
+    builder = DeckBuilder(topic, theme=theme, include_images=include_images)
+    for slide in slides:
+        builder.prefetch_image(slide.title, slide.needs_flowchart)
+    
+    builder.add_slides(slides)
+    
+    return builder.finish()
+
+# Function to run the whole research, generation and build flow without any UI
+def generate_presentation(topic, context="", num_slides=5, theme="professional", include_images=True,
+                          stream=True, api_key=None, on_progress=None, start_grace=GENERATION_START_GRACE):
+    """Research a topic, generate its slides and build the deck; suitable for a background job.
+    
+    The stages overlap: generation starts once the main search results are
+    in (plus up to `start_grace` seconds for page extraction) while research
+    carries on, slides are rendered as they stream out of the model, and a
+    slide's image fetch starts as soon as its title line arrives.
+    
+    `on_progress(label, **details)` receives stage labels; when streaming, each
+    finished slide is also reported as a "slide" detail so a UI can preview it.
+    Returns a dict with content, deck, markdown, pptx (BytesIO), research_data
+    (everything gathered by the time the deck was built) and the DeckBuilder
+    (kept for incremental edits). Raises RuntimeError if no content could be
+    generated.
+    """
+    report = on_progress or (lambda label, **details: None)
+    errors = []
+    
+    research = ResearchRun(topic, on_progress=report)
+    # The title slide and theme template don't depend on research, so build them while it runs
+    builder = DeckBuilder(topic, theme=theme, include_images=include_images)
+    prompt_research = research.wait_for_main(start_grace)
+    if not research.is_finished:
+        report("Generating slide content while research continues...")
+    else:
+        report("Generating slide content...")
+    
+    if stream:
+        # Slides are built (and their images fetched) as soon as the model finishes each one
+        parser = SlideStreamParser()
+        prefetched_line = None
+        
+        def push(blocks):
+            for block in blocks:
+                for slide in parse_slide_text(block):
+                    builder.add_slide(slide.title, slide.points, slide.needs_flowchart)
+                    report(f"Slide ready: {slide.title}", slide=slide)
+        
+        for token in groq_stream_content(topic, context, prompt_research, num_slides, api_key=api_key,
+                                         on_error=errors.append):
+            push(parser.feed(token))
+            # The image only needs the title, so start it before the slide's bullets arrive
+            title_line = parser.open_title_line
+            if title_line and title_line != prefetched_line:
+                prefetched_line = title_line
+                for slide in parse_slide_text(title_line):
+                    builder.prefetch_image(slide.title, slide.needs_flowchart)
+        push(parser.finish())
+        content = parser.text if parser.text.strip() else None
+    
+    # A stream that broke off part-way leaves a truncated deck; generate it in full instead
+    rendered = stream and not errors
+    if not rendered:
+        if stream:
+            report("Streaming was interrupted, generating the slides again...")
+        content = groq_generate_content(topic, context, prompt_research, num_slides, api_key=api_key,
+                                        on_error=errors.append)
+    if not content:
+        raise RuntimeError(errors[-1] if errors else "Failed to generate content. Please try again.")
+    
+    deck = parse_deck(content)
+    if not rendered:
+        report("Building slides...")
+        builder.update(deck.slides)
+    pptx_io = builder.finish()
+    return {
+        "content": content,
+        "deck": deck,
+        "markdown": pptx_to_markdown(deck),
+        "pptx": pptx_io,
+        "research_data": research.snapshot(),
+        "builder": builder,
+    }
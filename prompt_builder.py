@@ -0,0 +1,165 @@
+# prompt_builder.py (Token-budgeted prompt assembly: local token counts, dedupe and per-section budgets)
+import math
+import os
+import re
+
+# Input tokens available to the variable parts of the prompt (research and user context)
+PROMPT_INPUT_BUDGET = int(os.getenv("PROMPT_INPUT_BUDGET", "2500"))
+# Total tokens the model accepts for prompt plus completion
+MODEL_CONTEXT_WINDOW = int(os.getenv("MODEL_CONTEXT_WINDOW", "8192"))
+# Word-shingle overlap above which two snippets count as the same text
+NEAR_DUPLICATE_THRESHOLD = 0.8
+# Remaining budget below which an item is dropped rather than cut down to fit
+MIN_FRAGMENT_TOKENS = 24
+
+# Same split as BPE pre-tokenizers: contractions, words, digit groups, punctuation runs, whitespace
+_PRETOKEN = re.compile(r"'(?:s|t|re|ve|m|ll|d)| ?[A-Za-z]+| ?\d{1,3}| ?[^\sA-Za-z\d]+|\s+")
+
+
+def count_tokens(text):
+    """Approximate the model's token count without its tokenizer.
+
+    Common words are a single token; long words split into pieces of about
+    five letters; punctuation runs into pieces of about two characters.
+    Within roughly 10% of Llama 3 token counts on English prose.
+    """
+    total = 0
+    for piece in _PRETOKEN.findall(text or ""):
+        stripped = piece.strip()
+        if not stripped:
+            total += 1 if "\n" in piece else 0
+        elif stripped[0].isalpha() and stripped.isascii():
+            total += 1 if len(stripped) <= 7 else math.ceil(len(stripped) / 5)
+        elif stripped.isdigit():
+            total += 1
+        else:
+            total += math.ceil(len(stripped) / 2) if stripped.isascii() else len(stripped)
+    return total
+
+
+def _shingles(text, size=3):
+    words = re.findall(r"[a-z0-9]+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class DuplicateFilter:
+    """Remembers texts seen so far and flags near-identical ones."""
+
+    def __init__(self, threshold=NEAR_DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self._seen = []
+
+    def is_duplicate(self, text):
+        """True if `text` overlaps a previously seen text; otherwise remember it."""
+        shingles = _shingles(text)
+        for seen in self._seen:
+            overlap = len(shingles & seen) / max(1, min(len(shingles), len(seen)))
+            if overlap >= self.threshold:
+                return True
+        self._seen.append(shingles)
+        return False
+
+
+def fit_text(text, budget):
+    """Cut text to at most `budget` tokens, preferring a sentence boundary."""
+    if count_tokens(text) <= budget:
+        return text
+    words = text.split()
+    low, high = 0, len(words)
+    # Longest word prefix that fits (with room for the ellipsis)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(" ".join(words[:middle])) + 1 <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    cut = " ".join(words[:low])
+    sentence_end = max(cut.rfind(". "), cut.rfind("! "), cut.rfind("? "))
+    if sentence_end > len(cut) // 2:
+        return cut[:sentence_end + 1]
+    return cut + "…" if cut else ""
+
+
+class Section:
+    """One block of the prompt: a header plus items, given `share` of the budget.
+
+    Items are in priority order; `dedupe` drops items that repeat earlier text
+    from any deduplicated section.
+    """
+
+    def __init__(self, name, header, items, share, dedupe=True, line_format="- {}"):
+        self.name = name
+        self.header = header
+        self.items = [item for item in items if item and item.strip()]
+        self.share = share
+        self.dedupe = dedupe
+        self.line_format = line_format
+
+
+def assemble(sections, budget=PROMPT_INPUT_BUDGET):
+    """Fit sections into `budget` tokens; returns ({name: text}, report).
+
+    Each section is first granted min(what it needs, its share of the
+    budget). Whatever sections leave unused is then handed out in section
+    order. Items that don't fit are cut down to size if enough budget is
+    left, otherwise dropped.
+    """
+    duplicates = DuplicateFilter()
+    candidates = {}
+    report = {"budget": budget, "sections": {}}
+    for section in sections:
+        lines, duplicate_count = [], 0
+        for item in section.items:
+            if section.dedupe and duplicates.is_duplicate(item):
+                duplicate_count += 1
+                continue
+            lines.append(section.line_format.format(item.strip()))
+        candidates[section.name] = lines
+        report["sections"][section.name] = {"duplicates": duplicate_count}
+
+    needs = {
+        section.name: (count_tokens(section.header) if candidates[section.name] else 0)
+        + sum(count_tokens(line) + 1 for line in candidates[section.name])
+        for section in sections
+    }
+    grants = {section.name: min(needs[section.name], int(budget * section.share)) for section in sections}
+    leftover = budget - sum(grants.values())
+    for section in sections:
+        extra = min(leftover, needs[section.name] - grants[section.name])
+        grants[section.name] += extra
+        leftover -= extra
+
+    texts = {}
+    for section in sections:
+        lines = candidates[section.name]
+        remaining = grants[section.name] - count_tokens(section.header)
+        kept, dropped, truncated = [], 0, 0
+        for line in lines:
+            cost = count_tokens(line) + 1
+            if cost <= remaining:
+                kept.append(line)
+                remaining -= cost
+            elif remaining >= MIN_FRAGMENT_TOKENS:
+                kept.append(fit_text(line, remaining - 1))
+                remaining -= count_tokens(kept[-1]) + 1
+                truncated += 1
+            else:
+                dropped += 1
+        texts[section.name] = (section.header + "\n" + "\n".join(kept) + "\n") if kept else ""
+        report["sections"][section.name].update({
+            "tokens": count_tokens(texts[section.name]),
+            "items": len(kept),
+            "truncated": truncated,
+            "dropped": dropped,
+        })
+    report["tokens"] = sum(s["tokens"] for s in report["sections"].values())
+    return texts, report
+
+
+def output_token_limit(prompt_tokens, max_tokens, context_window=MODEL_CONTEXT_WINDOW):
+    """Completion budget that keeps prompt plus completion inside the context window."""
+    # Margin for the chat template and for our token estimate running low
+    headroom = context_window - int(prompt_tokens * 1.1) - 64
+    return max(256, min(max_tokens, headroom))
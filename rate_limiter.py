@@ -0,0 +1,348 @@
+# rate_limiter.py (Client-side rate limiting, adaptive concurrency and 429 retries for LLM calls)
+import asyncio
+import email.utils
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Account limits; a request is admitted only when both buckets can cover it
+GROQ_RPM = float(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = float(os.getenv("GROQ_TPM", "30000"))
+# Seconds of quota the buckets may hold, i.e. the largest burst allowed after an idle spell
+GROQ_BURST_SECONDS = float(os.getenv("GROQ_BURST_SECONDS", "10"))
+# Concurrent requests: starts at the initial value and adapts between 1 and the maximum
+GROQ_INITIAL_CONCURRENCY = int(os.getenv("GROQ_INITIAL_CONCURRENCY", "4"))
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+# Retries after a 429, and the exponential backoff used when there is no Retry-After
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "4"))
+GROQ_BACKOFF_BASE = 1.0
+GROQ_BACKOFF_CAP = 30.0
+# Completion tokens reserved up front at most; the usage the API reports settles the rest
+GROQ_EXPECTED_COMPLETION_TOKENS = int(os.getenv("GROQ_EXPECTED_COMPLETION_TOKENS", "1024"))
+# A call this many times slower per token than the fastest recent call of its size means congestion
+GROQ_LATENCY_TOLERANCE = float(os.getenv("GROQ_LATENCY_TOLERANCE", "2.0"))
+# Concurrency is multiplied by this on a slow call (gentler than the halving on a 429)
+GROQ_LATENCY_BACKOFF = 0.9
+# Each sample lets the fastest-call baseline drift up this much, so it follows a lasting slowdown
+GROQ_LATENCY_FLOOR_DRIFT = 0.02
+
+# Lower runs first: someone waiting in the UI beats a batch job
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 10
+
+
+def is_rate_limit_error(error):
+    """True for a 429 from the API, whether given the exception or its message."""
+    if getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error)
+    return "429" in message or "rate limit" in message.lower()
+
+
+def is_overload_error(error):
+    """True for a 429 or a 5xx from the API, the signals that we are sending too much."""
+    status = getattr(error, "status_code", None)
+    return is_rate_limit_error(error) or (isinstance(status, int) and status >= 500)
+
+
+class AcquireCancelled(Exception):
+    """The caller waiting in acquire() gave up (e.g. its asyncio task was cancelled)."""
+
+
+def retry_after_seconds(error):
+    """Seconds the API asked us to wait (Retry-After header), or None."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def estimate_request_tokens(request):
+    """Tokens to reserve for a chat request: ~4 characters per prompt token plus the expected completion.
+
+    The completion is counted as max_tokens only up to GROQ_EXPECTED_COMPLETION_TOKENS:
+    reserving the full context-window allowance would let one deck drain the
+    token bucket. The permit is settled against the real usage on release.
+    """
+    prompt_chars = sum(len(str(message.get("content", ""))) for message in request.get("messages", []))
+    max_tokens = int(request.get("max_tokens") or GROQ_EXPECTED_COMPLETION_TOKENS)
+    return prompt_chars // 4 + min(max_tokens, GROQ_EXPECTED_COMPLETION_TOKENS)
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `rate` per second up to `capacity`."""
+
+    def __init__(self, per_minute, burst_seconds):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.level = self.capacity
+
+    def refill(self, elapsed):
+        self.level = min(self.capacity, self.level + elapsed * self.rate)
+
+    def wait_for(self, amount):
+        """Seconds until `amount` (capped at capacity) is available."""
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+
+class Permit:
+    """One admitted request and the tokens it reserved."""
+
+    __slots__ = ("tokens", "used_tokens", "started")
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        # Set by the caller (or call()) from the API's usage, to settle the token bucket
+        self.used_tokens = None
+        self.started = time.monotonic()
+
+
+class AdaptiveRateLimiter:
+    """Request and token buckets, a priority queue and AIMD concurrency for one API account.
+
+    Waiting requests are admitted strictly in priority order (FIFO within a
+    priority) once both buckets cover them and a concurrency slot is free.
+    The concurrency limit grows by one slot per window of successful calls
+    and is halved on a 429 or 5xx. Latency counts too, normalized so a short
+    re-ask and a full deck compare fairly: seconds per used token, against
+    the fastest recent call of about the same size (same power of two). A
+    call more than GROQ_LATENCY_TOLERANCE times slower trims the limit by
+    10%. A 429 with Retry-After pauses every caller, since the quota is
+    shared; retries use full-jitter exponential backoff.
+    """
+
+    def __init__(self, requests_per_minute=GROQ_RPM, tokens_per_minute=GROQ_TPM,
+                 initial_concurrency=GROQ_INITIAL_CONCURRENCY, max_concurrency=GROQ_MAX_CONCURRENCY,
+                 max_retries=GROQ_MAX_RETRIES, burst_seconds=GROQ_BURST_SECONDS):
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self.in_flight = 0
+        self.stats_counts = {"admitted": 0, "rate_limited": 0, "server_errors": 0, "slow_calls": 0, "retries": 0,
+                             "failed": 0}
+        # Fastest seconds per token seen, by size class of the call (bit length of its token count)
+        self._latency_floors = {}
+        self.configure(requests_per_minute, tokens_per_minute, initial_concurrency, max_concurrency,
+                       max_retries, burst_seconds)
+
+    def configure(self, requests_per_minute=GROQ_RPM, tokens_per_minute=GROQ_TPM,
+                  initial_concurrency=GROQ_INITIAL_CONCURRENCY, max_concurrency=GROQ_MAX_CONCURRENCY,
+                  max_retries=GROQ_MAX_RETRIES, burst_seconds=GROQ_BURST_SECONDS):
+        """(Re)set the limits, e.g. from command-line flags."""
+        with self._cond:
+            self.requests = _Bucket(requests_per_minute, burst_seconds)
+            self.tokens = _Bucket(tokens_per_minute, burst_seconds)
+            self.max_concurrency = max(1, max_concurrency)
+            self.limit = float(max(1, min(initial_concurrency, self.max_concurrency)))
+            self.max_retries = max_retries
+            self._updated = time.monotonic()
+            self._paused_until = 0.0
+            self._cond.notify_all()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        self.requests.refill(elapsed)
+        self.tokens.refill(elapsed)
+
+    def acquire(self, tokens, priority=PRIORITY_INTERACTIVE, cancel=None):
+        """Block until this request may start; returns a Permit to pass to release().
+
+        Setting the `cancel` event (then calling wake()) makes a waiting
+        acquire give up its place and raise AcquireCancelled.
+        """
+        entry = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        raise AcquireCancelled()
+                    now = time.monotonic()
+                    self._refill(now)
+                    timeout = None
+                    if self._waiting[0] == entry:
+                        wait = max(self._paused_until - now, self.requests.wait_for(1), self.tokens.wait_for(tokens))
+                        if wait <= 0 and self.in_flight < int(self.limit):
+                            heapq.heappop(self._waiting)
+                            self.requests.level -= 1
+                            reserved = min(tokens, self.tokens.capacity)
+                            self.tokens.level -= reserved
+                            self.in_flight += 1
+                            self.stats_counts["admitted"] += 1
+                            # The next waiter may be admissible too
+                            self._cond.notify_all()
+                            return Permit(reserved)
+                        timeout = wait if wait > 0 else None
+                    self._cond.wait(timeout)
+            except BaseException:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                    self._cond.notify_all()
+                raise
+
+    def release(self, permit, error=None):
+        """Finish a request, settle its token reservation and adapt the concurrency limit.
+
+        `error` is what the request failed with, if anything: a 429 or 5xx
+        halves the limit, a slow success trims it, any other success grows it,
+        and other errors leave it alone.
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if permit.used_tokens is not None:
+                # Give back what was over-reserved (or charge the shortfall)
+                self.tokens.level = min(self.tokens.capacity, self.tokens.level + permit.tokens - permit.used_tokens)
+            if error is None and self._is_slow(permit):
+                self.stats_counts["slow_calls"] += 1
+                self.limit = max(1.0, self.limit * GROQ_LATENCY_BACKOFF)
+            elif error is None:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            elif is_overload_error(error):
+                self.stats_counts["rate_limited" if is_rate_limit_error(error) else "server_errors"] += 1
+                self.limit = max(1.0, self.limit / 2)
+            self._cond.notify_all()
+
+    def _is_slow(self, permit):
+        """Compare the call's seconds per token with the fastest recent call of its size class."""
+        if not permit.used_tokens:
+            return False
+        per_token = (time.monotonic() - permit.started) / permit.used_tokens
+        size_class = int(permit.used_tokens).bit_length()
+        floor = self._latency_floors.get(size_class)
+        self._latency_floors[size_class] = per_token if floor is None else min(
+            per_token, floor * (1 + GROQ_LATENCY_FLOOR_DRIFT))
+        return floor is not None and per_token > GROQ_LATENCY_TOLERANCE * floor
+
+    def wake(self):
+        """Make waiting acquire() calls re-check their state (e.g. a cancel event)."""
+        with self._cond:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, tokens, priority=PRIORITY_INTERACTIVE):
+        """Hold a permit for the duration of the block (e.g. while consuming a stream)."""
+        permit = self.acquire(tokens, priority)
+        try:
+            yield permit
+        except BaseException as e:
+            # Includes GeneratorExit, so an abandoned stream still frees its slot
+            self.release(permit, e)
+            raise
+        self.release(permit)
+
+    def pause(self, seconds):
+        """Stop admitting requests for `seconds`."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+    def _count(self, name):
+        with self._cond:
+            self.stats_counts[name] += 1
+
+    def retry_delay(self, attempt, error):
+        """Seconds to wait before retrying a 429; a Retry-After also pauses everyone."""
+        self._count("retries")
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            self.pause(retry_after)
+            # A little jitter so the paused callers don't all fire on the same tick
+            return retry_after + random.uniform(0, GROQ_BACKOFF_BASE)
+        return random.uniform(0, min(GROQ_BACKOFF_CAP, GROQ_BACKOFF_BASE * 2 ** attempt))
+
+    @staticmethod
+    def _used_tokens(response):
+        return getattr(getattr(response, "usage", None), "total_tokens", None)
+
+    def call(self, fn, tokens, priority=PRIORITY_INTERACTIVE, retries=None):
+        """Run fn() under the limiter, retrying 429s; fn's result may carry `usage`."""
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            permit = self.acquire(tokens, priority)
+            error = None
+            try:
+                response = fn()
+                permit.used_tokens = self._used_tokens(response)
+                return response
+            except BaseException as e:
+                error = e
+                delay = self._retry_or_raise(attempt, retries, e)
+            finally:
+                # Every path hands the permit back, interrupts included
+                self.release(permit, error)
+            time.sleep(delay)
+
+    async def acall(self, fn, tokens, priority=PRIORITY_INTERACTIVE, retries=None):
+        """call() for an async fn; waiting for a permit happens off the event loop."""
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            permit = await self._aacquire(tokens, priority)
+            error = None
+            try:
+                response = await fn()
+                permit.used_tokens = self._used_tokens(response)
+                return response
+            except BaseException as e:
+                error = e
+                delay = self._retry_or_raise(attempt, retries, e)
+            finally:
+                # Also on CancelledError, so a cancelled task can't leak its slot
+                self.release(permit, error)
+            await asyncio.sleep(delay)
+
+    def _retry_or_raise(self, attempt, retries, error):
+        """The backoff before retrying `error`; re-raises it unless it is a retryable 429."""
+        if not isinstance(error, Exception):
+            raise error
+        if not is_rate_limit_error(error) or attempt == retries:
+            self._count("failed")
+            raise error
+        return self.retry_delay(attempt, error)
+
+    async def _aacquire(self, tokens, priority):
+        """acquire() on a worker thread; a cancelled caller leaves the queue and returns any late permit."""
+        cancel = threading.Event()
+        waiter = asyncio.ensure_future(asyncio.to_thread(self.acquire, tokens, priority, cancel))
+        try:
+            return await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            cancel.set()
+            self.wake()
+
+            def give_back(future):
+                # The permit may have been granted just before the cancel was seen
+                if not future.cancelled() and future.exception() is None:
+                    self.release(future.result(), AcquireCancelled())
+
+            waiter.add_done_callback(give_back)
+            raise
+
+    def stats(self):
+        with self._cond:
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiting),
+                "request_tokens": round(self.requests.level, 2),
+                "token_budget": round(self.tokens.level),
+                **self.stats_counts,
+            }
+
+
+# Shared by every Groq call in the process (engine, MCP servers, batch CLI)
+groq_limiter = AdaptiveRateLimiter()
@@ -0,0 +1,157 @@
+# search_cache.py (Disk-backed search result cache with TTL, LRU eviction and stale-while-revalidate)
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+CACHE_DIR = os.getenv("CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(6 * 3600)))
+SEARCH_CACHE_STALE_TTL = float(os.getenv("SEARCH_CACHE_STALE_TTL", str(7 * 24 * 3600)))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "2000"))
+
+
+def normalize_query(query):
+    """Lower-case a query and collapse runs of whitespace so trivial variants share an entry."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class SearchCache:
+    """Search results stored in SQLite, keyed by normalized query, engine and result count.
+
+    Entries younger than `ttl` are served as-is. Entries older than `ttl` but
+    younger than `ttl + stale_ttl` are served immediately while a background
+    thread refreshes them. Anything older is treated as a miss. The least
+    recently used entries are evicted once `max_entries` is exceeded.
+    """
+
+    def __init__(self, path=None, ttl=SEARCH_CACHE_TTL, stale_ttl=SEARCH_CACHE_STALE_TTL,
+                 max_entries=SEARCH_CACHE_MAX_ENTRIES):
+        self.path = path or os.path.join(CACHE_DIR, "search_cache.sqlite3")
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._initialized = False
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection so the cache is safe across threads and processes."""
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            if not self._initialized:
+                self._init_schema(conn)
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _init_schema(self, conn):
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS search_results (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON search_results (accessed_at)")
+        self._initialized = True
+
+    @staticmethod
+    def make_key(query, engine, num_results):
+        return json.dumps([normalize_query(query), engine, int(num_results)])
+
+    def get(self, query, engine, num_results):
+        """Return (results, age_seconds) for a live entry, or (None, None) on a miss."""
+        key = self.make_key(query, engine, num_results)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT payload, created_at FROM search_results WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None, None
+                age = now - row[1]
+                if age > self.ttl + self.stale_ttl:
+                    conn.execute("DELETE FROM search_results WHERE key = ?", (key,))
+                    return None, None
+                conn.execute("UPDATE search_results SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(row[0]), age
+        except sqlite3.Error:
+            return None, None
+
+    def put(self, query, engine, num_results, results):
+        """Store results and evict the least recently used entries beyond the size bound."""
+        key = self.make_key(query, engine, num_results)
+        now = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO search_results (key, payload, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(results, ensure_ascii=False), now, now),
+                )
+                conn.execute(
+                    """DELETE FROM search_results WHERE key IN (
+                        SELECT key FROM search_results ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_entries,),
+                )
+        except sqlite3.Error:
+            pass
+
+    def get_or_fetch(self, query, engine, num_results, fetch, should_cache=bool):
+        """Serve from the cache when possible, otherwise call fetch() and store its result.
+
+        `should_cache` decides whether a fetched result is worth keeping, so
+        failure placeholders are never served back to later callers.
+        """
+        results, age = self.get(query, engine, num_results)
+        if results is not None:
+            if age > self.ttl:
+                self._refresh_in_background(query, engine, num_results, fetch, should_cache)
+            return results
+
+        results = fetch()
+        if should_cache(results):
+            self.put(query, engine, num_results, results)
+        return results
+
+    def _refresh_in_background(self, query, engine, num_results, fetch, should_cache):
+        key = self.make_key(query, engine, num_results)
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                results = fetch()
+                if should_cache(results):
+                    self.put(query, engine, num_results, results)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=refresh, name="search-cache-refresh", daemon=True).start()
+
+    def clear(self):
+        """Drop every cached entry."""
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM search_results")
+        except sqlite3.Error:
+            pass
+
+
+# Shared instance used by app.py and the web search MCP server
+search_cache = SearchCache()
@@ -0,0 +1,181 @@
+# single_flight.py (Coalesce identical concurrent calls into one execution, within a process and optionally across processes)
+import copy
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from search_cache import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Not on POSIX: coalescing stays within the process
+    fcntl = None
+
+# Also serialize identical work across processes through lock files (stages backed by a disk cache only)
+SINGLE_FLIGHT_CROSS_PROCESS = os.getenv("SINGLE_FLIGHT_CROSS_PROCESS", "0") == "1"
+SINGLE_FLIGHT_LOCK_DIR = os.getenv("SINGLE_FLIGHT_LOCK_DIR", os.path.join(CACHE_DIR, "locks"))
+# Lock files (one per key) untouched for this long are removed, at most once per interval
+SINGLE_FLIGHT_LOCK_MAX_AGE = float(os.getenv("SINGLE_FLIGHT_LOCK_MAX_AGE", "3600"))
+
+
+class _Call:
+    """One in-flight execution and the callers waiting on it."""
+
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """Run a function once for all concurrent callers asking for the same key.
+
+    The first caller (the leader) runs the function; callers arriving while it
+    runs wait and get a copy of its result, or its exception. The copies are
+    taken from a snapshot made before the leader returns, so the leader may
+    change its own result freely. Nothing is kept
+    once the call finishes, so this only merges overlapping calls; repeat
+    calls are the caches' job.
+
+    With `cross_process`, the leader also takes the key's lock file, so
+    leaders in other processes wait for it. The function should read its disk
+    cache first, so a process that waited finds the result there instead of
+    repeating the work.
+    """
+
+    def __init__(self, name, cross_process=SINGLE_FLIGHT_CROSS_PROCESS, lock_dir=SINGLE_FLIGHT_LOCK_DIR):
+        self.name = name
+        self.cross_process = cross_process and fcntl is not None
+        self.lock_dir = os.path.join(lock_dir, name)
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._pruned_at = 0.0
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.lock_waits = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Return fn(*args, **kwargs), sharing one execution among concurrent callers with `key`."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # Followers get their own copy so no caller can change another's result
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            with self._process_lock(key):
+                with self._lock:
+                    self.executions += 1
+                result = fn(*args, **kwargs)
+            return result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            # No follower can join once the key is gone, so the snapshot is only taken when needed
+            try:
+                if call.followers and call.error is None:
+                    call.result = copy.deepcopy(result)
+            except Exception as e:
+                call.error = e
+            finally:
+                call.done.set()
+
+    @contextmanager
+    def _process_lock(self, key):
+        if not self.cross_process:
+            yield
+            return
+        digest = hashlib.sha1(str(key).encode("utf-8")).hexdigest()
+        try:
+            os.makedirs(self.lock_dir, exist_ok=True)
+            self._prune_lock_files()
+            handle = open(os.path.join(self.lock_dir, f"{digest}.lock"), "a+")
+        except OSError:
+            yield
+            return
+        with handle:
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Another process is on it; wait, then let fn find its result in the disk cache
+                with self._lock:
+                    self.lock_waits += 1
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                # Touch the file so pruning only removes locks of keys nobody asked for lately
+                os.utime(handle.fileno())
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _prune_lock_files(self):
+        """Remove lock files of keys not used within SINGLE_FLIGHT_LOCK_MAX_AGE.
+
+        Removing a file another process still has open can at worst let two
+        processes run the same key once; the disk cache makes that harmless.
+        """
+        now = time.time()
+        with self._lock:
+            if now - self._pruned_at < SINGLE_FLIGHT_LOCK_MAX_AGE:
+                return
+            self._pruned_at = now
+        for entry in os.scandir(self.lock_dir):
+            try:
+                if now - entry.stat().st_mtime > SINGLE_FLIGHT_LOCK_MAX_AGE:
+                    os.unlink(entry.path)
+            except OSError:
+                pass
+
+    def stats(self):
+        """Call counts and the coalescing ratio (share of calls served by another caller's execution)."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "cross_process_waits": self.lock_waits,
+                "coalescing_ratio": round(self.coalesced / self.calls, 3) if self.calls else 0.0,
+            }
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def single_flight(name, **options):
+    """The process-wide SingleFlight for a stage, created on first use."""
+    with _flights_lock:
+        if name not in _flights:
+            _flights[name] = SingleFlight(name, **options)
+        return _flights[name]
+
+
+def coalescing_stats():
+    """Stats for every stage, plus the overall coalescing ratio."""
+    with _flights_lock:
+        flights = list(_flights.values())
+    stages = {flight.name: flight.stats() for flight in flights}
+    calls = sum(stage["calls"] for stage in stages.values())
+    coalesced = sum(stage["coalesced"] for stage in stages.values())
+    return {"stages": stages, "coalescing_ratio": round(coalesced / calls, 3) if calls else 0.0}
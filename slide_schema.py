@@ -0,0 +1,437 @@
+# slide_schema.py (Shared slide deck schema, tolerant JSON/text parsing and targeted re-asks for broken slides)
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import List
+
+from slide_stream import split_slide_blocks
+
+# A slide needs a title and at least this many bullet points to be usable
+MIN_POINTS = 2
+# A title slide (the first slide of the text format) is a title plus an optional subtitle line
+MIN_TITLE_SLIDE_POINTS = 0
+
+# The JSON shape every JSON-mode prompt asks for
+DECK_JSON_FORMAT = """{
+    "title": "Presentation Title",
+    "subtitle": "Presentation Subtitle",
+    "slides": [
+        {
+            "title": "Slide Title",
+            "points": ["Point 1", "Point 2", "Point 3"],
+            "flowchart": false
+        }
+    ]
+}"""
+
+
+def _clean_point(text):
+    """Strip bullet symbols and whitespace an LLM may have added."""
+    return re.sub(r'^[-*•■]\s*', '', str(text).strip()).strip()
+
+
+class Slide:
+    """One content slide: a title, bullet points and whether it wants a flowchart.
+
+    Slides are the deck IR every exporter reads. They are treated as
+    immutable once built (points is a tuple), so the content hash is
+    computed once and parsed slides can be shared between decks.
+    """
+
+    __slots__ = ("title", "points", "needs_flowchart", "content_hash")
+
+    def __init__(self, title, points=(), needs_flowchart=False):
+        self.title = title
+        self.points = tuple(points)
+        self.needs_flowchart = needs_flowchart
+        digest = hashlib.blake2b(digest_size=8)
+        digest.update("\x1f".join((title, *self.points, "1" if needs_flowchart else "0")).encode("utf-8"))
+        self.content_hash = digest.hexdigest()
+
+    def __eq__(self, other):
+        return isinstance(other, Slide) and self.content_hash == other.content_hash
+
+    def __hash__(self):
+        return hash(self.content_hash)
+
+    def __repr__(self):
+        return f"Slide(title={self.title!r}, points={list(self.points)!r}, needs_flowchart={self.needs_flowchart!r})"
+
+    def problems(self, min_points=MIN_POINTS):
+        """Reasons this slide can't be used as-is (empty means it's fine)."""
+        issues = []
+        if not self.title.strip():
+            issues.append("missing title")
+        if len(self.points) < min_points:
+            issues.append(f"needs at least {min_points} points")
+        return issues
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a slide from whatever keys the model used; raises ValueError if it isn't a slide."""
+        if not isinstance(data, dict):
+            raise ValueError(f"slide is {type(data).__name__}, not an object")
+        title = data.get("title") or data.get("heading") or ""
+        points = data.get("points") or data.get("bullets") or data.get("content") or []
+        if isinstance(points, str):
+            points = points.splitlines()
+        points = [_clean_point(p) for p in points if isinstance(p, (str, int, float)) and _clean_point(p)]
+        flowchart = bool(data.get("flowchart") or data.get("needs_flowchart"))
+        return cls(re.sub(r'^#+\s*', '', str(title).strip()), points, flowchart)
+
+    def to_dict(self):
+        return {"title": self.title, "points": list(self.points), "flowchart": self.needs_flowchart}
+
+    def to_text(self):
+        """The "Title:" text block app.py asks the model for."""
+        lines = [f"Title: {self.title}"] + list(self.points)
+        if self.needs_flowchart:
+            lines.append("[FLOWCHART]")
+        return "\n".join(lines)
+
+
+@dataclass
+class Deck:
+    """A title, an optional subtitle and the content slides."""
+
+    title: str = ""
+    subtitle: str = ""
+    slides: List[Slide] = field(default_factory=list)
+
+    def slide_problems(self, index, title_slide=False):
+        """problems() for the slide at `index`, judged by its role: with `title_slide`, slide 0 only needs a title."""
+        min_points = MIN_TITLE_SLIDE_POINTS if title_slide and index == 0 else MIN_POINTS
+        return self.slides[index].problems(min_points)
+
+    def broken_slides(self, expected_count=None, title_slide=False):
+        """Indices of slides that need regenerating, including missing ones up to expected_count."""
+        broken = [index for index in range(len(self.slides)) if self.slide_problems(index, title_slide)]
+        if expected_count:
+            broken.extend(range(len(self.slides), expected_count))
+        return broken
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a deck from parsed JSON, keeping unreadable slides as empty placeholders."""
+        if isinstance(data, list):
+            data = {"slides": data}
+        if not isinstance(data, dict):
+            raise ValueError("deck JSON is not an object")
+        slides = []
+        for item in data.get("slides") or []:
+            try:
+                slides.append(Slide.from_dict(item))
+            except ValueError:
+                # Keep its position so a re-ask can fill it in
+                slides.append(Slide(""))
+        return cls(str(data.get("title") or ""), str(data.get("subtitle") or ""), slides)
+
+    def to_dict(self):
+        return {"title": self.title, "subtitle": self.subtitle, "slides": [s.to_dict() for s in self.slides]}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+
+    def to_text(self):
+        return "\n\n".join(slide.to_text() for slide in self.slides)
+
+    def to_markdown(self):
+        """Markdown for reveal.js: one section per slide."""
+        markdown = "---\ntheme: black\n---\n\n"
+        for slide in self.slides:
+            markdown += f"## {slide.title}\n\n"
+            for point in slide.points:
+                markdown += f"- {point}\n"
+            markdown += "\n---\n\n"
+        return markdown
+
+
+# Parsed blocks kept for re-use; an edit only re-parses the blocks it touched
+SLIDE_BLOCK_CACHE_SIZE = 1024
+
+
+def _parse_block(slide_text):
+    """Parse one block (see split_slide_blocks) into a Slide, or None if it is empty."""
+    lines = [line.strip() for line in slide_text.strip().splitlines() if line.strip()]
+    if not lines:
+        return None
+
+    # Handle slide title
+    title_line = lines[0]
+    if title_line.lower().startswith("title:"):
+        title_line = title_line[6:].strip()  # Remove "Title: " prefix
+    # Clean up any markdown symbols in the title
+    slide_title = re.sub(r'^#+\s*', '', title_line)
+
+    points, needs_flowchart = [], False
+    for line in lines[1:]:
+        # Check if the slide needs a flowchart
+        if "[FLOWCHART]" in line:
+            needs_flowchart = True
+            line = line.replace("[FLOWCHART]", "")
+        # Clean up any existing bullet points to prevent doubling
+        line = _clean_point(line)
+        if line:
+            points.append(line)
+    return Slide(slide_title, points, needs_flowchart)
+
+
+class SlideTextParser:
+    """The "Title:" text parser, memoized per block.
+
+    Blocks are looked up by their exact text in a bounded LRU, so re-parsing
+    an edited deck only parses the blocks that changed.
+    """
+
+    def __init__(self, max_blocks=SLIDE_BLOCK_CACHE_SIZE):
+        self.max_blocks = max_blocks
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def parse(self, slide_content):
+        slides = []
+        # Same block boundaries as streaming, so a streamed deck and its text parse alike
+        for key in split_slide_blocks(slide_content):
+            with self._lock:
+                slide = self._blocks.get(key)
+                if slide is not None:
+                    self._blocks.move_to_end(key)
+            if slide is None:
+                slide = _parse_block(key)
+                with self._lock:
+                    self._blocks[key] = slide
+                    while len(self._blocks) > self.max_blocks:
+                        self._blocks.popitem(last=False)
+            if slide is not None:
+                slides.append(slide)
+        return slides
+
+
+# Shared so every caller (generation, edits, streaming preview) re-uses parsed blocks
+slide_text_parser = SlideTextParser()
+
+
+# Function to parse the "Title:" text format into slides
+def parse_slide_text(slide_content):
+    """Split LLM slide text into Slides at blank lines and "Title:" lines.
+
+    The first line of a block is the title (with or without a "Title:"
+    prefix); the rest are bullet points. "[FLOWCHART]" anywhere in a block
+    marks the slide as wanting a flowchart.
+    """
+    return slide_text_parser.parse(slide_content)
+
+
+def parse_deck(slide_content, title=""):
+    """The Deck IR for slide text; pass it to the exporters instead of the raw text."""
+    return Deck(title=title, slides=parse_slide_text(slide_content))
+
+
+def repair_json(text):
+    """Best-effort valid JSON from an LLM reply, or None if there is no JSON object at all.
+
+    Skips prose and code fences before the first brace, drops trailing
+    commas, and if the reply was cut off, truncates it after the last
+    complete value and closes any open strings, arrays and objects.
+    """
+    start = min((i for i in (text.find("{"), text.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        return None
+
+    out = []
+    stack = []            # open '{' / '['
+    expecting_key = []    # per open object: is the next string a key?
+    in_string = escape = is_key = False
+    safe_length, safe_stack = 0, []
+
+    def mark_safe():
+        nonlocal safe_length, safe_stack
+        safe_length, safe_stack = len(out), list(stack)
+
+    for char in text[start:]:
+        if in_string:
+            out.append(char)
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+                if not is_key:
+                    mark_safe()
+            continue
+
+        if char == '"':
+            in_string = True
+            is_key = bool(stack) and stack[-1] == "{" and expecting_key[-1]
+            out.append(char)
+        elif char in "{[":
+            stack.append(char)
+            expecting_key.append(char == "{")
+            out.append(char)
+            mark_safe()
+        elif char in "}]":
+            if not stack:
+                break
+            # Trailing comma before a closer
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            stack.pop()
+            expecting_key.pop()
+            out.append(char)
+            mark_safe()
+            if not stack:
+                return "".join(out)
+        elif char == ":":
+            if expecting_key:
+                expecting_key[-1] = False
+            out.append(char)
+        elif char == ",":
+            # Whatever came before the comma (including a number or literal) is complete
+            mark_safe()
+            if stack and stack[-1] == "{":
+                expecting_key[-1] = True
+            out.append(char)
+        else:
+            out.append(char)
+
+    # Cut off mid-value: keep what was complete and close everything still open
+    repaired = "".join(out[:safe_length]).rstrip()
+    if repaired.endswith(","):
+        repaired = repaired[:-1]
+    elif repaired.endswith(":"):
+        # A key with no value: drop the key
+        repaired = re.sub(r',?\s*"(?:[^"\\]|\\.)*"\s*:$', "", repaired)
+    return repaired + "".join("}" if opener == "{" else "]" for opener in reversed(safe_stack))
+
+
+def parse_deck_json(text):
+    """Parse a JSON deck reply, repairing it if needed; raises ValueError if nothing is recoverable."""
+    repaired = repair_json(text or "")
+    if repaired is None:
+        raise ValueError("reply contains no JSON")
+    try:
+        data = json.loads(repaired, strict=False)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"unrecoverable JSON: {e}") from e
+    return Deck.from_dict(data)
+
+
+# Function to build a follow-up request for just the slides that came back broken
+def reask_messages(topic, deck, indices, json_mode=True, title_slide=False):
+    """Chat messages asking the model to regenerate only the slides at `indices`.
+
+    The good slides are listed as context so the replacements fit the deck.
+    """
+    lines = []
+    for index in range(max(len(deck.slides), max(indices) + 1)):
+        title = deck.slides[index].title if index < len(deck.slides) and index not in indices else "<to write>"
+        lines.append(f"{index + 1}. {title}")
+    outline = "\n".join(lines)
+    wanted = ", ".join(str(i + 1) for i in indices)
+    if json_mode:
+        output = ('Reply with JSON only: {"slides": [...]} containing exactly '
+                  f'{len(indices)} slide objects in the order requested, each shaped like '
+                  '{"title": "...", "points": ["...", "...", "..."], "flowchart": false}.')
+    else:
+        output = ('Reply with exactly those slides in order, separated by blank lines, each as '
+                  '"Title: <title>" followed by 3-5 bullet points on their own lines without bullet symbols.')
+    prompt = (f'A presentation about "{topic}" has this outline:\n{outline}\n\n'
+              f"Write slide(s) {wanted} so they fit the rest of the deck, with a clear title and "
+              f"3-5 specific, data-driven bullet points each.\n{output}")
+    if title_slide and 0 in indices:
+        prompt += "\nSlide 1 is the title slide: just the title and one subtitle line."
+    return [
+        {"role": "system", "content": "You are an expert presentation designer."},
+        {"role": "user", "content": prompt},
+    ]
+
+
+def merge_reask(deck, indices, reply, json_mode=True, title_slide=False):
+    """Put regenerated slides into the deck at `indices`; returns the indices still broken.
+
+    Indices the reply didn't cover stay broken (as empty placeholders if they
+    were past the end of the deck), so the next round asks for them again.
+    """
+    try:
+        new_slides = parse_deck_json(reply).slides if json_mode else parse_slide_text(reply)
+    except ValueError:
+        new_slides = []
+    while len(deck.slides) <= max(indices):
+        deck.slides.append(Slide(""))
+    for index, slide in zip(indices, new_slides):
+        min_points = MIN_TITLE_SLIDE_POINTS if title_slide and index == 0 else MIN_POINTS
+        if not slide.problems(min_points):
+            deck.slides[index] = slide
+    return [index for index in indices if deck.slide_problems(index, title_slide)]
+
+
+def drop_broken(deck, title_slide=False):
+    """Remove slides that are still unusable after re-asking (keeps the deck renderable)."""
+    deck.slides = [
+        slide for index, slide in enumerate(deck.slides)
+        if slide.title.strip() and (slide.points or (title_slide and index == 0))
+    ]
+    return deck
+
+
+def _parse_reply(reply, json_mode):
+    """The first reply as a Deck; raises ValueError if it holds no slides at all."""
+    try:
+        deck = parse_deck_json(reply) if json_mode else Deck(slides=parse_slide_text(reply))
+    except ValueError:
+        deck = Deck()
+    if not deck.slides:
+        # Nothing to re-ask around: without an outline a re-ask would just be a second first request
+        raise ValueError("the model's reply contained no slides")
+    return deck
+
+
+def _finished(deck, title_slide):
+    drop_broken(deck, title_slide)
+    if not deck.slides:
+        raise ValueError("no usable slides after re-asking")
+    return deck
+
+
+# Re-ask rounds for broken slides before giving up on them
+DECK_REASK_ROUNDS = 2
+
+
+# Function to parse a reply and re-ask for only its broken slides
+def complete_deck(complete, reply, topic, expected_count=None, json_mode=True, rounds=DECK_REASK_ROUNDS,
+                  title_slide=False):
+    """Parse `reply` into a Deck, regenerating broken or missing slides with `complete(messages)`.
+
+    `complete` is any function returning the model's reply text, so the
+    same repair loop serves every client. With `title_slide`, the first
+    slide is the deck's title slide and only needs a title. Slides still
+    broken after `rounds` re-asks are dropped. Raises ValueError if the
+    reply has no slides or none survive.
+    """
+    deck = _parse_reply(reply, json_mode)
+    broken = deck.broken_slides(expected_count, title_slide)
+    for _ in range(rounds):
+        if not broken:
+            break
+        reask = reask_messages(topic, deck, broken, json_mode, title_slide)
+        broken = merge_reask(deck, broken, complete(reask), json_mode, title_slide)
+    return _finished(deck, title_slide)
+
+
+async def acomplete_deck(complete, reply, topic, expected_count=None, json_mode=True, rounds=DECK_REASK_ROUNDS,
+                         title_slide=False):
+    """complete_deck for an async `complete`."""
+    deck = _parse_reply(reply, json_mode)
+    broken = deck.broken_slides(expected_count, title_slide)
+    for _ in range(rounds):
+        if not broken:
+            break
+        reask = reask_messages(topic, deck, broken, json_mode, title_slide)
+        broken = merge_reask(deck, broken, await complete(reask), json_mode, title_slide)
+    return _finished(deck, title_slide)
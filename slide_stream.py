@@ -0,0 +1,70 @@
+# slide_stream.py (Incremental splitting of streamed LLM slide text into finished slides)
+
+
+class SlideStreamParser:
+    """Split streamed slide text into slide blocks as soon as each one closes.
+
+    A block closes at a blank line or when a new "Title:" line starts. This is
+    the only implementation of that rule: the batch parser splits whole texts
+    with split_slide_blocks(), so feeding a response at once and feeding it
+    token by token yield the same blocks.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._partial_line = ""
+        self._block_lines = []
+
+    def feed(self, chunk):
+        """Add streamed text and return the list of slide blocks it completed."""
+        self.text += chunk
+        self._partial_line += chunk
+        completed = []
+        while "\n" in self._partial_line:
+            line, self._partial_line = self._partial_line.split("\n", 1)
+            block = self._add_line(line)
+            if block:
+                completed.append(block)
+        return completed
+
+    @property
+    def open_title_line(self):
+        """First line of the block still streaming, once that line is complete; else None.
+
+        This is the slide's title, known well before the slide itself closes.
+        """
+        return self._block_lines[0] if self._block_lines else None
+
+    def finish(self):
+        """Flush whatever is left once the stream ends; returns the final blocks."""
+        completed = []
+        if self._partial_line:
+            block = self._add_line(self._partial_line)
+            self._partial_line = ""
+            if block:
+                completed.append(block)
+        block = self._close_block()
+        if block:
+            completed.append(block)
+        return completed
+
+    def _add_line(self, line):
+        if not line.strip():
+            return self._close_block()
+        if line.strip().lower().startswith("title:") and self._block_lines:
+            block = self._close_block()
+            self._block_lines.append(line)
+            return block
+        self._block_lines.append(line)
+        return None
+
+    def _close_block(self):
+        block = "\n".join(self._block_lines).strip()
+        self._block_lines = []
+        return block or None
+
+
+def split_slide_blocks(text):
+    """Split complete slide text into blocks, with the same boundaries as streaming."""
+    parser = SlideStreamParser()
+    return parser.feed(text or "") + parser.finish()
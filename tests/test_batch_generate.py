@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+import batch_generate
+from batch_generate import BatchRunner, load_items
+from rate_limiter import AdaptiveRateLimiter
+
+
+def test_bad_num_slides_fails_only_its_row(tmp_path, monkeypatch):
+    # BatchRunner configures the limiter; keep that off the process-wide one
+    monkeypatch.setattr(batch_generate, "groq_limiter", AdaptiveRateLimiter())
+    topics = tmp_path / "topics.csv"
+    topics.write_text("topic,num_slides\nGood one,4\nBad one,lots\nDefault one,\n", encoding="utf-8")
+
+    items = load_items(str(topics), 5, "professional")
+
+    assert [item["num_slides"] for item in items] == [4, 5, 5]
+    assert "error" not in items[0] and "error" not in items[2]
+    assert "num_slides" in items[1]["error"]
+
+    args = SimpleNamespace(llm_rpm=30, llm_tpm=30000, llm_concurrency=2, llm_retries=0,
+                           checkpoint=str(tmp_path / "checkpoint.jsonl"), out_dir=str(tmp_path), no_images=True)
+    record = BatchRunner(args).run_item(items[1])
+    assert record["status"] == "failed"
+    assert "row 2" in record["error"]
+
+
+def test_ids_from_the_file_are_made_filesystem_safe(tmp_path):
+    topics = tmp_path / "topics.jsonl"
+    topics.write_text('{"id": "../x", "topic": "One"}\n{"request_id": "a/b", "topic": "Two"}\n', encoding="utf-8")
+
+    assert [item["id"] for item in load_items(str(topics), 5, "professional")] == ["x", "a-b"]
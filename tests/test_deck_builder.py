@@ -0,0 +1,71 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from pptx import Presentation
+
+from fanout import FanOut
+from presentation_engine import DeckBuilder
+from slide_schema import Slide
+
+A = Slide("A", ["a one", "a two"])
+B = Slide("B", ["b one", "b two"])
+C = Slide("C", ["c one", "c two"])
+D = Slide("D", ["d one", "d two"])
+
+
+def titles(pptx_io):
+    prs = Presentation(io.BytesIO(pptx_io.getvalue()))
+    return [slide.shapes.title.text for slide in prs.slides]
+
+
+def built(*slides):
+    builder = DeckBuilder("Topic", include_images=False)
+    builder.add_slides(slides)
+    assert titles(builder.finish()) == ["Topic"] + [slide.title for slide in slides]
+    return builder
+
+
+def test_delete_after_save():
+    builder = built(A, B, C)
+    assert builder.update([A, C]) == 0
+    assert titles(builder.finish()) == ["Topic", "A", "C"]
+
+
+def test_reorder_after_save():
+    builder = built(A, B, C)
+    assert builder.update([C, A, B]) == 0
+    assert titles(builder.finish()) == ["Topic", "C", "A", "B"]
+
+
+def test_edit_delete_and_insert_after_save():
+    builder = built(A, B, C)
+    edited = Slide("A'", ["a one", "a changed"])
+    assert builder.update([edited, C, D]) == 2
+    assert titles(builder.finish()) == ["Topic", "A'", "C", "D"]
+
+
+def test_repeated_structural_edits():
+    builder = built(A, B, C)
+    builder.update([D, C])
+    builder.finish()
+    builder.update([B, D, A, C])
+    assert titles(builder.finish()) == ["Topic", "B", "D", "A", "C"]
+
+
+def test_flowchart_slide_drops_its_queued_title_prefetch():
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    executor.submit(release.wait, 5)
+    builder = DeckBuilder("Topic", include_images=True)
+    builder.images = FanOut(5, executor=executor)
+
+    # Prefetched from the title line, before the [FLOWCHART] marker arrived
+    builder.prefetch_image("B")
+    builder.add_slide("B", ["b one"], needs_flowchart=True)
+
+    assert ("B", False) not in builder.images
+    assert ("B", True) in builder.images
+    builder.images.cancel_pending()
+    release.set()
+    executor.shutdown()
@@ -0,0 +1,33 @@
+import sqlite3
+import time
+
+from engine_health import CLOSED, HALF_OPEN, EngineHealth
+
+
+def test_reads_do_not_wait_for_the_write_lock(tmp_path):
+    health = EngineHealth(path=str(tmp_path / "health.sqlite3"), failure_threshold=1, open_seconds=60)
+    health.record("bing", ok=True, latency=0.5)
+
+    # Another process holding the write lock doesn't block scores, snapshots or a closed breaker
+    writer = sqlite3.connect(health.path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    try:
+        start = time.monotonic()
+        assert health.scores(["bing"])["bing"] > 0
+        assert health.snapshot()[0]["state"] == CLOSED
+        assert health.allow("bing")
+        assert time.monotonic() - start < 1
+    finally:
+        writer.execute("ROLLBACK")
+        writer.close()
+
+
+def test_cooled_down_breaker_admits_one_probe(tmp_path):
+    health = EngineHealth(path=str(tmp_path / "health.sqlite3"), failure_threshold=1, open_seconds=0.05)
+    health.record("bing", ok=False, latency=0.5)
+    assert not health.allow("bing")
+
+    time.sleep(0.1)
+    assert health.allow("bing")
+    assert health.snapshot()[0]["state"] == HALF_OPEN
+    assert not health.allow("bing")
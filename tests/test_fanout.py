@@ -0,0 +1,32 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from fanout import FanOut
+
+
+def test_deadline_cancels_queued_calls():
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    fanout = FanOut(0.2, executor=executor)
+    fanout.submit("slow", release.wait, 5)
+    queued = fanout.submit("queued", lambda: "never")
+
+    assert list(fanout.as_completed()) == []
+    assert queued.cancelled()
+    assert "queued" not in fanout
+    release.set()
+    executor.shutdown()
+
+
+def test_result_past_deadline_cancels_the_rest():
+    executor = ThreadPoolExecutor(max_workers=1)
+    release = threading.Event()
+    fanout = FanOut(0.2, executor=executor)
+    fanout.submit("slow", release.wait, 5)
+    queued = fanout.submit("queued", lambda: "never")
+
+    assert fanout.result("slow", default="missed") == "missed"
+    assert queued.cancelled()
+    assert fanout.result("queued", default="missed") == "missed"
+    release.set()
+    executor.shutdown()
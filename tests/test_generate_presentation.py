@@ -0,0 +1,31 @@
+import presentation_engine
+
+
+class FinishedResearch:
+    is_finished = True
+
+    def __init__(self, topic, on_progress=None):
+        pass
+
+    def wait_for_main(self, grace):
+        return {"main": []}
+
+    def snapshot(self):
+        return {"main": []}
+
+
+def test_interrupted_stream_falls_back_to_a_full_generation(monkeypatch):
+    full = "Title: Topic\nSubtitle\n\nTitle: A\na one\na two\n\nTitle: B\nb one\nb two\n"
+
+    def broken_stream(topic, context, research, num_slides, api_key=None, on_error=None):
+        yield "Title: Topic\nSubtitle\n\nTitle: A\na one\n"
+        on_error("Error generating content with Groq: connection reset")
+
+    monkeypatch.setattr(presentation_engine, "ResearchRun", FinishedResearch)
+    monkeypatch.setattr(presentation_engine, "groq_stream_content", broken_stream)
+    monkeypatch.setattr(presentation_engine, "groq_generate_content", lambda *args, **kwargs: full)
+
+    result = presentation_engine.generate_presentation("Topic", include_images=False, stream=True)
+
+    assert result["content"] == full
+    assert [slide.title for slide in result["deck"].slides][-2:] == ["A", "B"]
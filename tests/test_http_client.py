@@ -0,0 +1,52 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import http_client
+from fanout import HostLimiter
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", "5")
+        self.end_headers()
+        self.wfile.write(b"hello")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def page_url(monkeypatch):
+    monkeypatch.setattr(http_client, "host_limits", HostLimiter(limit=1))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+
+
+def slot_free(url):
+    semaphore = http_client.host_limits._semaphore(url.split("/")[2])
+    if semaphore.acquire(blocking=False):
+        semaphore.release()
+        return True
+    return False
+
+
+def test_streamed_response_holds_the_host_slot_until_closed(page_url):
+    with http_client.get(page_url, stream=True) as response:
+        assert not slot_free(page_url)
+        assert response.content == b"hello"
+    assert slot_free(page_url)
+
+    # Closing twice gives the slot back once
+    response.close()
+    assert http_client.host_limits._semaphore(page_url.split("/")[2])._value == 1
+
+
+def test_plain_get_releases_the_slot_on_return(page_url):
+    assert http_client.get(page_url).text == "hello"
+    assert slot_free(page_url)
@@ -0,0 +1,23 @@
+import threading
+
+from job_queue import JobQueue
+
+
+def test_owner_is_the_session_that_started_the_job():
+    queue = JobQueue(max_workers=1)
+    release = threading.Event()
+
+    def work(on_progress):
+        release.wait(5)
+        return "deck"
+
+    first = queue.submit("key", work, owner="session-a")
+    # A double click in the same session joins the job and is still its owner
+    again = queue.submit("key", work, owner="session-a")
+    other = queue.submit("key", work, owner="session-b")
+    release.set()
+
+    assert first is again is other
+    assert first.owner == "session-a"
+    assert first.joined == 2
+    assert first.wait(5) and first.result == "deck"
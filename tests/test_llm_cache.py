@@ -0,0 +1,31 @@
+from types import SimpleNamespace
+
+from llm_cache import CompletionCache
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **request):
+        self.calls += 1
+        message = SimpleNamespace(content="reply")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def test_cache_hit_is_reported_by_the_lookup_not_by_missing_usage(tmp_path):
+    cache = CompletionCache(path=str(tmp_path / "llm.sqlite3"), enabled=True)
+    client = FakeClient()
+    messages = [{"role": "user", "content": "hi"}]
+    hits = []
+
+    # No usage on the response, but the model was called: not a cache hit
+    assert cache.complete(client, messages, "model", on_cache_hit=lambda: hits.append(1)) == "reply"
+    assert hits == [] and client.calls == 1
+
+    assert cache.complete(client, messages, "model", on_cache_hit=lambda: hits.append(1)) == "reply"
+    assert hits == [1] and client.calls == 1
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_rate"] == 0.5
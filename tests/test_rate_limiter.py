@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+import pytest
+
+from rate_limiter import AdaptiveRateLimiter, estimate_request_tokens
+
+
+class FakeStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+
+
+def limiter(concurrency=2):
+    return AdaptiveRateLimiter(requests_per_minute=6000, tokens_per_minute=10 ** 7,
+                               initial_concurrency=concurrency, max_concurrency=concurrency, max_retries=0)
+
+
+def test_cancelled_call_releases_its_permit():
+    rate_limiter = limiter()
+
+    async def main():
+        task = asyncio.create_task(rate_limiter.acall(lambda: asyncio.sleep(10), 10))
+        await asyncio.sleep(0.1)
+        assert rate_limiter.in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert rate_limiter.in_flight == 0
+
+
+def test_cancelled_wait_leaves_the_queue():
+    rate_limiter = limiter(concurrency=1)
+
+    async def main():
+        holder = asyncio.create_task(rate_limiter.acall(lambda: asyncio.sleep(0.3), 10))
+        await asyncio.sleep(0.05)
+        waiter = asyncio.create_task(rate_limiter.acall(lambda: asyncio.sleep(0), 10))
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await holder
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert rate_limiter.in_flight == 0
+    assert rate_limiter.stats()["waiting"] == 0
+
+
+def test_only_overload_errors_shrink_concurrency():
+    rate_limiter = limiter(concurrency=4)
+    with pytest.raises(ValueError):
+        rate_limiter.call(lambda: (_ for _ in ()).throw(ValueError("bad request")), 10)
+    assert rate_limiter.stats()["concurrency_limit"] == 4
+    with pytest.raises(FakeStatusError):
+        rate_limiter.call(lambda: (_ for _ in ()).throw(FakeStatusError(503)), 10)
+    assert rate_limiter.stats()["concurrency_limit"] == 2
+    assert rate_limiter.in_flight == 0
+
+
+def test_two_default_sized_generations_run_together():
+    from presentation_engine import plan_generation_messages
+
+    rate_limiter = AdaptiveRateLimiter()
+    research = {
+        "main": [{"title": "Result " * 8, "link": "https://example.com", "snippet": "Snippet " * 40}] * 3,
+        "passages": [{"text": "Passage " * 100, "url": "https://example.com", "title": "Page"}] * 6,
+    }
+    messages, report = plan_generation_messages("topic", "context " * 100, research, 5)
+    tokens = estimate_request_tokens({"messages": messages, "max_tokens": report["max_tokens"]})
+
+    first = rate_limiter.acquire(tokens)
+    admitted = threading.Event()
+    threading.Thread(target=lambda: (rate_limiter.acquire(tokens), admitted.set()), daemon=True).start()
+    assert admitted.wait(1), "the second generation waited on the token bucket"
+    assert rate_limiter.in_flight == 2
+    rate_limiter.release(first)
+
+
+def test_slow_calls_trim_concurrency_against_calls_of_their_size():
+    rate_limiter = limiter(concurrency=4)
+    rate_limiter.max_concurrency = 8
+
+    def finish(used_tokens, seconds):
+        permit = rate_limiter.acquire(10)
+        permit.started -= seconds
+        permit.used_tokens = used_tokens
+        rate_limiter.release(permit)
+
+    finish(2000, 2.0)
+    # A short call is slower per token but is only compared with other short calls
+    finish(50, 0.5)
+    assert rate_limiter.stats()["slow_calls"] == 0
+    limit = rate_limiter.stats()["concurrency_limit"]
+
+    finish(2000, 6.0)
+    assert rate_limiter.stats()["slow_calls"] == 1
+    assert rate_limiter.stats()["concurrency_limit"] < limit
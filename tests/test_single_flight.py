@@ -0,0 +1,60 @@
+import threading
+import time
+
+from single_flight import SingleFlight
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for the single-flight state"
+        time.sleep(0.01)
+
+
+def test_leader_can_change_its_result_without_touching_followers():
+    flight = SingleFlight("test", cross_process=False)
+    started = threading.Event()
+    release = threading.Event()
+    results = {}
+
+    def work():
+        started.set()
+        release.wait(5)
+        return {"items": [1, 2]}
+
+    def leader():
+        result = flight.do("key", work)
+        result["items"].append("leader")
+        results["leader"] = result
+
+    def follower():
+        results["follower"] = flight.do("key", work)
+
+    threads = [threading.Thread(target=leader)]
+    threads[0].start()
+    started.wait(5)
+    threads.append(threading.Thread(target=follower))
+    threads[1].start()
+    wait_until(lambda: flight.stats()["coalesced"] >= 1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results["leader"]["items"] == [1, 2, "leader"]
+    assert results["follower"] == {"items": [1, 2]}
+    assert flight.stats()["executions"] == 1
+
+
+def test_cross_process_locks_are_per_key(tmp_path):
+    flight = SingleFlight("test", cross_process=True, lock_dir=str(tmp_path))
+    release = threading.Event()
+    holder = threading.Thread(target=flight.do, args=("slow", release.wait, 5))
+    holder.start()
+    wait_until(lambda: flight.stats()["executions"] >= 1)
+
+    # Another key must not wait behind the one being held
+    assert flight.do("other", lambda: "done") == "done"
+    assert flight.stats()["cross_process_waits"] == 0
+    assert len(list((tmp_path / "test").iterdir())) == 2
+    release.set()
+    holder.join(5)
@@ -0,0 +1,29 @@
+import pytest
+
+from slide_schema import complete_deck, parse_deck
+
+TEXT = "Title: Solar Power\nThe future of energy\n\nTitle: Costs\nfalling fast\nscaling up"
+
+
+def test_title_slide_with_subtitle_is_not_reasked():
+    calls = []
+    deck = complete_deck(calls.append, TEXT, "Solar", expected_count=2, json_mode=False, title_slide=True)
+    assert calls == []
+    assert [slide.title for slide in deck.slides] == ["Solar Power", "Costs"]
+    assert parse_deck(TEXT).broken_slides(2, title_slide=True) == []
+
+
+def test_unparseable_reply_raises_instead_of_returning_empty_deck():
+    with pytest.raises(ValueError):
+        complete_deck(lambda messages: "", "Sorry, I can't help with that.", "Solar")
+
+
+def test_missing_slides_stay_broken_until_filled():
+    # First re-ask returns one slide for two missing positions; the second fills the other
+    replies = iter([
+        '{"slides": [{"title": "Two", "points": ["a", "b"]}]}',
+        '{"slides": [{"title": "Three", "points": ["c", "d"]}]}',
+    ])
+    reply = '{"slides": [{"title": "One", "points": ["x", "y"]}]}'
+    deck = complete_deck(lambda messages: next(replies), reply, "Topic", expected_count=3)
+    assert [slide.title for slide in deck.slides] == ["One", "Two", "Three"]
@@ -0,0 +1,35 @@
+import re
+
+import pytest
+
+from slide_schema import parse_deck
+from slide_stream import SlideStreamParser
+
+TEXTS = [
+    "Title: A\none\ntwo\nTitle: B\nthree\nfour",
+    "Title: A\none\ntwo\n\nTitle: B\nthree\nfour\n[FLOWCHART]\n",
+    "Intro\nfirst\n\n\n  \nTitle: C\n- bullet\n* other\nTitle: D\nlast",
+    "Title: Only\none\ntwo",
+]
+
+
+def stream(text, chunks):
+    parser = SlideStreamParser()
+    blocks = []
+    for chunk in chunks:
+        blocks.extend(parser.feed(chunk))
+    blocks.extend(parser.finish())
+    return [slide for block in blocks for slide in parse_deck(block).slides]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_streamed_and_batch_parsing_agree(text):
+    expected = parse_deck(text).slides
+    # Whole text at once, token by token and character by character
+    assert stream(text, [text]) == expected
+    assert stream(text, re.findall(r"\S+\s*|\s+", text)) == expected
+    assert stream(text, list(text)) == expected
+
+
+def test_title_line_starts_a_new_slide():
+    assert [slide.title for slide in parse_deck(TEXTS[0]).slides] == ["A", "B"]
@@ -0,0 +1,14 @@
+from token_usage import TokenUsageLog
+
+
+def test_log_rotates_by_size(tmp_path):
+    path = tmp_path / "token_usage.jsonl"
+    log = TokenUsageLog(path=str(path), max_bytes=500)
+    for i in range(50):
+        log.record(kind="generate", topic=f"topic {i}", prompt_tokens=100)
+
+    assert path.stat().st_size <= 500
+    assert (tmp_path / "token_usage.jsonl.1").stat().st_size <= 600
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["token_usage.jsonl", "token_usage.jsonl.1"]
+    # The in-memory view is unaffected by rotation
+    assert len(log.recent(100)) == 50
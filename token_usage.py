@@ -0,0 +1,74 @@
+# token_usage.py (Per-request record of prompt sizes, token counts and latency for LLM calls)
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from search_cache import CACHE_DIR
+
+TOKEN_LOG_PATH = os.getenv("TOKEN_LOG_PATH", os.path.join(CACHE_DIR, "token_usage.jsonl"))
+# Past this size the log is moved to <path>.1 (replacing the previous one) and a new file started
+TOKEN_LOG_MAX_BYTES = int(os.getenv("TOKEN_LOG_MAX_BYTES", str(5 * 1024 * 1024)))
+
+
+class TokenUsageLog:
+    """Appends one JSON line per LLM request and keeps the latest ones in memory.
+
+    The file is rotated by size, so at most two files of about `max_bytes` stay on disk.
+    """
+
+    def __init__(self, path=TOKEN_LOG_PATH, keep=200, max_bytes=TOKEN_LOG_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._recent = deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+    def record(self, **fields):
+        """Record one request; typical fields are estimated_prompt_tokens, prompt_tokens,
+        completion_tokens, max_tokens, seconds, cached and the per-section report."""
+        entry = {"time": time.time(), **fields}
+        with self._lock:
+            self._recent.append(entry)
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry, default=str) + "\n")
+                    size = f.tell()
+                if size > self.max_bytes:
+                    os.replace(self.path, self.path + ".1")
+            except OSError:
+                pass
+        return entry
+
+    def recent(self, count=20):
+        with self._lock:
+            return list(self._recent)[-count:]
+
+    def summary(self):
+        """Averages over the requests held in memory, including how far off the local estimate was."""
+        entries = self.recent(len(self._recent))
+        if not entries:
+            return {"requests": 0}
+
+        def mean(key):
+            values = [e[key] for e in entries if e.get(key) is not None]
+            return round(sum(values) / len(values), 1) if values else None
+
+        measured = [e for e in entries if e.get("prompt_tokens") and e.get("estimated_prompt_tokens")]
+        return {
+            "requests": len(entries),
+            "cached": sum(1 for e in entries if e.get("cached")),
+            "mean_estimated_prompt_tokens": mean("estimated_prompt_tokens"),
+            "mean_prompt_tokens": mean("prompt_tokens"),
+            "mean_completion_tokens": mean("completion_tokens"),
+            "mean_seconds": mean("seconds"),
+            "mean_first_token_seconds": mean("first_token_seconds"),
+            "estimate_ratio": round(
+                sum(e["estimated_prompt_tokens"] for e in measured) / sum(e["prompt_tokens"] for e in measured), 3
+            ) if measured else None,
+        }
+
+
+# Shared by the generation paths in presentation_engine
+token_usage = TokenUsageLog()
@@ -1,50 +1,71 @@
 # websearch_server.py (MCP Web Search Service)
 from mcp.server.fastmcp import FastMCP
-from bs4 import BeautifulSoup
-import requests
+import http_client
+from html_parser import SelectorList, parser
 import re
 import json
+from fanout import run_blocking
 
 mcp = FastMCP("websearch")
 
+# Google result markup, compiled once
+GOOGLE_SELECTORS = {
+    "result": SelectorList("div.tF2Cxc"),
+    "link": SelectorList("a"),
+    "title": SelectorList("h3.LC20lb"),
+    "snippet": SelectorList("div.VwiC3b"),
+}
+
+def google_search(query: str, max_results: int = 5) -> list:
+    """Scrape Google for the query and return sanitized result dicts"""
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
+        "Accept-Language": "en-US,en;q=0.9",
+        "Referer": "https://www.google.com/"
+    }
+    
+    # Perform search
+    response = http_client.get(
+        f"https://www.google.com/search?q={query}&num={max_results}",
+        headers=headers,
+        timeout=15
+    )
+    response.raise_for_status()
+    
+    # Parse results
+    root = parser.parse(response.text)
+    results = []
+    
+    # Find all search result blocks
+    for result in parser.select(root, GOOGLE_SELECTORS["result"]):
+        link_elem = parser.select_one(result, GOOGLE_SELECTORS["link"])
+        title_elem = parser.select_one(result, GOOGLE_SELECTORS["title"])
+        if link_elem is None or title_elem is None:
+            continue
+        link = parser.attr(link_elem, 'href') or ''
+        title = parser.text(title_elem)
+        snippet_elem = parser.select_one(result, GOOGLE_SELECTORS["snippet"])
+        snippet = parser.text(snippet_elem) if snippet_elem is not None else ''
+        
+        # Validate and sanitize URL
+        if re.match(r'^https?://', link):
+            results.append({
+                "title": title.strip(),
+                "url": link.split('&')[0],  # Remove tracking parameters
+                "snippet": snippet.strip()
+            })
+            
+        if len(results) >= max_results:
+            break
+            
+    return results
+
 @mcp.tool()
 async def web_search(query: str, max_results: int = 5) -> str:
     """Enhanced web search with sanitization and Google parsing"""
     try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/125.0.0.0 Safari/537.36",
-            "Accept-Language": "en-US,en;q=0.9",
-            "Referer": "https://www.google.com/"
-        }
-        
-        # Perform search
-        response = requests.get(
-            f"https://www.google.com/search?q={query}&num={max_results}",
-            headers=headers,
-            timeout=15
-        )
-        response.raise_for_status()
-        
-        # Parse results
-        soup = BeautifulSoup(response.text, 'html.parser')
-        results = []
-        
-        # Find all search result blocks
-        for result in soup.find_all('div', class_='tF2Cxc'):
-            link = result.find('a')['href']
-            title = result.find('h3', class_='LC20lb').text
-            snippet = result.find('div', class_='VwiC3b').text if result.find('div', class_='VwiC3b') else ''
-            
-            # Validate and sanitize URL
-            if re.match(r'^https?://', link):
-                results.append({
-                    "title": title.strip(),
-                    "url": link.split('&')[0],  # Remove tracking parameters
-                    "snippet": snippet.strip()
-                })
-                
-            if len(results) >= max_results:
-                break
+        # The blocking scrape runs on a bounded worker pool so the event loop stays free
+        results = await run_blocking(google_search, query, max_results)
                 
         return json.dumps({
             "query": query,